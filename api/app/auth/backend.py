@@ -1,4 +1,9 @@
 """The module contains authentication backend"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from uuid import UUID
 
 from starlette.authentication import (
@@ -6,12 +11,97 @@ from starlette.authentication import (
     AuthenticationBackend,
     UnauthenticatedUser,
 )
-from dbmanager.dbmanager import DBManager
+from dbmanager.dbmanager import AsyncDBManager
 
 import exceptions as exc
 from auth.models import DDSUser
 from auth import scopes
 
+DEFAULT_AUTH_CACHE_TTL_SEC = 60
+DEFAULT_AUTH_CACHE_SIZE = 1024
+
+
+class AuthCache:
+    """TTL and LRU cache of validated credentials mapped to scopes.
+
+    API keys are stored as SHA-256 digests. Entries of a user are removed
+    with `invalidate` when the user changes, e.g. when roles are updated.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_AUTH_CACHE_TTL_SEC,
+        maxsize: int = DEFAULT_AUTH_CACHE_SIZE,
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(user_id: str, api_key: str) -> tuple[str, str]:
+        return (
+            str(UUID(user_id)),
+            hashlib.sha256(api_key.encode()).hexdigest(),
+        )
+
+    def get(self, user_id: str, api_key: str) -> list[str] | None:
+        """Get scopes of the user if the credentials were validated"""
+        key = self._get_key(user_id, api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, eligible_scopes = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(eligible_scopes)
+
+    def put(
+        self, user_id: str, api_key: str, eligible_scopes: list[str]
+    ) -> None:
+        """Store scopes of the user with validated credentials"""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        key = self._get_key(user_id, api_key)
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                tuple(eligible_scopes),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str | None = None) -> None:
+        """Remove cached credentials of the user or all of them
+        if `user_id` is `None`"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                return
+            user_id = str(UUID(user_id))
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def on_user_changed(self, notification: dict | None) -> None:
+        """Invalidate the cache based on the `user_changes` notification"""
+        user_id = None if notification is None else notification.get("user_id")
+        try:
+            self.invalidate(user_id)
+        except ValueError:
+            self.invalidate()
+
+
+auth_cache = AuthCache(
+    ttl=float(
+        os.environ.get("AUTH_CACHE_TTL_SEC", DEFAULT_AUTH_CACHE_TTL_SEC)
+    ),
+    maxsize=int(os.environ.get("AUTH_CACHE_SIZE", DEFAULT_AUTH_CACHE_SIZE)),
+)
+
 
 class DDSAuthenticationBackend(AuthenticationBackend):
     """Class managing authentication and authorization"""
@@ -19,15 +109,20 @@ class DDSAuthenticationBackend(AuthenticationBackend):
     async def authenticate(self, conn):
         """Authenticate user based on `User-Token` header"""
         if "User-Token" in conn.headers:
-            return self._manage_user_token_auth(conn.headers["User-Token"])
+            return await self._manage_user_token_auth(
+                conn.headers["User-Token"]
+            )
         return AuthCredentials([scopes.ANONYMOUS]), UnauthenticatedUser()
 
-    def _manage_user_token_auth(self, user_token: str):
+    async def _manage_user_token_auth(self, user_token: str):
         try:
             user_id, api_key = self.get_authorization_scheme_param(user_token)
         except exc.BaseDDSException as err:
             raise err.wrap_around_http_exception()
-        user_dto = DBManager().get_user_details(user_id)
+        eligible_scopes = auth_cache.get(user_id, api_key)
+        if eligible_scopes is not None:
+            return AuthCredentials(eligible_scopes), DDSUser(username=user_id)
+        user_dto = await AsyncDBManager().get_user_details(user_id)
         eligible_scopes = [scopes.AUTHENTICATED] + self._get_scopes_for_user(
             user_dto=user_dto
         )
@@ -35,6 +130,7 @@ class DDSAuthenticationBackend(AuthenticationBackend):
             raise exc.AuthenticationFailed(
                 user_dto
             ).wrap_around_http_exception()
+        auth_cache.put(user_id, api_key, eligible_scopes)
         return AuthCredentials(eligible_scopes), DDSUser(username=user_id)
 
     def _get_scopes_for_user(self, user_dto) -> list[str]:
@@ -0,0 +1,196 @@
+"""Module with the long-lived publisher of messages to the broker"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import pika
+from pika.exceptions import AMQPChannelError, AMQPConnectionError
+
+from utils.api_logging import get_dds_logger
+import exceptions as exc
+
+log = get_dds_logger(__name__)
+
+PUBLISH_RETRIES = 3
+PUBLISH_TIMEOUT_SEC = 30
+PUBLISHER_CONNECTIONS = 4
+IDLE_TIMEOUT_SEC = 1
+
+_publisher_lock = threading.Lock()
+_publisher = None
+
+
+class BrokerPublisher:
+    """Publisher keeping long-lived broker connections in dedicated threads.
+
+    pika connections are not thread-safe, so messages published from many
+    threads are passed through a queue to the publisher threads. Each
+    of them owns a connection, waits for the broker confirmation
+    and reconnects automatically if the connection is lost. Confirmations
+    are awaited one by one, so `connections` threads are kept to publish
+    messages of concurrent requests in parallel.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        retries: int = PUBLISH_RETRIES,
+        connections: int = PUBLISHER_CONNECTIONS,
+    ) -> None:
+        self.host = host
+        self.retries = retries
+        self._queue = queue.Queue()
+        # NOTE: state of the connection owned by the publisher thread
+        self._local = threading.local()
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"broker-publisher-{idx}", daemon=True
+            )
+            for idx in range(connections)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def publish(
+        self,
+        routing_key: str,
+        body: str,
+        properties: pika.BasicProperties | None = None,
+        timeout: float | None = PUBLISH_TIMEOUT_SEC,
+        headers: dict | None = None,
+    ) -> None:
+        """Publish the persistent message and wait until the broker confirms
+        it.
+
+        Parameters
+        ----------
+        routing_key : str
+            Name of the queue
+        body : str
+            Content of the message
+        properties : pika.BasicProperties, optional
+            Properties of the message. By default, the message is persistent
+        timeout : float, optional
+            Maximum time (in seconds) to wait for the confirmation
+        headers : dict, optional
+            Headers of the persistent message, used if `properties`
+            is not passed
+
+        Raises
+        ------
+        MessagePublishingError
+            If the message could not be published. Messages which were
+            not confirmed in time are withdrawn and never published
+        """
+        if properties is None:
+            properties = pika.BasicProperties(delivery_mode=2, headers=headers)
+        future = Future()
+        self._queue.put((routing_key, body, properties, future))
+        try:
+            try:
+                future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # NOTE: the cancelled message is skipped by publisher
+                # threads. If it is already being sent, its outcome is
+                # awaited, so that published requests are never reported
+                # as failed
+                if future.cancel():
+                    raise
+                future.result()
+        except Exception as err:
+            log.error(
+                "failed to publish message to `%s`: %s", routing_key, err
+            )
+            raise exc.MessagePublishingError() from err
+
+    def _connect(self) -> None:
+        self._close()
+        log.info("connecting to the broker `%s`...", self.host)
+        local = self._local
+        local.connection = pika.BlockingConnection(
+            pika.ConnectionParameters(host=self.host)
+        )
+        local.channel = local.connection.channel()
+        local.channel.confirm_delivery()
+        local.declared_queues = set()
+
+    def _close(self) -> None:
+        local = self._local
+        if local.connection is not None and local.connection.is_open:
+            try:
+                local.connection.close()
+            except Exception:
+                log.debug("failed to close broker connection", exc_info=True)
+        local.connection = local.channel = None
+
+    def _publish(self, routing_key, body, properties) -> None:
+        local = self._local
+        for attempt in range(1, self.retries + 1):
+            try:
+                if local.channel is None or not local.channel.is_open:
+                    self._connect()
+                if routing_key not in local.declared_queues:
+                    local.channel.queue_declare(
+                        queue=routing_key, durable=True
+                    )
+                    local.declared_queues.add(routing_key)
+                local.channel.basic_publish(
+                    exchange="",
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties,
+                )
+                return
+            except (AMQPConnectionError, AMQPChannelError) as err:
+                log.warning(
+                    "publishing attempt %d/%d failed: %s",
+                    attempt,
+                    self.retries,
+                    err,
+                )
+                self._close()
+                if attempt == self.retries:
+                    raise
+
+    def _run(self) -> None:
+        local = self._local
+        local.connection = local.channel = None
+        local.declared_queues = set()
+        while True:
+            try:
+                item = self._queue.get(timeout=IDLE_TIMEOUT_SEC)
+            except queue.Empty:
+                # NOTE: process heartbeats of the idle connection
+                if local.connection is not None and local.connection.is_open:
+                    try:
+                        local.connection.process_data_events(time_limit=0)
+                    except Exception:
+                        log.warning("broker connection lost", exc_info=True)
+                        self._close()
+                continue
+            routing_key, body, properties, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._publish(routing_key, body, properties)
+            except Exception as err:
+                future.set_exception(err)
+            else:
+                future.set_result(None)
+
+
+def get_broker_publisher() -> BrokerPublisher:
+    """Get the publisher shared by all requests of the API server"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = BrokerPublisher(
+                host=os.getenv("BROKER_SERVICE_HOST", "broker"),
+                connections=int(
+                    os.getenv(
+                        "BROKER_PUBLISHER_CONNECTIONS", PUBLISHER_CONNECTIONS
+                    )
+                ),
+            )
+        return _publisher
@@ -1,15 +1,60 @@
 """Module with functions call during API server startup"""
+import asyncio
+
+from aioprometheus import Gauge
+
 from utils.api_logging import get_dds_logger
 
 from datastore.datastore import Datastore
+from dbmanager.dbmanager import USER_CHANNEL, AsyncDBManager
+
+from auth.backend import auth_cache
+from notifications import get_notification_listener
 
 log = get_dds_logger(__name__)
 
+product_load_duration_seconds = Gauge(
+    "datastore_product_load_duration_seconds",
+    "Time of loading the product into the Datastore cache",
+)
+
+
+def _record_product_load_time(
+    dataset_id: str, product_id: str, load_time: float
+) -> None:
+    product_load_duration_seconds.set(
+        {"dataset": dataset_id, "product": product_id}, load_time
+    )
+
+
+async def _create_database() -> None:
+    # NOTE: create tables added since the database was initialized
+    await AsyncDBManager().create_database()
+
 
 def _load_cache() -> None:
     log.info("loading cache started...")
-    Datastore()._load_cache()
-    log.info("cache loaded succesfully!")
+    futures = Datastore().warm_up_cache(callback=_record_product_load_time)
+    log.info(
+        "catalog index loaded succesfully! loading %d products in the"
+        " background",
+        len(futures),
+    )
+
+
+_background_tasks = set()
+
+
+async def _listen_for_notifications() -> None:
+    listener = get_notification_listener()
+    listener.add_callback(USER_CHANNEL, auth_cache.on_user_changed)
+    task = asyncio.create_task(listener.keep_connected())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
-all_onstartup_callbacks = [_load_cache]
+all_onstartup_callbacks = [
+    _create_database,
+    _load_cache,
+    _listen_for_notifications,
+]
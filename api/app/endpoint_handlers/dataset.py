@@ -1,32 +1,164 @@
 """Modules realizing logic for dataset-related endpoints"""
 import os
-import pika
-from typing import Optional
-
-from fastapi.responses import FileResponse
-
-from dbmanager.dbmanager import DBManager, RequestStatus
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Mapping, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import xarray as xr
+from geokube.core.dataset import Dataset
+
+from dbmanager.dbmanager import (
+    AsyncDBManager,
+    RequestPriority,
+    RequestStatus,
+    is_true,
+)
 from geoquery.geoquery import GeoQuery
 from geoquery.task import TaskList
 from datastore.datastore import Datastore, DEFAULT_MAX_REQUEST_SIZE_GB
 from datastore import exception as datastore_exception
+from datastore.tile_cache import TileCache
 
 from utils.metrics import log_execution_time
 from utils.api_logging import get_dds_logger
-from auth.manager import (
-    is_role_eligible_for_product,
+from utils.points import (
+    extract_points,
+    find_grid_indices,
+    iter_csv,
+    iter_geojson,
 )
+from utils.rendering import render_tile
 import exceptions as exc
 from api_utils import make_bytes_readable_dict
+from broker import get_broker_publisher
+from notifications import get_notification_listener
 from validation import assert_product_exists
 
 from . import request
 
 log = get_dds_logger(__name__)
 data_store = Datastore()
+tile_cache = TileCache(
+    os.environ.get("CACHE_PATH"),
+    memory_size_bytes=int(
+        float(os.environ.get("TILE_CACHE_MEMORY_MB", 64)) * 1024**2
+    ),
+    disk_size_bytes=int(
+        float(os.environ.get("TILE_CACHE_DISK_GB", 1)) * 1024**3
+    ),
+)
 
 MESSAGE_SEPARATOR = os.environ["MESSAGE_SEPARATOR"]
 
+STATUS_RECHECK_SEC = 60
+HIGH_PRIORITY_MAX_SIZE_BYTES = int(
+    float(os.environ.get("HIGH_PRIORITY_MAX_SIZE_MB", 100)) * 1024**2
+)
+BULK_PRIORITY_MIN_SIZE_BYTES = int(
+    float(os.environ.get("BULK_PRIORITY_MIN_SIZE_GB", 1)) * 1024**3
+)
+RESULT_CACHE_ENABLED = is_true(os.environ.get("RESULT_CACHE_ENABLED", True))
+_PENDING_STATUSES = (
+    RequestStatus.PENDING,
+    RequestStatus.QUEUED,
+    RequestStatus.RUNNING,
+)
+
+MAP_RENDER_MAX_PIXELS = int(os.environ.get("MAP_RENDER_MAX_PIXELS", 2048**2))
+MAP_RENDER_MAX_SIZE_BYTES = int(
+    float(os.environ.get("MAP_RENDER_MAX_SIZE_MB", 64)) * 1024**2
+)
+_MAP_RENDER_CRS = (None, "", "EPSG:4326", "CRS:84")
+
+TILE_CACHE_MAX_AGE_SEC = int(os.environ.get("TILE_CACHE_MAX_AGE_SEC", 3600))
+
+GRID_INDEX_CACHE_SIZE = int(os.environ.get("GRID_INDEX_CACHE_SIZE", 100_000))
+
+_DATASETS_RESPONSE_CACHE: dict[tuple[str, frozenset], bytes] = {}
+_GRID_INDEX_CACHE: OrderedDict[tuple, dict[str, int]] = OrderedDict()
+_GRID_INDEX_LOCK = threading.Lock()
+_background_tasks = set()
+
+
+def _get_priority(
+    estimated_size_bytes: int | None, interactive: bool = False
+) -> RequestPriority:
+    if interactive:
+        return RequestPriority.HIGH
+    if estimated_size_bytes is None:
+        return RequestPriority.NORMAL
+    if estimated_size_bytes <= HIGH_PRIORITY_MAX_SIZE_BYTES:
+        return RequestPriority.HIGH
+    if estimated_size_bytes >= BULK_PRIORITY_MIN_SIZE_BYTES:
+        return RequestPriority.BULK
+    return RequestPriority.NORMAL
+
+
+def _get_result_cache_key(
+    dataset_id: str, product_id: str, query: GeoQuery
+) -> str:
+    content = json.dumps(
+        {
+            "dataset": dataset_id,
+            "product": product_id,
+            "catalog_version": data_store.catalog_version,
+            "query": query.canonical(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+async def _get_request_from_cache(cache_key: str, **request_kwargs):
+    db = AsyncDBManager()
+    cached_result = await db.get_cached_result(cache_key)
+    if cached_result is None:
+        return None
+    if not await run_in_threadpool(
+        os.path.exists, cached_result.location_path
+    ):
+        log.info("cached result `%s` no longer exists", cache_key)
+        await db.remove_cached_result(cache_key)
+        return None
+    return await db.create_request_from_cached_result(
+        cache_key, **request_kwargs
+    )
+
+
+async def _publish_request(
+    request_id: int,
+    message: str,
+    user_id: str,
+    priority: RequestPriority = RequestPriority.NORMAL,
+    cache_key: str | None = None,
+) -> None:
+    headers = {"user_id": str(user_id), "priority": priority.name}
+    if cache_key is not None:
+        headers["cache_key"] = cache_key
+        headers["catalog_version"] = data_store.catalog_version
+    try:
+        await run_in_threadpool(
+            get_broker_publisher().publish,
+            routing_key=priority.queue_name("query"),
+            body=message,
+            headers=headers,
+        )
+    except exc.MessagePublishingError:
+        await AsyncDBManager().update_request(
+            request_id=request_id,
+            status=RequestStatus.FAILED,
+            fail_reason="Request could not be scheduled",
+        )
+        raise
+
+
 def _is_etimate_enabled(dataset_id, product_id):
     if dataset_id in ("sentinel-2",):
         return False
@@ -34,13 +166,15 @@ def _is_etimate_enabled(dataset_id, product_id):
 
 
 @log_execution_time(log)
-def get_datasets(user_roles_names: list[str]) -> list[dict]:
+def get_datasets(user_roles_names: list[str]) -> Response:
     """Realize the logic for the endpoint:
 
     `GET /datasets`
 
     Get datasets names, their metadata and products names (if eligible for a user).
     If no eligible products are found for a dataset, it is not included.
+    The serialized response is cached per set of user's roles until
+    the catalog changes.
 
     Parameters
     ----------
@@ -49,60 +183,29 @@ def get_datasets(user_roles_names: list[str]) -> list[dict]:
 
     Returns
     -------
-    datasets : list of dict
-        A list of dictionaries with datasets information (including metadata and
-        eligible products lists)
-
-    Raises
-    -------
-    MissingKeyInCatalogEntryError
-        If the dataset catalog entry does not contain the required key
+    datasets : Response
+        JSON response with a list of dictionaries with datasets information
+        (including metadata and eligible products lists)
     """
-    log.debug(
-        "getting all eligible products for datasets...",
-    )
-    datasets = []
-    for dataset_id in data_store.dataset_list():
+    key = (data_store.catalog_version, frozenset(user_roles_names or ()))
+    if (content := _DATASETS_RESPONSE_CACHE.get(key)) is None:
         log.debug(
-            "getting info and eligible products for `%s`",
-            dataset_id,
+            "getting all eligible products for datasets for roles `%s`...",
+            user_roles_names,
         )
-        dataset_info = data_store.dataset_info(dataset_id=dataset_id)
-        try:
-            eligible_prods = {
-                prod_name: prod_info
-                for prod_name, prod_info in dataset_info["products"].items()
-                if is_role_eligible_for_product(
-                    product_role_name=prod_info.get("role"),
-                    user_roles_names=user_roles_names,
-                )
-            }
-        except KeyError as err:
-            log.error(
-                "dataset `%s` does not have products defined",
-                dataset_id,
-                exc_info=True,
-            )
-            raise exc.MissingKeyInCatalogEntryError(
-                key="products", dataset=dataset_id
-            ) from err
-        else:
-            if len(eligible_prods) == 0:
-                log.debug(
-                    "no eligible products for dataset `%s` for the role `%s`."
-                    " dataset skipped",
-                    dataset_id,
-                    user_roles_names,
-                )
-            else:
-                dataset_info["products"] = eligible_prods
-                datasets.append(dataset_info)
-    return datasets
+        datasets = data_store.eligible_datasets_info(role=user_roles_names)
+        content = json.dumps(jsonable_encoder(datasets)).encode()
+        # NOTE: responses cached for the previous catalog versions are stale
+        for cached_key in list(_DATASETS_RESPONSE_CACHE):
+            if cached_key[0] != key[0]:
+                _DATASETS_RESPONSE_CACHE.pop(cached_key, None)
+        _DATASETS_RESPONSE_CACHE[key] = content
+    return Response(content=content, media_type="application/json")
 
 
 @log_execution_time(log)
 @assert_product_exists
-def get_product_details(
+async def get_product_details(
     user_roles_names: list[str],
     dataset_id: str,
     product_id: Optional[str] = None,
@@ -139,15 +242,19 @@ def get_product_details(
     )
     try:
         if product_id:
-            return data_store.product_details(
+            return await run_in_threadpool(
+                data_store.product_details,
                 dataset_id=dataset_id,
                 product_id=product_id,
                 role=user_roles_names,
                 use_cache=True,
             )
         else:
-            return data_store.first_eligible_product_details(
-                dataset_id=dataset_id, role=user_roles_names, use_cache=True
+            return await run_in_threadpool(
+                data_store.first_eligible_product_details,
+                dataset_id=dataset_id,
+                role=user_roles_names,
+                use_cache=True,
             )
     except datastore_exception.UnauthorizedError as err:
         raise exc.AuthorizationFailed from err
@@ -155,7 +262,7 @@ def get_product_details(
 
 @log_execution_time(log)
 @assert_product_exists
-def get_metadata(dataset_id: str, product_id: str):
+async def get_metadata(dataset_id: str, product_id: str):
     """Realize the logic for the endpoint:
 
     `GET /datasets/{dataset_id}/{product_id}/metadata`
@@ -172,12 +279,14 @@ def get_metadata(dataset_id: str, product_id: str):
     log.debug(
         "getting metadata for '{dataset_id}.{product_id}'",
     )
-    return data_store.product_metadata(dataset_id, product_id)
+    return await run_in_threadpool(
+        data_store.product_metadata, dataset_id, product_id
+    )
 
 
 @log_execution_time(log)
 @assert_product_exists
-def estimate(
+async def estimate(
     dataset_id: str,
     product_id: str,
     query: GeoQuery,
@@ -213,7 +322,9 @@ def estimate(
         }
         ```
     """
-    query_bytes_estimation = data_store.estimate(dataset_id, product_id, query)
+    query_bytes_estimation = await run_in_threadpool(
+        data_store.estimate, dataset_id, product_id, query
+    )
     return make_bytes_readable_dict(
         size_bytes=query_bytes_estimation, units=unit
     )
@@ -221,17 +332,23 @@ def estimate(
 
 @log_execution_time(log)
 @assert_product_exists
-def async_query(
+async def async_query(
     user_id: str,
     dataset_id: str,
     product_id: str,
     query: GeoQuery,
+    interactive: bool = False,
 ):
     """Realize the logic for the endpoint:
 
     `POST /datasets/{dataset_id}/{product_id}/execute`
 
     Query the data and return the ID of the request.
+    If the result of the identical query is cached, the finished request
+    sharing the existing artifact is created. Otherwise, the request
+    is scheduled in the lane based on the estimated size: small and
+    interactive requests get high priority, large ones are processed
+    in the bulk lane.
 
     Parameters
     ----------
@@ -243,6 +360,8 @@ def async_query(
         ID of the product
     query : GeoQuery
         Query to perform
+    interactive : bool, default=False
+        If the request is sent by the interactive client (e.g. for maps)
 
     Returns
     -------
@@ -258,9 +377,20 @@ def async_query(
 
     """
     log.debug("geoquery: %s", query)
+    estimated_size_bytes = None
     if _is_etimate_enabled(dataset_id, product_id):
-        estimated_size = estimate(dataset_id, product_id, query, "GB").get("value")
-        allowed_size = data_store.product_metadata(dataset_id, product_id).get(
+        # NOTE: estimation might read the product, so it is run
+        # in the thread pool not to block the event loop
+        estimated_size_bytes = await run_in_threadpool(
+            data_store.estimate, dataset_id, product_id, query
+        )
+        estimated_size = make_bytes_readable_dict(
+            size_bytes=estimated_size_bytes, units="GB"
+        ).get("value")
+        metadata = await run_in_threadpool(
+            data_store.product_metadata, dataset_id, product_id
+        )
+        allowed_size = metadata.get(
             "maximum_query_size_gb", DEFAULT_MAX_REQUEST_SIZE_GB
         )
         if estimated_size > allowed_size:
@@ -274,39 +404,65 @@ def async_query(
             raise exc.EmptyDatasetError(
                 dataset_id=dataset_id, product_id=product_id
             )
-    broker_conn = pika.BlockingConnection(
-        pika.ConnectionParameters(
-            host=os.getenv("BROKER_SERVICE_HOST", "broker")
-        )
-    )
-    broker_channel = broker_conn.channel()
-
-    request_id = DBManager().create_request(
+    priority = _get_priority(estimated_size_bytes, interactive=interactive)
+    request_kwargs = dict(
         user_id=user_id,
         dataset=dataset_id,
         product=product_id,
         query=query.original_query_json(),
+        priority=priority,
+        estimate_size_bytes=estimated_size_bytes,
     )
+    cache_key = None
+    if RESULT_CACHE_ENABLED:
+        cache_key = _get_result_cache_key(dataset_id, product_id, query)
+        request_id = await _get_request_from_cache(
+            cache_key, **request_kwargs
+        )
+        if request_id is not None:
+            log.debug("request %s served from the result cache", request_id)
+            return request_id
+    request_id = await AsyncDBManager().create_request(**request_kwargs)
 
     # TODO: find a separator; for the moment use "\"
     message = MESSAGE_SEPARATOR.join(
         [str(request_id), "query", dataset_id, product_id, query.json()]
     )
 
-    broker_channel.basic_publish(
-        exchange="",
-        routing_key="query_queue",
-        body=message,
-        properties=pika.BasicProperties(
-            delivery_mode=2,  # make message persistent
-        ),
+    await _publish_request(
+        request_id=request_id,
+        message=message,
+        user_id=user_id,
+        priority=priority,
+        cache_key=cache_key,
     )
-    broker_conn.close()
     return request_id
 
+async def _wait_for_request_completion(request_id: int) -> RequestStatus:
+    listener = get_notification_listener()
+    while True:
+        # NOTE: subscribe before reading the status not to miss
+        # the notification sent in the meantime
+        waiter = await listener.subscribe(request_id)
+        try:
+            status, _ = await AsyncDBManager().get_request_status_and_reason(
+                request_id
+            )
+            log.debug("sync query: status: %s", status)
+            if status not in _PENDING_STATUSES:
+                return status
+            # NOTE: the status is checked again after the timeout in case
+            # the notification was lost
+            await asyncio.wait_for(waiter, timeout=STATUS_RECHECK_SEC)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            listener.unsubscribe(request_id, waiter)
+
+
 @log_execution_time(log)
 @assert_product_exists
-def sync_query(
+async def sync_query(
     user_id: str,
     dataset_id: str,
     product_id: str,
@@ -342,20 +498,15 @@ def sync_query(
         if estimated size is zero
 
     """
-    
-    import time
-    request_id = async_query(user_id, dataset_id, product_id, query)
-    status, _ = DBManager().get_request_status_and_reason(request_id)
-    log.debug("sync query: status: %s", status)
-    while status in (RequestStatus.RUNNING, RequestStatus.QUEUED, 
-                     RequestStatus.PENDING):
-        time.sleep(1)
-        status, _ = DBManager().get_request_status_and_reason(request_id)
-        log.debug("sync query: status: %s", status)
-    
+    request_id = await async_query(
+        user_id, dataset_id, product_id, query, interactive=True
+    )
+    status = await _wait_for_request_completion(request_id)
     if status is RequestStatus.DONE:
-        download_details = DBManager().get_download_details_for_request_id(
+        download_details = (
+            await AsyncDBManager().get_download_details_for_request_id(
                 request_id
+            )
         )
         return FileResponse(
             path=download_details.location_path,
@@ -367,8 +518,325 @@ def sync_query(
         status=status.name)
 
 
+def _is_renderable(dataset_id: str, product_id: str, query: GeoQuery) -> bool:
+    format_args = query.format_args or {}
+    if query.format not in ("png", "jpeg"):
+        return False
+    if str(format_args.get("projection") or "").upper() not in _MAP_RENDER_CRS:
+        return False
+    if int(format_args["width"]) * int(format_args["height"]) > (
+        MAP_RENDER_MAX_PIXELS
+    ):
+        return False
+    if not _is_etimate_enabled(dataset_id, product_id):
+        return False
+    return (
+        0
+        < data_store.estimate(dataset_id, product_id, query)
+        <= MAP_RENDER_MAX_SIZE_BYTES
+    )
+
+
+def _render_map(
+    dataset_id: str, product_id: str, query: GeoQuery
+) -> bytes | None:
+    # NOTE: the product kept in memory is queried, so that the source
+    # files are not reopened for every tile
+    kube = data_store.query_cached_product(dataset_id, product_id, query)
+    if isinstance(kube, Dataset):
+        return None
+    data = kube.to_xarray(encoding=False)
+    if not isinstance(data, xr.DataArray):
+        if len(data.data_vars) != 1:
+            return None
+        data = next(iter(data.data_vars.values()))
+    format_args = query.format_args
+    area = query.area or {}
+    bbox = None
+    if area:
+        bbox = (area["west"], area["south"], area["east"], area["north"])
+    try:
+        return render_tile(
+            data,
+            width=int(format_args["width"]),
+            height=int(format_args["height"]),
+            bbox=bbox,
+            format=query.format,
+            cmap=format_args.get("cmap") or "RdBu_r",
+            vmin=format_args.get("vmin"),
+            vmax=format_args.get("vmax"),
+            transparent=bool(format_args.get("transparent", True)),
+            bgcolor=format_args.get("bgcolor") or "FFFFFF",
+        )
+    except ValueError as err:
+        log.debug("map cannot be rendered in-process: %s", err)
+        return None
+
+
+def _cache_rendered_map(cache_key: str, path: str) -> None:
+    if os.path.getsize(path) <= tile_cache.memory_size_bytes:
+        with open(path, "rb") as file:
+            tile_cache.put(cache_key, file.read())
+
+
+def _get_map_headers(cache_key: str) -> dict[str, str]:
+    return {
+        "ETag": f'"{cache_key}"',
+        "Cache-Control": f"public, max-age={TILE_CACHE_MAX_AGE_SEC}",
+    }
+
+
+async def _render_and_cache_map(
+    dataset_id: str, product_id: str, query: GeoQuery, cache_key: str
+) -> bytes | None:
+    if not await run_in_threadpool(
+        _is_renderable, dataset_id, product_id, query
+    ):
+        return None
+    image = await run_in_threadpool(_render_map, dataset_id, product_id, query)
+    if image is not None:
+        await run_in_threadpool(tile_cache.put, cache_key, image)
+    return image
+
+
 @log_execution_time(log)
-def run_workflow(
+@assert_product_exists
+async def get_map(
+    user_id: str,
+    dataset_id: str,
+    product_id: str,
+    query: GeoQuery,
+    headers: Mapping[str, str] | None = None,
+):
+    """Realize the logic for the endpoint:
+
+    `GET /datasets/{dataset_id}/{product_id}/map`
+
+    Render the map of the product. Small maps on regular lat/lon grids
+    are rendered in-process from the product kept in memory.
+    Other maps are produced by the executor like for `sync_query`.
+    Maps are cached in memory and on the disk under the key of
+    the canonical query and the catalog version, which is also the ETag.
+
+    Parameters
+    ----------
+    user_id : str
+        ID of the user executing the query
+    dataset_id : str
+        ID of the dataset
+    product_id : str
+        ID of the product
+    query : GeoQuery
+        Query with `width` and `height` of the map in `format_args`
+    headers : mapping, optional
+        Headers of the HTTP request
+
+    Returns
+    -------
+    response : Response
+        Response with the image of the map
+    """
+    cache_key = _get_result_cache_key(dataset_id, product_id, query)
+    response_headers = _get_map_headers(cache_key)
+    if_none_match = (headers or {}).get("if-none-match", "")
+    if response_headers["ETag"] in if_none_match or if_none_match == "*":
+        return Response(status_code=304, headers=response_headers)
+    media_type = f"image/{query.format}"
+    image = await run_in_threadpool(tile_cache.get, cache_key)
+    if image is None:
+        image = await _render_and_cache_map(
+            dataset_id, product_id, query, cache_key
+        )
+    if image is not None:
+        return Response(
+            content=image, media_type=media_type, headers=response_headers
+        )
+    log.debug("map of '%s.%s' is rendered by the executor", dataset_id, product_id)
+    response = await sync_query(user_id, dataset_id, product_id, query)
+    await run_in_threadpool(_cache_rendered_map, cache_key, response.path)
+    response.headers.update(response_headers)
+    return response
+
+
+async def _seed_map_tiles(
+    dataset_id: str, product_id: str, queries: list[GeoQuery]
+) -> None:
+    rendered = 0
+    for query in queries:
+        cache_key = _get_result_cache_key(dataset_id, product_id, query)
+        if await run_in_threadpool(tile_cache.get, cache_key) is not None:
+            continue
+        try:
+            image = await _render_and_cache_map(
+                dataset_id, product_id, query, cache_key
+            )
+        except Exception as err:
+            log.warning("failed to seed the map tile: %s", err)
+            continue
+        rendered += image is not None
+    log.info(
+        "seeded %d of %d map tiles of '%s.%s'",
+        rendered,
+        len(queries),
+        dataset_id,
+        product_id,
+    )
+
+
+@log_execution_time(log)
+@assert_product_exists
+async def seed_map_tiles(
+    dataset_id: str, product_id: str, queries: list[GeoQuery]
+) -> dict:
+    """Realize the logic for the endpoint:
+
+    `POST /datasets/{dataset_id}/{product_id}/map/seed`
+
+    Render the maps in the background and store them in the tile cache,
+    so that the subsequent identical requests are served from the cache.
+    Only maps which can be rendered in-process are seeded.
+
+    Parameters
+    ----------
+    dataset_id : str
+        ID of the dataset
+    product_id : str
+        ID of the product
+    queries : list of GeoQuery
+        Queries of the maps
+
+    Returns
+    -------
+    result : dict
+        Number of the scheduled tiles
+    """
+    task = asyncio.create_task(
+        _seed_map_tiles(dataset_id, product_id, queries)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return {"scheduled_tiles": len(queries)}
+
+
+def _get_grid_indices(
+    dataset_id: str,
+    product_id: str,
+    dset: xr.Dataset,
+    points: list[tuple[float, float]],
+) -> list[dict[str, int]]:
+    """Get indices of grid cells nearest to the points, resolving only
+    points missing in the cache"""
+    # NOTE: variables of the product might be defined on different grids
+    grid_key = (
+        dataset_id,
+        product_id,
+        data_store.catalog_version,
+        tuple(sorted(dset.data_vars)),
+    )
+    keys = [(*grid_key, point) for point in points]
+    with _GRID_INDEX_LOCK:
+        missing = [key for key in keys if key not in _GRID_INDEX_CACHE]
+    indices = dict(
+        zip(missing, find_grid_indices(dset, [key[-1] for key in missing]))
+    )
+    with _GRID_INDEX_LOCK:
+        for key in keys:
+            if key in indices:
+                _GRID_INDEX_CACHE[key] = indices[key]
+            else:
+                indices[key] = _GRID_INDEX_CACHE[key]
+                _GRID_INDEX_CACHE.move_to_end(key)
+        while len(_GRID_INDEX_CACHE) > GRID_INDEX_CACHE_SIZE:
+            _GRID_INDEX_CACHE.popitem(last=False)
+    return [indices[key] for key in keys]
+
+
+def _extract_points(
+    dataset_id: str,
+    product_id: str,
+    query: GeoQuery,
+    points: list[tuple[float, float]],
+):
+    kube = data_store.query_cached_product(dataset_id, product_id, query)
+    if isinstance(kube, Dataset):
+        return None
+    dset = kube.to_xarray(encoding=False)
+    if isinstance(dset, xr.DataArray):
+        dset = dset.to_dataset()
+    try:
+        indices = _get_grid_indices(dataset_id, product_id, dset, points)
+    except ValueError as err:
+        log.debug("points cannot be extracted in-process: %s", err)
+        return None
+    values = extract_points(dset, indices)
+    if query.format == "csv":
+        return iter_csv(values)
+    return iter_geojson(values, points)
+
+
+@log_execution_time(log)
+@assert_product_exists
+async def get_points(
+    user_id: str,
+    dataset_id: str,
+    product_id: str,
+    query: GeoQuery,
+    points: list[tuple[float, float]],
+):
+    """Realize the logic for the endpoint:
+
+    `GET /datasets/{dataset_id}/{product_id}/items/{feature_id}`
+
+    Extract values at the points. Grid cells nearest to the points
+    are found with bisection of coordinates and cached, so only chunks
+    containing the cells are read. The result is streamed as GeoJSON
+    or CSV. Points on grids which are not rectilinear are extracted
+    by the executor like for `sync_query`.
+
+    Parameters
+    ----------
+    user_id : str
+        ID of the user executing the query
+    dataset_id : str
+        ID of the dataset
+    product_id : str
+        ID of the product
+    query : GeoQuery
+        Query with the variables, the time and the format (`geojson`
+        or `csv`)
+    points : list of tuple of float
+        Longitudes and latitudes of points
+
+    Returns
+    -------
+    response : Response
+        Response with values at the points
+    """
+    content = await run_in_threadpool(
+        _extract_points, dataset_id, product_id, query, points
+    )
+    if content is not None:
+        return StreamingResponse(
+            content,
+            media_type=(
+                "text/csv" if query.format == "csv" else "application/geo+json"
+            ),
+        )
+    log.debug(
+        "points of '%s.%s' are extracted by the executor",
+        dataset_id,
+        product_id,
+    )
+    lons, lats = zip(*points)
+    query = GeoQuery(
+        **query.dict(exclude={"location"}),
+        location={"longitude": list(lons), "latitude": list(lats)},
+    )
+    return await sync_query(user_id, dataset_id, product_id, query)
+
+
+@log_execution_time(log)
+async def run_workflow(
     user_id: str,
     workflow: TaskList,
 ):
@@ -399,17 +867,12 @@ def run_workflow(
 
     """
     log.debug("geoquery: %s", workflow)
-    broker_conn = pika.BlockingConnection(
-        pika.ConnectionParameters(
-            host=os.getenv("BROKER_SERVICE_HOST", "broker")
-        )
-    )
-    broker_channel = broker_conn.channel()
-    request_id = DBManager().create_request(
+    request_id = await AsyncDBManager().create_request(
         user_id=user_id,
         dataset=workflow.dataset_id,
         product=workflow.product_id,
         query=workflow.json(),
+        priority=RequestPriority.NORMAL,
     )
 
     # TODO: find a separator; for the moment use "\"
@@ -417,13 +880,7 @@ def run_workflow(
         [str(request_id), "workflow", workflow.json()]
     )
 
-    broker_channel.basic_publish(
-        exchange="",
-        routing_key="query_queue",
-        body=message,
-        properties=pika.BasicProperties(
-            delivery_mode=2,  # make message persistent
-        ),
+    await _publish_request(
+        request_id=request_id, message=message, user_id=user_id
     )
-    broker_conn.close()
     return request_id
@@ -1,42 +1,242 @@
 """Module with functions to handle file related endpoints"""
 import io
 import os
+import json
+import hashlib
 import zipfile
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Mapping
 from pathlib import Path
 from zipfile import ZipFile
 
 from fastapi.responses import FileResponse
 
 
-from dbmanager.dbmanager import DBManager, RequestStatus
+from dbmanager.dbmanager import AsyncDBManager, RequestStatus
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from starlette.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from starlette.staticfiles import StaticFiles
 
 from utils.api_logging import get_dds_logger
+from utils.archive import iter_zip_stream
 from utils.metrics import log_execution_time
 import exceptions as exc
 
 log = get_dds_logger(__name__)
 
+RANGE_CHUNK_SIZE = 1024**2
+
+
+def _get_etag(download, path: str) -> str:
+    """Get the strong ETag of the file based on the `Download` row.
+    The result of the request is never modified once it is done."""
+    key = ":".join(
+        map(
+            str,
+            [
+                download.download_id,
+                download.location_path,
+                download.size_bytes,
+                download.created_on,
+                os.path.relpath(path, download.location_path),
+            ],
+        )
+    )
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def _get_last_modified(download, path: str) -> datetime:
+    if download.created_on is not None:
+        # NOTE: `created_on` is stored in the local time
+        modified = download.created_on.astimezone(timezone.utc)
+    else:
+        modified = datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc)
+    return modified.replace(microsecond=0)
+
+
+def _is_not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: datetime
+) -> bool:
+    # NOTE: `If-None-Match` takes precedence over `If-Modified-Since`
+    # (RFC 9110, section 13.2.2)
+    if (if_none_match := headers.get("if-none-match")) is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if (if_modified_since := headers.get("if-modified-since")) is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Get the first and the last byte of the single range.
+
+    Returns
+    -------
+    range : tuple of int or None
+        Inclusive byte range or `None` if the header should be ignored
+
+    Raises
+    -------
+    ValueError
+        If the range is not satisfiable
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # NOTE: multipart ranges are not supported, so the whole file
+        # is sent, which is permitted by RFC 9110
+        return None
+    first, sep, last = ranges.strip().partition("-")
+    if not sep or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first:
+        # NOTE: suffix range with the number of last bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError(f"range `{range_header}` is not satisfiable")
+        return max(size - int(last), 0), size - 1
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    first = int(first)
+    if first >= size:
+        raise ValueError(f"range `{range_header}` is not satisfiable")
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        return None
+    return first, last
+
+
+def _iter_file_range(path: str, first: int, last: int):
+    with open(path, "rb") as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0 and (
+            chunk := file.read(min(RANGE_CHUNK_SIZE, remaining))
+        ):
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _file_response(
+    path: str, filename: str, download, headers: Mapping[str, str]
+) -> Response:
+    """Prepare the response with the file, supporting conditional
+    and range requests"""
+    etag = _get_etag(download, path)
+    last_modified = _get_last_modified(download, path)
+    response_headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if _is_not_modified(headers, etag, last_modified):
+        return Response(status_code=304, headers=response_headers)
+    size = os.stat(path).st_size
+    range_header = headers.get("range")
+    if_range = headers.get("if-range")
+    if range_header and if_range is not None and if_range.strip() != etag:
+        # NOTE: the file was changed, so the whole file is sent
+        range_header = None
+    try:
+        byte_range = _parse_range(range_header, size) if range_header else None
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers=response_headers | {"Content-Range": f"bytes */{size}"},
+        )
+    if byte_range is None:
+        return FileResponse(
+            path=path, filename=filename, headers=response_headers
+        )
+    first, last = byte_range
+    log.debug("sending bytes %d-%d/%d of '%s'", first, last, size, path)
+    return StreamingResponse(
+        _iter_file_range(path, first, last),
+        status_code=206,
+        media_type=guess_type(filename)[0] or "application/octet-stream",
+        headers=response_headers
+        | {
+            "Content-Range": f"bytes {first}-{last}/{size}",
+            "Content-Length": str(last - first + 1),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
+
+
+async def _get_download_details(request_id: int):
+    """Get the `Download` row of the finished request with the existing
+    result, reading the status and the location in a single query"""
+    (
+        request_status,
+        download_details,
+    ) = await AsyncDBManager().get_request_status_and_download(
+        request_id=request_id
+    )
+    if request_status is not RequestStatus.DONE or download_details is None:
+        log.debug(
+            "request with id: '%s' does not exist or it is not finished yet!",
+            request_id,
+        )
+        raise exc.RequestNotYetAccomplished(request_id=request_id)
+    if not os.path.exists(download_details.location_path):
+        log.error(
+            "file '%s' does not exists!",
+            download_details.location_path,
+        )
+        raise FileNotFoundError
+    return download_details
+
+
+def _get_store_member(store_path: str, key: str) -> str:
+    """Get the path of the file within the store, preventing access
+    to files outside of it"""
+    path = os.path.realpath(os.path.join(store_path, key))
+    if not path.startswith(
+        os.path.realpath(store_path) + os.sep
+    ) or not os.path.isfile(path):
+        raise FileNotFoundError
+    return path
+
+
 @log_execution_time(log)
-def download_request_result(request_id: int, filename: str = None):
+async def download_request_result(
+    request_id: int,
+    filename: str = None,
+    headers: Mapping[str, str] | None = None,
+):
     """Realize the logic for the endpoint:
 
     `GET /download/{request_id}`
 
-    Get location path of the file being the result of
-    the request with `request_id`.
+    Get the file being the result of the request with `request_id`.
+    Byte-range and conditional requests (`Range`, `If-Range`,
+    `If-None-Match` and `If-Modified-Since` headers) are supported.
 
     Parameters
     ----------
     request_id : int
         ID of the request
+    filename : str, optional
+        Name of the file within the Zarr store
+    headers : mapping, optional
+        Headers of the HTTP request
 
     Returns
     -------
-    path : str
-        The location of the resulting file
+    response : Response
+        Response with the resulting file
 
     Raises
     -------
@@ -49,34 +249,183 @@ def download_request_result(request_id: int, filename: str = None):
         "preparing downloads for request id: %s",
         request_id,
     )
-    (
-        request_status,
-        _,
-    ) = DBManager().get_request_status_and_reason(request_id=request_id)
-    if request_status is not RequestStatus.DONE:
-        log.debug(
-            "request with id: '%s' does not exist or it is not finished yet!",
-            request_id,
-        )
-        raise exc.RequestNotYetAccomplished(request_id=request_id)
-    download_details = DBManager().get_download_details_for_request(
-        request_id=request_id
-    )
-    if not os.path.exists(download_details.location_path):
-        log.error(
-            "file '%s' does not exists!",
-            download_details.location_path,
-        )
-        raise FileNotFoundError
+    headers = headers or {}
+    download_details = await _get_download_details(request_id)
 
     if download_details.location_path.endswith(".zarr"):
         log.info("Zarr detected")
-        return FileResponse(
-            path=f'{download_details.location_path}/{filename}',
-            filename=filename,
+        path = _get_store_member(download_details.location_path, filename or "")
+        return _file_response(
+            path, filename.split("/")[-1], download_details, headers
+        )
+    elif os.path.isdir(download_details.location_path):
+        # NOTE: multi-file results are zipped on the fly, so the archive
+        # is never materialized on the disk or in memory
+        log.info("streaming ZIP archive of the directory")
+        location_path = download_details.location_path.rstrip(os.sep)
+        return StreamingResponse(
+            iter_zip_stream(
+                sorted(
+                    str(path)
+                    for path in Path(location_path).iterdir()
+                    if path.is_file()
+                )
+            ),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": (
+                    f'attachment; filename="{os.path.basename(location_path)}.zip"'
+                )
+            },
         )
     else:
-        return FileResponse(
-            path=download_details.location_path,
-            filename=download_details.location_path.split(os.sep)[-1],
+        return _file_response(
+            download_details.location_path,
+            download_details.location_path.split(os.sep)[-1],
+            download_details,
+            headers,
         )
+
+
+ZARR_METADATA_KEYS = (".zgroup", ".zattrs", ".zarray")
+ZARR_BATCH_MAX_KEYS = int(os.environ.get("ZARR_BATCH_MAX_KEYS", 1000))
+
+
+async def _get_zarr_store(request_id: int):
+    download_details = await _get_download_details(request_id)
+    if not (
+        download_details.location_path.rstrip(os.sep).endswith(".zarr")
+        and os.path.isdir(download_details.location_path)
+    ):
+        raise exc.NotZarrStoreError(request_id=request_id)
+    return download_details
+
+
+def _consolidate_metadata(store_path: str) -> dict:
+    """Collect the metadata of all groups and arrays of the Zarr v2 store
+    in the format of the consolidated `.zmetadata` key"""
+    metadata = {}
+    for root, _, files in os.walk(store_path):
+        for name in files:
+            if name not in ZARR_METADATA_KEYS:
+                continue
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, store_path).replace(os.sep, "/")
+            with open(path, "rb") as file:
+                metadata[key] = json.load(file)
+    return {"zarr_consolidated_format": 1, "metadata": metadata}
+
+
+@log_execution_time(log)
+async def get_zarr_key(
+    request_id: int, key: str, headers: Mapping[str, str] | None = None
+):
+    """Realize the logic for the endpoint:
+
+    `GET /zarr/{request_id}/{key}`
+
+    Get the key (metadata or a chunk) of the Zarr store being the result
+    of the request, so that the store can be read lazily, e.g. with
+    `xarray.open_zarr`. Byte-range and conditional requests are supported.
+    If the consolidated `.zmetadata` key is missing, it is generated.
+
+    Parameters
+    ----------
+    request_id : int
+        ID of the request
+    key : str
+        Key of the Zarr store
+    headers : mapping, optional
+        Headers of the HTTP request
+
+    Returns
+    -------
+    response : Response
+        Response with the content of the key
+
+    Raises
+    -------
+    RequestNotYetAccomplished
+        If dds request was not yet finished
+    NotZarrStoreError
+        If the result is not a Zarr store
+    FileNotFoundError
+        If the key does not exist, e.g. for chunks with fill values only
+        or `.zmetadata` of Zarr v3 stores
+    """
+    headers = headers or {}
+    download_details = await _get_zarr_store(request_id)
+    store_path = download_details.location_path
+    try:
+        path = _get_store_member(store_path, key)
+    except FileNotFoundError:
+        if key != ".zmetadata":
+            raise
+        # NOTE: Zarr v3 stores keep consolidated metadata in `zarr.json`
+        if not os.path.isfile(os.path.join(store_path, ".zgroup")):
+            raise
+        log.debug("consolidating metadata of the store: '%s'", store_path)
+        path = os.path.join(store_path, key)
+        etag = _get_etag(download_details, path)
+        response_headers = {"ETag": etag}
+        if _is_not_modified(
+            headers, etag, _get_last_modified(download_details, store_path)
+        ):
+            return Response(status_code=304, headers=response_headers)
+        return JSONResponse(
+            _consolidate_metadata(store_path), headers=response_headers
+        )
+    return _file_response(
+        path, key.split("/")[-1], download_details, headers
+    )
+
+
+@log_execution_time(log)
+async def get_zarr_keys(request_id: int, keys: list[str]):
+    """Realize the logic for the endpoint:
+
+    `POST /zarr/{request_id}`
+
+    Get many keys of the Zarr store in a single response. The keys are
+    streamed as members of the uncompressed ZIP archive, named after
+    the keys. Missing keys are skipped, as they denote chunks
+    with fill values only.
+
+    Parameters
+    ----------
+    request_id : int
+        ID of the request
+    keys : list of str
+        Keys of the Zarr store
+
+    Returns
+    -------
+    response : StreamingResponse
+        ZIP archive with the keys
+
+    Raises
+    -------
+    RequestNotYetAccomplished
+        If dds request was not yet finished
+    NotZarrStoreError
+        If the result is not a Zarr store
+    TooManyZarrKeysError
+        If more than `ZARR_BATCH_MAX_KEYS` keys were requested
+    """
+    if len(keys) > ZARR_BATCH_MAX_KEYS:
+        raise exc.TooManyZarrKeysError(
+            n_keys=len(keys), max_keys=ZARR_BATCH_MAX_KEYS
+        )
+    download_details = await _get_zarr_store(request_id)
+    store_path = os.path.realpath(download_details.location_path)
+    paths = []
+    for key in dict.fromkeys(keys):
+        try:
+            paths.append(_get_store_member(store_path, key))
+        except FileNotFoundError:
+            log.debug("key '%s' not found in '%s'", key, store_path)
+    # NOTE: chunks are already compressed with Zarr codecs
+    return StreamingResponse(
+        iter_zip_stream(paths, stored_suffixes=("",), root=store_path),
+        media_type="application/zip",
+    )
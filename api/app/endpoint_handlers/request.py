@@ -1,5 +1,5 @@
 """Modules with functions realizing logic for requests-related endpoints"""
-from dbmanager.dbmanager import DBManager
+from dbmanager.dbmanager import AsyncDBManager
 
 from utils.api_logging import get_dds_logger
 from utils.metrics import log_execution_time
@@ -9,7 +9,7 @@ log = get_dds_logger(__name__)
 
 
 @log_execution_time(log)
-def get_requests(user_id: str):
+async def get_requests(user_id: str):
     """Realize the logic for the endpoint:
 
     `GET /requests`
@@ -26,17 +26,18 @@ def get_requests(user_id: str):
     requests : list
         List of all requests done by the user
     """
-    return DBManager().get_requests_for_user_id(user_id=user_id)
+    return await AsyncDBManager().get_requests_for_user_id(user_id=user_id)
 
 
 @log_execution_time(log)
-def get_request_status(user_id: str, request_id: int):
+async def get_request_status(user_id: str, request_id: int):
     """Realize the logic for the endpoint:
 
     `GET /requests/{request_id}/status`
 
     Get request status and the reason of the eventual fail.
     The second item is `None`, it status is other than failed.
+    The progress is the fraction of the result written so far, if reported.
 
     Parameters
     ----------
@@ -47,23 +48,26 @@ def get_request_status(user_id: str, request_id: int):
 
     Returns
     -------
-    status : tuple
-        Tuple of status and fail reason.
+    status : dict
+        Status, fail reason and progress of the request
     """
     # NOTE: maybe verification should be added if user checks only him\her requests
     try:
-        status, reason = DBManager().get_request_status_and_reason(request_id)
+        status, reason = await AsyncDBManager().get_request_status_and_reason(
+            request_id
+        )
     except IndexError as err:
         log.error(
             "request with id: '%s' was not found!",
             request_id,
         )
         raise exc.RequestNotFound(request_id=request_id) from err
-    return {"status": status.name, "fail_reason": reason}
+    progress = await AsyncDBManager().get_request_progress(request_id)
+    return {"status": status.name, "fail_reason": reason, "progress": progress}
 
 
 @log_execution_time(log)
-def get_request_resulting_size(request_id: int):
+async def get_request_resulting_size(request_id: int):
     """Realize the logic for the endpoint:
 
     `GET /requests/{request_id}/size`
@@ -85,7 +89,12 @@ def get_request_resulting_size(request_id: int):
     RequestNotFound
         If the request was not found
     """
-    if request := DBManager().get_request_details(request_id):
+    if request := await AsyncDBManager().get_request_details(request_id):
+        if request.download is None:
+            # NOTE: downloads of cached artifacts expire
+            raise exc.RequestStatusNotDone(
+                request_id=request_id, request_status=request.status
+            )
         size = request.download.size_bytes
         if not size or size == 0:
             raise exc.EmptyDatasetError(dataset_id=request.dataset, 
@@ -99,7 +108,7 @@ def get_request_resulting_size(request_id: int):
 
 
 @log_execution_time(log)
-def get_request_uri(request_id: int):
+async def get_request_uri(request_id: int):
     """
     Realize the logic for the endpoint:
 
@@ -118,8 +127,10 @@ def get_request_uri(request_id: int):
         URI for the download associated with the given request
     """
     try:
-        download_details = DBManager().get_download_details_for_request_id(
-            request_id
+        download_details = (
+            await AsyncDBManager().get_download_details_for_request_id(
+                request_id
+            )
         )
     except IndexError as err:
         log.error(
@@ -131,7 +142,7 @@ def get_request_uri(request_id: int):
         (
             request_status,
             _,
-        ) = DBManager().get_request_status_and_reason(request_id)
+        ) = await AsyncDBManager().get_request_status_and_reason(request_id)
         log.info(
             "download URI not found for request id: '%s'."
             " Request status is '%s'",
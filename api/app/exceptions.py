@@ -192,4 +192,33 @@ class ProductRetrievingError(BaseDDSException):
             product_id=product_id,
             status=status
         )
-        super().__init__(self.msg)
\ No newline at end of file
+        super().__init__(self.msg)
+
+class MessagePublishingError(BaseDDSException):
+    """Raised when the message could not be passed to the broker"""
+
+    msg: str = "Request could not be scheduled. Please try again later!"
+    code: int = 503
+
+
+class NotZarrStoreError(BaseDDSException):
+    """Raised if the result of the request is not a Zarr store"""
+
+    msg: str = "Result of the request with id: {request_id} is not a Zarr store!"
+
+    def __init__(self, request_id):
+        self.msg = self.msg.format(request_id=request_id)
+        super().__init__(self.msg)
+
+
+class TooManyZarrKeysError(BaseDDSException):
+    """Raised if too many keys of the Zarr store were requested at once"""
+
+    msg: str = (
+        "Maximum number of keys fetched at once is {max_keys} but"
+        " {n_keys} were requested"
+    )
+
+    def __init__(self, n_keys, max_keys):
+        self.msg = self.msg.format(n_keys=n_keys, max_keys=max_keys)
+        super().__init__(self.msg)
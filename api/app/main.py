@@ -20,6 +20,7 @@ from aioprometheus.asgi.starlette import metrics
 
 from geoquery.task import TaskList
 from geoquery.geoquery import GeoQuery
+from datastore.tile_cache import iter_tile_bboxes
 
 from utils.api_logging import get_dds_logger
 import exceptions as exc
@@ -60,8 +61,32 @@ def map_to_geoquery(
                         format_args=format_kwargs, format=format) 
     return query
 
+def parse_points(points: list[str]) -> list[tuple[float, float]]:
+    """Parse points given as `lon,lat` strings"""
+    try:
+        parsed = [tuple(float(x) for x in point.split(',')) for point in points]
+    except ValueError as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Points must be given as `lon,lat`",
+        ) from err
+    if any(len(point) != 2 for point in parsed):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Points must be given as `lon,lat`",
+        )
+    if len(parsed) > POINTS_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum number of points is {POINTS_MAX_BATCH}",
+        )
+    return parsed
+
 logger = get_dds_logger(__name__)
 
+MAP_SEED_MAX_TILES = int(os.environ.get("MAP_SEED_MAX_TILES", 10_000))
+POINTS_MAX_BATCH = int(os.environ.get("POINTS_MAX_BATCH", 1000))
+
 # ======== JSON encoders extension ========= #
 extend_json_encoders()
 
@@ -152,7 +177,7 @@ async def get_first_product_details(
         {"route": "GET /datasets/{dataset_id}"}
     )
     try:
-        return dataset_handler.get_product_details(
+        return await dataset_handler.get_product_details(
             user_roles_names=request.auth.scopes,
             dataset_id=dataset_id,
         )
@@ -175,7 +200,7 @@ async def get_product_details(
         {"route": "GET /datasets/{dataset_id}/{product_id}"}
     )
     try:
-        return dataset_handler.get_product_details(
+        return await dataset_handler.get_product_details(
             user_roles_names=request.auth.scopes,
             dataset_id=dataset_id,
             product_id=product_id,
@@ -231,11 +256,65 @@ async def get_map(
                                 dpi=dpi, cmap=cmap, projection=crs,
                                 vmin=vmin, vmax=vmax)
     try:
-        return dataset_handler.sync_query(
+        return await dataset_handler.get_map(
             user_id=request.user.id,
             dataset_id=dataset_id,
             product_id=product_id,
-            query=query
+            query=query,
+            headers=request.headers,
+        )
+    except exc.BaseDDSException as err:
+        raise err.wrap_around_http_exception() from err
+
+@app.post("/datasets/{dataset_id}/{product_id}/map/seed", tags=[tags.DATASET])
+@timer(
+    app.state.api_request_duration_seconds,
+    labels={"route": "POST /datasets/{dataset_id}/{product_id}/map/seed"},
+)
+@requires([scopes.ADMIN])
+async def seed_map(
+    request: Request,
+    dataset_id: str,
+    product_id: str,
+    zoom: list[int] = Query([0, 1, 2]),
+    time: list[datetime] | None = Query(None),
+    width: int = 256,
+    height: int = 256,
+    dpi: int | None = 100,
+    layers: str | None = None,
+    format: str | None = 'png',
+    transparent: bool | None = 'true',
+    bgcolor: str | None = 'FFFFFF',
+    cmap: str | None = 'RdBu_r',
+    bbox: str | None = None, # minx, miny, maxx, maxy (minlon, minlat, maxlon, maxlat)
+    vmin: float | None = None,
+    vmax: float | None = None
+):
+    """Pre-render map tiles of the lat/lon tiling scheme for the zoom
+    levels and times and store them in the tile cache"""
+    app.state.api_http_requests_total.inc(
+        {"route": "POST /datasets/{dataset_id}/{product_id}/map/seed"}
+    )
+    bbox_ = tuple(float(x) for x in bbox.split(',')) if bbox else None
+    queries = [
+        map_to_geoquery(variables=layers, bbox=",".join(map(str, tile_bbox)),
+                        time=time_, format="png", width=width, height=height,
+                        transparent=transparent, bgcolor=bgcolor, dpi=dpi,
+                        cmap=cmap, projection=None, vmin=vmin, vmax=vmax)
+        for zoom_level in zoom
+        for tile_bbox in iter_tile_bboxes(zoom_level, bbox_)
+        for time_ in (time or [None])
+    ]
+    if len(queries) > MAP_SEED_MAX_TILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum number of seeded tiles is {MAP_SEED_MAX_TILES}",
+        )
+    try:
+        return await dataset_handler.seed_map_tiles(
+            dataset_id=dataset_id,
+            product_id=product_id,
+            queries=queries,
         )
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
@@ -276,7 +355,7 @@ async def get_map_with_filters(
     
     else:
         try:
-            product_info = dataset_handler.get_product_details(
+            product_info = await dataset_handler.get_product_details(
                 user_roles_names=request.auth.scopes,
                 dataset_id=dataset_id,
                 product_id=product_id,
@@ -308,11 +387,40 @@ async def get_map_with_filters(
                                 dpi=dpi, cmap=cmap, projection=crs, vmin=vmin, vmax=vmax)
 
     try:
-        return dataset_handler.sync_query(
+        return await dataset_handler.get_map(
             user_id=request.user.id,
             dataset_id=dataset_id,
             product_id=product_id,
-            query=query
+            query=query,
+            headers=request.headers,
+        )
+    except exc.BaseDDSException as err:
+        raise err.wrap_around_http_exception() from err
+
+async def _get_points(
+    request: Request,
+    dataset_id: str,
+    product_id: str,
+    feature_id: str,
+    point: list[str],
+    time: datetime | None = None,
+    format: str = "geojson",
+    filters: Optional[Dict] = None,
+):
+    if format not in ("geojson", "csv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Points can be returned as `geojson` or `csv`",
+        )
+    query = map_to_geoquery(variables=[feature_id], time=time,
+                            filters=filters, format=format)
+    try:
+        return await dataset_handler.get_points(
+            user_id=request.user.id,
+            dataset_id=dataset_id,
+            product_id=product_id,
+            query=query,
+            points=parse_points(point),
         )
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
@@ -331,6 +439,8 @@ async def get_feature(
     time: datetime | None = None,
     bbox: str | None = None, # minx, miny, maxx, maxy (minlon, minlat, maxlon, maxlat)
     crs: str | None = None, 
+    point: list[str] | None = Query(None), # lon,lat (repeated for many points)
+    format: str = "geojson",
 # OGC map parameters
     # subset: str | None = None,
     # subset_crs: str | None = Query(..., alias="subset-crs"),
@@ -350,10 +460,13 @@ async def get_feature(
     # filters: Optional[Dict]
     # format: Optional[str]
 
+    if point:
+        return await _get_points(request, dataset_id, product_id, feature_id,
+                                 point, time=time, format=format)
     query = map_to_geoquery(variables=[feature_id], bbox=bbox, time=time, 
                             format="geojson")
     try:
-        return dataset_handler.sync_query(
+        return await dataset_handler.sync_query(
             user_id=request.user.id,
             dataset_id=dataset_id,
             product_id=product_id,
@@ -377,6 +490,8 @@ async def get_feature_with_filters(
     time: datetime | None = None,
     bbox: str | None = None, # minx, miny, maxx, maxy (minlon, minlat, maxlon, maxlat)
     crs: str | None = None, 
+    point: list[str] | None = Query(None), # lon,lat (repeated for many points)
+    format: str = "geojson",
 # OGC map parameters
     # subset: str | None = None,
     # subset_crs: str | None = Query(..., alias="subset-crs"),
@@ -389,7 +504,7 @@ async def get_feature_with_filters(
     
     else: 
         try:
-            product_info = dataset_handler.get_product_details(
+            product_info = await dataset_handler.get_product_details(
                 user_roles_names=request.auth.scopes,
                 dataset_id=dataset_id,
                 product_id=product_id,
@@ -415,10 +530,14 @@ async def get_feature_with_filters(
     # filters: Optional[Dict]
     # format: Optional[str]
 
+    if point:
+        return await _get_points(request, dataset_id, product_id, feature_id,
+                                 point, time=time, format=format,
+                                 filters=filters_dict)
     query = map_to_geoquery(variables=[feature_id], bbox=bbox, time=time, filters=filters_dict, 
                             format="geojson")
     try:
-        return dataset_handler.sync_query(
+        return await dataset_handler.sync_query(
             user_id=request.user.id,
             dataset_id=dataset_id,
             product_id=product_id,
@@ -443,7 +562,7 @@ async def get_metadata(
         {"route": "GET /datasets/{dataset_id}/{product_id}/metadata"}
     )
     try:
-        return dataset_handler.get_metadata(
+        return await dataset_handler.get_metadata(
             dataset_id=dataset_id, product_id=product_id
         )
     except exc.BaseDDSException as err:
@@ -467,7 +586,7 @@ async def estimate(
         {"route": "POST /datasets/{dataset_id}/{product_id}/estimate"}
     )
     try:
-        return dataset_handler.estimate(
+        return await dataset_handler.estimate(
             dataset_id=dataset_id,
             product_id=product_id,
             query=query,
@@ -494,7 +613,7 @@ async def query(
         {"route": "POST /datasets/{dataset_id}/{product_id}/execute"}
     )
     try:
-        return dataset_handler.async_query(
+        return await dataset_handler.async_query(
             user_id=request.user.id,
             dataset_id=dataset_id,
             product_id=product_id,
@@ -517,7 +636,7 @@ async def workflow(
     """Schedule the job of workflow processing"""
     app.state.api_http_requests_total.inc({"route": "POST /datasets/workflow"})
     try:
-        return dataset_handler.run_workflow(
+        return await dataset_handler.run_workflow(
             user_id=request.user.id,
             workflow=tasks,
         )
@@ -536,7 +655,7 @@ async def get_requests(
     """Get all requests for the user"""
     app.state.api_http_requests_total.inc({"route": "GET /requests"})
     try:
-        return request_handler.get_requests(request.user.id)
+        return await request_handler.get_requests(request.user.id)
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
 
@@ -556,7 +675,7 @@ async def get_request_status(
         {"route": "GET /requests/{request_id}/status"}
     )
     try:
-        return request_handler.get_request_status(
+        return await request_handler.get_request_status(
             user_id=request.user.id, request_id=request_id
         )
     except exc.BaseDDSException as err:
@@ -578,7 +697,7 @@ async def get_request_resulting_size(
         {"route": "GET /requests/{request_id}/size"}
     )
     try:
-        return request_handler.get_request_resulting_size(
+        return await request_handler.get_request_resulting_size(
             request_id=request_id
         )
     except exc.BaseDDSException as err:
@@ -600,7 +719,7 @@ async def get_request_uri(
         {"route": "GET /requests/{request_id}/uri"}
     )
     try:
-        return request_handler.get_request_uri(request_id=request_id)
+        return await request_handler.get_request_uri(request_id=request_id)
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
 
@@ -620,7 +739,9 @@ async def download_request_result(
         {"route": "GET /download/{request_id}"}
     )
     try:
-        return file_handler.download_request_result(request_id=request_id)
+        return await file_handler.download_request_result(
+            request_id=request_id, headers=request.headers
+        )
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
     except FileNotFoundError as err:
@@ -644,7 +765,9 @@ async def download_request_result(
         {"route": "GET /download/{request_id}/{filename}"}
     )
     try:
-        return file_handler.download_request_result(request_id=request_id, filename=filename)
+        return await file_handler.download_request_result(
+            request_id=request_id, filename=filename, headers=request.headers
+        )
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
     except FileNotFoundError as err:
@@ -669,10 +792,66 @@ async def download_request_result(
         {"route": "GET /download/{request_id}/{filename}/{subfile}"}
     )
     try:
-        return file_handler.download_request_result(request_id=request_id, filename=f'{filename}/{subfile}')
+        return await file_handler.download_request_result(
+            request_id=request_id,
+            filename=f'{filename}/{subfile}',
+            headers=request.headers,
+        )
+    except exc.BaseDDSException as err:
+        raise err.wrap_around_http_exception() from err
+    except FileNotFoundError as err:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File was not found!"
+        ) from err
+
+
+@app.get("/zarr/{request_id}/{key:path}", tags=[tags.REQUEST])
+@timer(
+    app.state.api_request_duration_seconds,
+    labels={"route": "GET /zarr/{request_id}/{key}"},
+)
+# @requires([scopes.AUTHENTICATED]) # TODO: mange download auth in the web component
+async def get_zarr_key(
+    request: Request,
+    request_id: int,
+    key: str,
+):
+    """Get the key of the Zarr store being the result of the request"""
+    app.state.api_http_requests_total.inc(
+        {"route": "GET /zarr/{request_id}/{key}"}
+    )
+    try:
+        return await file_handler.get_zarr_key(
+            request_id=request_id, key=key, headers=request.headers
+        )
+    except exc.BaseDDSException as err:
+        raise err.wrap_around_http_exception() from err
+    except FileNotFoundError as err:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Key was not found!"
+        ) from err
+
+
+@app.post("/zarr/{request_id}", tags=[tags.REQUEST])
+@timer(
+    app.state.api_request_duration_seconds,
+    labels={"route": "POST /zarr/{request_id}"},
+)
+# @requires([scopes.AUTHENTICATED]) # TODO: mange download auth in the web component
+async def get_zarr_keys(
+    request: Request,
+    request_id: int,
+    keys: list[str],
+):
+    """Get many keys of the Zarr store in a single ZIP archive"""
+    app.state.api_http_requests_total.inc({"route": "POST /zarr/{request_id}"})
+    try:
+        return await file_handler.get_zarr_keys(
+            request_id=request_id, keys=keys
+        )
     except exc.BaseDDSException as err:
         raise err.wrap_around_http_exception() from err
     except FileNotFoundError as err:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="File was not found!"
-        ) from err
\ No newline at end of file
+        ) from err
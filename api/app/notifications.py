@@ -0,0 +1,168 @@
+"""Module with the listener of database notifications"""
+import json
+import asyncio
+from typing import Callable
+
+import asyncpg
+
+from dbmanager.dbmanager import (
+    REQUEST_STATUS_CHANNEL,
+    RequestStatus,
+    get_connection_url,
+)
+from utils.api_logging import get_dds_logger
+
+log = get_dds_logger(__name__)
+
+RECONNECT_DELAY_SEC = 5
+
+_listener = None
+
+
+class NotificationListener:
+    """Listener of notifications published by the database manager
+    with Postgres `NOTIFY`.
+
+    A single connection is used to `LISTEN` on the channels. Coroutines
+    waiting for a request are woken up as soon as a status notification
+    for the request arrives. Callbacks registered for other channels are
+    called with the decoded payload. If the connection is lost, all
+    waiters are woken up, so that they can check the status in the database,
+    and callbacks are called with `None`, as notifications might be missed.
+    """
+
+    def __init__(self) -> None:
+        self._connection = None
+        self._connect_lock = asyncio.Lock()
+        self._waiters: dict[int, set[asyncio.Future]] = {}
+        self._callbacks: dict[str, list[Callable[[dict | None], None]]] = {}
+
+    def add_callback(
+        self, channel: str, callback: Callable[[dict | None], None]
+    ) -> None:
+        """Register the callback for notifications on the channel.
+        Callbacks should be registered before the listener is connected.
+
+        Parameters
+        ----------
+        channel : str
+            Name of the channel
+        callback : callable
+            Function called with the decoded payload or with `None`
+            if the connection was lost
+        """
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    async def _ensure_connected(self) -> None:
+        async with self._connect_lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            url = get_connection_url(driver="postgresql", logger=log)
+            self._connection = await asyncpg.connect(url)
+            self._connection.add_termination_listener(self._on_termination)
+            await self._connection.add_listener(
+                REQUEST_STATUS_CHANNEL, self._on_request_status
+            )
+            for channel in self._callbacks:
+                await self._connection.add_listener(
+                    channel, self._on_notification
+                )
+            log.info(
+                "listening on channels: %s",
+                [REQUEST_STATUS_CHANNEL, *self._callbacks],
+            )
+
+    async def keep_connected(self) -> None:
+        """Keep the listening connection open, reconnecting if it was lost"""
+        while True:
+            try:
+                await self._ensure_connected()
+            except (OSError, asyncpg.PostgresError) as err:
+                log.error("failed to listen for notifications: %s", err)
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+
+    def _on_request_status(self, connection, pid, channel, payload) -> None:
+        try:
+            notification = json.loads(payload)
+            request_id = int(notification["request_id"])
+            status = RequestStatus[notification["status"]]
+        except (ValueError, KeyError, TypeError):
+            log.warning("improper request status notification: %s", payload)
+            return
+        for future in self._waiters.pop(request_id, ()):
+            if not future.done():
+                future.set_result(status)
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            notification = json.loads(payload)
+        except ValueError:
+            log.warning("improper `%s` notification: %s", channel, payload)
+            return
+        for callback in self._callbacks.get(channel, ()):
+            callback(notification)
+
+    def _on_termination(self, connection) -> None:
+        log.warning("connection listening for notifications was closed")
+        self._connection = None
+        waiters, self._waiters = self._waiters, {}
+        for futures in waiters.values():
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+        for callbacks in self._callbacks.values():
+            for callback in callbacks:
+                callback(None)
+
+    async def subscribe(self, request_id: int) -> asyncio.Future:
+        """Register a waiter for the status change of the request.
+
+        The waiter should be registered before the current status is read
+        from the database, so that no notification is missed.
+
+        Parameters
+        ----------
+        request_id : int
+            ID of the request
+
+        Returns
+        -------
+        future : asyncio.Future
+            Future resolved with the new `RequestStatus` or with `None`
+            if the notification could not be delivered
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await self._ensure_connected()
+        except (OSError, asyncpg.PostgresError) as err:
+            log.error("failed to listen for request status: %s", err)
+            await asyncio.sleep(RECONNECT_DELAY_SEC)
+            future.set_result(None)
+            return future
+        self._waiters.setdefault(request_id, set()).add(future)
+        return future
+
+    def unsubscribe(self, request_id: int, future: asyncio.Future) -> None:
+        """Remove the waiter registered with `subscribe`
+
+        Parameters
+        ----------
+        request_id : int
+            ID of the request
+        future : asyncio.Future
+            Future returned by `subscribe`
+        """
+        futures = self._waiters.get(request_id)
+        if futures is None:
+            return
+        futures.discard(future)
+        if not futures:
+            del self._waiters[request_id]
+
+
+def get_notification_listener() -> NotificationListener:
+    """Get the listener shared by all requests of the API server"""
+    global _listener
+    if _listener is None:
+        _listener = NotificationListener()
+    return _listener
@@ -2,7 +2,7 @@ from datastore.datastore import Datastore
 from utils.api_logging import get_dds_logger
 from decorators_factory import assert_parameters_are_defined, bind_arguments
 from functools import wraps
-from inspect import signature
+from inspect import iscoroutinefunction, signature
 import exceptions as exc
 
 
@@ -17,8 +17,7 @@ def assert_product_exists(func):
         sig, required_parameters=[("dataset_id", str), ("product_id", str)]
     )
 
-    @wraps(func)
-    def assert_inner(*args, **kwargs):
+    def assert_exists(*args, **kwargs):
         args_dict = bind_arguments(sig, *args, **kwargs)
         dataset_id = args_dict["dataset_id"]
         product_id = args_dict["product_id"]
@@ -31,6 +30,19 @@ def assert_product_exists(func):
             raise exc.MissingProductError(
                 dataset_id=dataset_id, product_id=product_id
             )
+
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_assert_inner(*args, **kwargs):
+            assert_exists(*args, **kwargs)
+            return await func(*args, **kwargs)
+
+        return async_assert_inner
+
+    @wraps(func)
+    def assert_inner(*args, **kwargs):
+        assert_exists(*args, **kwargs)
         return func(*args, **kwargs)
 
     return assert_inner
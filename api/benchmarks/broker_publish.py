@@ -0,0 +1,173 @@
+"""Benchmark of submissions per second published to the broker.
+
+Messages are published from a pool of threads, as by the API handlers,
+through a stand-in of `pika.BlockingConnection` which only simulates
+network round trips. Two modes are compared:
+
+- `per-request`: a connection is opened, used for a single message
+  and closed, as the API did before the pooled publisher,
+- `pooled`: the long-lived `BrokerPublisher` waiting for broker
+  confirmations on its pool of connections.
+
+The stub does not model the load of the broker opening connections,
+so the `per-request` mode is an optimistic baseline.
+
+Usage:
+
+    cd api
+    python benchmarks/broker_publish.py --messages 2000 --threads 16
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# NOTE: modules of the API are imported as top-level modules, as in
+# the container, and packages of the datastore are installed there
+_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, os.path.join(_ROOT, "api", "app"))
+sys.path.insert(0, os.path.join(_ROOT, "datastore"))
+
+import pika
+
+import broker
+
+
+class StubChannel:
+    """Channel simulating round trips of AMQP methods"""
+
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.is_open = True
+        self._confirms = False
+        self.published = 0
+        self._lock = threading.Lock()
+
+    def confirm_delivery(self) -> None:
+        self._confirms = True
+        time.sleep(self.rtt)
+
+    def queue_declare(self, queue: str, durable: bool = False) -> None:
+        time.sleep(self.rtt)
+
+    def basic_publish(self, exchange, routing_key, body, properties) -> None:
+        # NOTE: without confirmations the message is only written
+        # to the socket
+        if self._confirms:
+            time.sleep(self.rtt)
+        with self._lock:
+            self.published += 1
+
+
+class StubConnection:
+    """Connection simulating the TCP and AMQP handshake"""
+
+    rtt = 0.0005
+    handshake_round_trips = 5
+    channels = []
+
+    def __init__(self, parameters=None) -> None:
+        time.sleep(self.rtt * self.handshake_round_trips)
+        self.is_open = True
+
+    def channel(self) -> StubChannel:
+        time.sleep(self.rtt)
+        channel = StubChannel(self.rtt)
+        self.channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit=0) -> None:
+        pass
+
+    def close(self) -> None:
+        time.sleep(self.rtt)
+        self.is_open = False
+
+
+def publish_per_request(routing_key: str, body: str) -> None:
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters(host="broker")
+    )
+    channel = connection.channel()
+    channel.basic_publish(
+        exchange="",
+        routing_key=routing_key,
+        body=body,
+        properties=pika.BasicProperties(delivery_mode=2),
+    )
+    connection.close()
+
+
+def run(publish, messages: int, threads: int) -> tuple[float, list[float]]:
+    def submit(idx):
+        start = time.perf_counter()
+        publish(routing_key="query_queue", body=f"{idx}\\query")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(submit, range(messages)))
+    return time.perf_counter() - start, latencies
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    print(
+        f"{name:<12} {len(latencies) / elapsed:10.1f} submissions/s"
+        f"  p50 {statistics.median(latencies) * 1e3:8.3f} ms"
+        f"  p99 {p99 * 1e3:8.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument(
+        "--rtt-ms",
+        type=float,
+        default=0.5,
+        help="simulated round trip time to the broker",
+    )
+    parser.add_argument(
+        "--handshake-round-trips",
+        type=int,
+        default=5,
+        help="round trips of opening the connection",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=broker.PUBLISHER_CONNECTIONS,
+        help="connections of the pooled publisher",
+    )
+    args = parser.parse_args()
+    StubConnection.rtt = args.rtt_ms / 1e3
+    StubConnection.handshake_round_trips = args.handshake_round_trips
+    pika.BlockingConnection = StubConnection
+
+    print(
+        f"{args.messages} messages from {args.threads} threads,"
+        f" round trip {args.rtt_ms} ms, {args.connections} pooled connections"
+    )
+    report(
+        "per-request", *run(publish_per_request, args.messages, args.threads)
+    )
+    publisher = broker.BrokerPublisher(
+        host="broker", connections=args.connections
+    )
+    # NOTE: connections are opened by the first messages
+    run(publisher.publish, args.connections, args.connections)
+    report("pooled", *run(publisher.publish, args.messages, args.threads))
+    published = sum(channel.published for channel in StubConnection.channels)
+    assert (
+        published == 2 * args.messages + args.connections
+    ), "messages were lost"
+
+
+if __name__ == "__main__":
+    main()
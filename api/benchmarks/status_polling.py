@@ -0,0 +1,131 @@
+"""Load test of tail latency of request status polling.
+
+Clients poll `GET /requests/{request_id}/status` of the running API
+concurrently, while other clients send estimation requests, which read
+products in the thread pool of the API. Handlers blocking the event loop
+show up as the tail latency of polling.
+
+Usage:
+
+    cd api
+    python benchmarks/status_polling.py --url http://localhost:8080 \\
+        --user-token <user_id>:<api_key> --request-id 1 \\
+        --estimate <dataset_id>/<product_id> '{"variable": ["tp"]}'
+"""
+import json
+import time
+import argparse
+import statistics
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _send(url: str, headers: dict, body: bytes | None = None) -> float:
+    request = urllib.request.Request(url, data=body, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+    except urllib.error.HTTPError as err:
+        err.read()
+    return time.perf_counter() - start
+
+
+def _poll(url: str, headers: dict, stop: threading.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        latencies.append(_send(url, headers))
+    return latencies
+
+
+def _estimate(
+    url: str, headers: dict, body: bytes, stop: threading.Event
+) -> int:
+    sent = 0
+    while not stop.is_set():
+        _send(url, {**headers, "Content-Type": "application/json"}, body)
+        sent += 1
+    return sent
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--user-token", required=True)
+    parser.add_argument("--request-id", type=int, required=True)
+    parser.add_argument(
+        "--pollers", type=int, default=50, help="number of polling clients"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="duration in seconds"
+    )
+    parser.add_argument(
+        "--estimate",
+        nargs=2,
+        metavar=("DATASET/PRODUCT", "QUERY"),
+        help="product and JSON query of estimation requests sent"
+        " concurrently with polling",
+    )
+    parser.add_argument(
+        "--estimators",
+        type=int,
+        default=4,
+        help="number of clients sending estimation requests",
+    )
+    args = parser.parse_args()
+    url = args.url.rstrip("/")
+    headers = {"User-Token": args.user_token}
+    stop = threading.Event()
+    estimators = args.estimators if args.estimate else 0
+    with ThreadPoolExecutor(max_workers=args.pollers + estimators) as pool:
+        polls = [
+            pool.submit(
+                _poll,
+                f"{url}/requests/{args.request_id}/status",
+                headers,
+                stop,
+            )
+            for _ in range(args.pollers)
+        ]
+        estimates = []
+        if args.estimate:
+            product, query = args.estimate
+            body = json.dumps(json.loads(query)).encode()
+            estimates = [
+                pool.submit(
+                    _estimate,
+                    f"{url}/datasets/{product}/estimate",
+                    headers,
+                    body,
+                    stop,
+                )
+                for _ in range(estimators)
+            ]
+        time.sleep(args.duration)
+        stop.set()
+        latencies = sorted(
+            latency for future in polls for latency in future.result()
+        )
+        estimated = sum(future.result() for future in estimates)
+    print(
+        f"{len(latencies)} status requests from {args.pollers} clients"
+        f" in {args.duration:.0f} s, {estimated} estimation requests"
+        f" from {estimators} clients"
+    )
+    print(
+        f"mean {statistics.mean(latencies) * 1e3:.1f} ms"
+        f"  p50 {_percentile(latencies, 0.5) * 1e3:.1f} ms"
+        f"  p95 {_percentile(latencies, 0.95) * 1e3:.1f} ms"
+        f"  p99 {_percentile(latencies, 0.99) * 1e3:.1f} ms"
+        f"  max {latencies[-1] * 1e3:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
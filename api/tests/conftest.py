@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# NOTE: modules of the API are imported as top-level modules, as in
+# the container, and packages of the datastore are installed there
+_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, os.path.join(_ROOT, "api", "app"))
+sys.path.insert(0, os.path.join(_ROOT, "datastore"))
+
+# NOTE: the datastore is created when the handlers are imported
+_CACHE_DIR = tempfile.mkdtemp()
+_CATALOG_PATH = os.path.join(_CACHE_DIR, "catalog.yaml")
+with open(_CATALOG_PATH, "w") as catalog:
+    catalog.write("sources: {}\n")
+os.environ.setdefault("CATALOG_PATH", _CATALOG_PATH)
+os.environ.setdefault("CACHE_PATH", _CACHE_DIR)
+os.environ.setdefault("MESSAGE_SEPARATOR", "\\")
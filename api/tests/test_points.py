@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+import xarray as xr
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pika")
+pytest.importorskip("asyncpg")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+from fastapi.responses import StreamingResponse
+
+from geoquery.geoquery import GeoQuery
+from endpoint_handlers import dataset
+
+POINTS = [(10.0, 41.0), (12.2, 44.9)]
+
+
+class StubKube:
+    def __init__(self, dset):
+        self.dset = dset
+
+    def to_xarray(self, encoding=True):
+        return self.dset
+
+
+@pytest.fixture
+def dset():
+    values = np.arange(2 * 3 * 4, dtype=float).reshape(2, 3, 4)
+    yield xr.Dataset(
+        {"tas": (("time", "lat", "lon"), values)},
+        coords={
+            "time": np.array(
+                ["2020-01-01", "2020-01-02"], dtype="datetime64[ns]"
+            ),
+            "lat": [45.0, 43.0, 41.0],
+            "lon": [8.0, 10.0, 12.0, 14.0],
+        },
+    )
+
+
+@pytest.fixture
+def product(monkeypatch, dset):
+    data_store = dataset.data_store
+    product = {"dset": dset, "queries": [], "sync_queries": []}
+
+    def query_cached_product(dataset_id, product_id, query):
+        product["queries"].append((dataset_id, product_id, query))
+        return StubKube(product["dset"])
+
+    async def sync_query(user_id, dataset_id, product_id, query):
+        product["sync_queries"].append(query)
+        return "executor response"
+
+    monkeypatch.setattr(data_store, "dataset_list", lambda: ["era5"])
+    monkeypatch.setattr(data_store, "product_list", lambda _: ["sl"])
+    monkeypatch.setattr(
+        data_store, "query_cached_product", query_cached_product
+    )
+    monkeypatch.setattr(type(data_store), "catalog_version", "v1")
+    monkeypatch.setattr(dataset, "sync_query", sync_query)
+    dataset._GRID_INDEX_CACHE.clear()
+    yield product
+    dataset._GRID_INDEX_CACHE.clear()
+
+
+def get_points(query, points=POINTS):
+    return asyncio.run(
+        dataset.get_points(
+            user_id="user",
+            dataset_id="era5",
+            product_id="sl",
+            query=GeoQuery(**query),
+            points=points,
+        )
+    )
+
+
+def read_body(response):
+    async def read():
+        return "".join([part async for part in response.body_iterator])
+
+    return asyncio.run(read())
+
+
+def test_grid_indices_of_nearest_cells(product, dset):
+    assert dataset._get_grid_indices("era5", "sl", dset, POINTS) == [
+        {"lon": 1, "lat": 2},
+        {"lon": 2, "lat": 0},
+    ]
+
+
+def test_grid_indices_resolved_only_for_missing_points(
+    monkeypatch, product, dset
+):
+    resolved = []
+    find_grid_indices = dataset.find_grid_indices
+
+    def find_and_record(dset, points):
+        resolved.append(list(points))
+        return find_grid_indices(dset, points)
+
+    monkeypatch.setattr(dataset, "find_grid_indices", find_and_record)
+    dataset._get_grid_indices("era5", "sl", dset, POINTS[:1])
+    indices = dataset._get_grid_indices("era5", "sl", dset, POINTS)
+    assert indices == [{"lon": 1, "lat": 2}, {"lon": 2, "lat": 0}]
+    assert resolved == [POINTS[:1], POINTS[1:]]
+    # NOTE: the grid might change with the catalog
+    monkeypatch.setattr(type(dataset.data_store), "catalog_version", "v2")
+    dataset._get_grid_indices("era5", "sl", dset, POINTS[:1])
+    assert resolved[-1] == POINTS[:1]
+
+
+def test_grid_indices_of_point_outside_of_grid(product, dset):
+    with pytest.raises(ValueError):
+        dataset._get_grid_indices("era5", "sl", dset, [(40.0, 41.0)])
+
+
+def test_get_points_as_geojson(product):
+    response = get_points({"variable": ["tas"], "format": "geojson"})
+    assert isinstance(response, StreamingResponse)
+    assert response.media_type == "application/geo+json"
+    collection = json.loads(read_body(response))
+    assert [
+        feature["properties"]["requested_coordinates"]
+        for feature in collection["features"]
+    ] == [list(point) for point in POINTS]
+    assert [
+        feature["geometry"]["coordinates"]
+        for feature in collection["features"]
+    ] == [[10.0, 41.0], [12.0, 45.0]]
+    assert len(product["sync_queries"]) == 0
+    assert [query[:2] for query in product["queries"]] == [("era5", "sl")]
+
+
+def test_get_points_as_csv(product):
+    response = get_points({"variable": ["tas"], "format": "csv"})
+    assert response.media_type == "text/csv"
+    rows = read_body(response).splitlines()
+    assert rows[0].split(",")[:3] == ["point", "longitude", "latitude"]
+    assert len(rows) == 1 + 2 * len(POINTS)
+
+
+def test_points_of_curvilinear_grid_extracted_by_executor(product):
+    lat, lon = np.meshgrid([45.0, 43.0, 41.0], [8.0, 10.0, 12.0, 14.0])
+    product["dset"] = xr.Dataset(
+        {"tas": (("x", "y"), np.zeros_like(lat))},
+        coords={"lat": (("x", "y"), lat), "lon": (("x", "y"), lon)},
+    )
+    response = get_points({"variable": ["tas"], "format": "csv"})
+    assert response == "executor response"
+    (query,) = product["sync_queries"]
+    assert query.variable == ["tas"]
+    assert query.format == "csv"
+    assert query.location == {
+        "longitude": [10.0, 12.2],
+        "latitude": [41.0, 44.9],
+    }
+
+
+def test_points_outside_of_grid_extracted_by_executor(product):
+    response = get_points(
+        {"variable": ["tas"], "format": "geojson"}, points=[(40.0, 41.0)]
+    )
+    assert response == "executor response"
+    assert product["sync_queries"][0].location == {
+        "longitude": [40.0],
+        "latitude": [41.0],
+    }
@@ -0,0 +1,161 @@
+"""Benchmark of per-call latency of catalog lookups of the Datastore.
+
+Calls are timed against the catalog as it was used before the registry
+of opened entries (the catalog parameterised with `CACHE_DIR` on every
+call) and with the registry kept by `Datastore`.
+
+Usage:
+
+    cd datastore
+    python benchmarks/catalog_entries.py --catalog <path>/catalog.yaml
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+# NOTE: packages of the datastore are imported as top-level packages,
+# as in the containers
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _legacy_dataset_list(datastore):
+    return sorted(set(datastore.catalog(CACHE_DIR=datastore.cache_dir)))
+
+
+def _legacy_product_list(datastore, dataset_id):
+    return list(datastore.catalog(CACHE_DIR=datastore.cache_dir)[dataset_id])
+
+
+def _legacy_dataset_info(datastore, dataset_id):
+    entry = datastore.catalog(CACHE_DIR=datastore.cache_dir)[dataset_id]
+    info = {"metadata": entry.metadata, "products": {}}
+    for product_id in entry:
+        info["products"][product_id] = entry[product_id].metadata
+    return info
+
+
+def _legacy_product_metadata(datastore, dataset_id, product_id):
+    return datastore.catalog(CACHE_DIR=datastore.cache_dir)[dataset_id][
+        product_id
+    ].metadata
+
+
+def _legacy_product_details(datastore, dataset_id, product_id):
+    entry = datastore.catalog(CACHE_DIR=datastore.cache_dir)[dataset_id][
+        product_id
+    ]
+    return {
+        "metadata": entry.metadata,
+        "dataset": _legacy_dataset_info(datastore, dataset_id),
+        "data": entry.read_chunked().to_dict(),
+    }
+
+
+def _time_calls(func, args_list, repeat):
+    durations = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            func(*args)
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _report(name, legacy, current):
+    def fmt(durations):
+        durations = sorted(durations)
+        p95 = durations[min(int(len(durations) * 0.95), len(durations) - 1)]
+        return (
+            f"mean {statistics.mean(durations) * 1e3:9.3f} ms"
+            f"  p95 {p95 * 1e3:9.3f} ms"
+        )
+
+    speedup = statistics.mean(legacy) / statistics.mean(current)
+    print(f"{name:<18} before: {fmt(legacy)}")
+    print(f"{'':<18} after:  {fmt(current)}  ({speedup:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--catalog",
+        default=os.environ.get("CATALOG_PATH"),
+        help="path of the intake catalog (default: `CATALOG_PATH`)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="number of rounds of calls"
+    )
+    parser.add_argument(
+        "--with-data",
+        action="store_true",
+        help="time `product_details`, which opens source files",
+    )
+    args = parser.parse_args()
+    if not args.catalog:
+        parser.error("the catalog path is required")
+    os.environ["CATALOG_PATH"] = args.catalog
+    os.environ.setdefault("CACHE_PATH", tempfile.mkdtemp())
+    logging.disable(logging.INFO)
+
+    from datastore.datastore import Datastore
+
+    datastore = Datastore()
+    dataset_ids = datastore.dataset_list()
+    products = [
+        (dataset_id, product_id)
+        for dataset_id in dataset_ids
+        for product_id in datastore.product_list(dataset_id)
+    ]
+    print(
+        f"catalog: {args.catalog} ({len(dataset_ids)} datasets,"
+        f" {len(products)} products), {args.repeat} rounds"
+    )
+    cases = [
+        (
+            "dataset_list",
+            lambda: _legacy_dataset_list(datastore),
+            datastore.dataset_list,
+            [()],
+        ),
+        (
+            "product_list",
+            lambda dataset_id: _legacy_product_list(datastore, dataset_id),
+            datastore.product_list,
+            [(dataset_id,) for dataset_id in dataset_ids],
+        ),
+        (
+            "dataset_info",
+            lambda dataset_id: _legacy_dataset_info(datastore, dataset_id),
+            datastore.dataset_info,
+            [(dataset_id,) for dataset_id in dataset_ids],
+        ),
+        (
+            "product_metadata",
+            lambda *ids: _legacy_product_metadata(datastore, *ids),
+            datastore.product_metadata,
+            products,
+        ),
+    ]
+    if args.with_data:
+        cases.append(
+            (
+                "product_details",
+                lambda *ids: _legacy_product_details(datastore, *ids),
+                lambda *ids: datastore.product_details(*ids, role="admin"),
+                products,
+            )
+        )
+    for name, legacy_func, func, args_list in cases:
+        # NOTE: the first call builds the registry
+        func(*args_list[0])
+        legacy = _time_calls(legacy_func, args_list, args.repeat)
+        current = _time_calls(func, args_list, args.repeat)
+        _report(name, legacy, current)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,40 @@
 from __future__ import annotations
 
 import os
+import copy
+import time
 import logging
 import json
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections import OrderedDict
+from threading import Lock, RLock
+from typing import Callable
 
 import intake
 import numpy as np
+import geokube
 from dask.delayed import Delayed
 from geokube import GeogCS
 
 from geoquery.geoquery import GeoQuery
 
+from geokube.core.axis import AxisType
 from geokube.core.datacube import DataCube
 from geokube.core.dataset import Dataset
+from geokube.core.field import Field
 
 from .singleton import Singleton
+from .product_cache import ProductCache
+from .estimation import NotModelledError, estimate_nbytes, get_grid_coords
+from .spatial_index import SpatialIndex, SpatialIndexCache
+from .time_index import TimeIndex, TimeIndexCache
 from .util import log_execution_time
 from .const import BaseRole
 from .exception import UnauthorizedError
 
 DEFAULT_MAX_REQUEST_SIZE_GB = 10
+DEFAULT_CACHE_WARMUP_WORKERS = 4
+ESTIMATE_CACHE_SIZE = 1024
 
 
 class Datastore(metaclass=Singleton):
@@ -45,10 +60,94 @@ class Datastore(metaclass=Singleton):
                 "'CACHE_PATH' environment variable was not set. catalog will"
                 " not be opened!"
             )
-        self.catalog = intake.open_catalog(os.environ["CATALOG_PATH"])
+        self.catalog_path = os.environ["CATALOG_PATH"]
+        self.catalog = intake.open_catalog(self.catalog_path)
         self.cache_dir = os.environ["CACHE_PATH"]
         self._LOG.info("cache dir set to %s", self.cache_dir)
         self.cache = None
+        self._cache_futures = {}
+        self.product_load_time = {}
+        self._product_cache = ProductCache(
+            self.cache_dir,
+            context=getattr(geokube, "__version__", None),
+        )
+        self._spatial_index_cache = SpatialIndexCache(self.cache_dir)
+        self._time_index_cache = TimeIndexCache()
+        self._product_versions = {}
+        self._entries = None
+        self._entries_mtime = None
+        self._entries_lock = RLock()
+        self._role_index = None
+        self._estimate_cache = OrderedDict()
+        self._estimate_cache_lock = Lock()
+
+    def _get_catalog_mtime(self) -> float | None:
+        try:
+            return os.path.getmtime(self.catalog_path)
+        except OSError:
+            return None
+
+    def _get_entries(self) -> dict:
+        """Get the registry of opened catalog entries.
+
+        The registry is built once from the catalog parameterised with
+        `CACHE_DIR` and rebuilt only when the modification time of the
+        catalog file changes.
+
+        Returns
+        -------
+        entries : dict
+            Dict mapping dataset ID to the tuple of the dataset entry and
+            the dict of its product entries
+        """
+        mtime = self._get_catalog_mtime()
+        with self._entries_lock:
+            if self._entries is None or mtime != self._entries_mtime:
+                if self._entries is not None:
+                    self._LOG.info(
+                        "catalog `%s` was modified. reloading entries...",
+                        self.catalog_path,
+                    )
+                    self.catalog = intake.open_catalog(self.catalog_path)
+                self._entries = self._build_entries()
+                self._entries_mtime = mtime
+                self._role_index = None
+            return self._entries
+
+    @property
+    def catalog_version(self) -> str:
+        """Version of the catalog changing whenever the catalog file
+        is modified"""
+        with self._entries_lock:
+            self._get_entries()
+            return str(self._entries_mtime)
+
+    @log_execution_time(_LOG)
+    def _build_entries(self) -> dict:
+        catalog = self.catalog(CACHE_DIR=self.cache_dir)
+        entries = {}
+        for dataset_id in catalog:
+            dataset_entry = catalog[dataset_id]
+            entries[dataset_id] = (
+                dataset_entry,
+                {
+                    product_id: dataset_entry[product_id]
+                    for product_id in dataset_entry
+                },
+            )
+        return entries
+
+    def _get_product_entry(self, dataset_id: str, product_id: str):
+        return self._get_entries()[dataset_id][1][product_id]
+
+    def _read_product(self, dataset_id: str, product_id: str):
+        # NOTE: registry entries are shared, so a new source is configured
+        # to avoid keeping the opened kube alive in the registry
+        return (
+            self._get_product_entry(dataset_id, product_id)
+            .configure_new()
+            .read_chunked()
+        )
 
     @log_execution_time(_LOG)
     def get_cached_product_or_read(
@@ -69,8 +168,19 @@ class Datastore(metaclass=Singleton):
         -------
         kube : DataCube or Dataset
         """
-        if self.cache is None:
-            self._load_cache()
+        with self._entries_lock:
+            # NOTE: concurrent first callers start the warm-up once and
+            # see the products registered by it
+            if self.cache is None:
+                self.warm_up_cache()
+            future = self._cache_futures.get((dataset_id, product_id))
+        if future is not None and not future.done():
+            self._LOG.info(
+                "waiting for product `%s.%s` to be loaded into cache...",
+                dataset_id,
+                product_id,
+            )
+            future.result()
         if (
             dataset_id not in self.cache
             or product_id not in self.cache[dataset_id]
@@ -81,47 +191,225 @@ class Datastore(metaclass=Singleton):
                 dataset_id,
                 product_id,
             )
-            return self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][
-                product_id
-            ].read_chunked()
+            return self._read_product(dataset_id, product_id)
         return self.cache[dataset_id][product_id]
 
     @log_execution_time(_LOG)
-    def _load_cache(self, datasets: list[str] | None = None):
-        if self.cache is None or datasets is None:
-            self.cache = {}
-            datasets = self.dataset_list()
+    def warm_up_cache(
+        self,
+        datasets: list[str] | None = None,
+        max_workers: int | None = None,
+        callback: Callable[[str, str, float], None] | None = None,
+    ) -> list[Future]:
+        """Start loading products with `metadata_caching` set to `True`
+        into the cache in a pool of threads. The method returns as soon
+        as the catalog index is built, without waiting for products.
 
-        for i, dataset_id in enumerate(datasets):
-            self._LOG.info(
-                "loading cache for `%s` (%d/%d)",
-                dataset_id,
-                i + 1,
-                len(datasets),
+        Parameters
+        ----------
+        datasets : optional list of str, default=`None`
+            IDs of datasets to load. If `None`, all datasets are loaded
+        max_workers : optional int, default=`None`
+            Maximum number of products loaded concurrently. If `None`,
+            the value of `CACHE_WARMUP_WORKERS` environment variable is used
+        callback : optional callable, default=`None`
+            Function called with dataset ID, product ID and load time
+            (in seconds) after each product is loaded
+
+        Returns
+        -------
+        futures : list of Future
+            Futures of products being loaded
+        """
+        self._get_role_index()
+        if max_workers is None:
+            max_workers = int(
+                os.environ.get(
+                    "CACHE_WARMUP_WORKERS", DEFAULT_CACHE_WARMUP_WORKERS
+                )
             )
-            self.cache[dataset_id] = {}
-            for product_id in self.product_list(dataset_id):
-                catalog_entry = self.catalog(CACHE_DIR=self.cache_dir)[
-                    dataset_id
-                ][product_id]
-                if not catalog_entry.metadata_caching:
-                    self._LOG.info(
-                        "`metadata_caching` for product %s.%s set to `False`",
-                        dataset_id,
-                        product_id,
+        futures = []
+        with self._entries_lock:
+            if self.cache is None or datasets is None:
+                self.cache = {}
+                self._cache_futures = {}
+                datasets = self.dataset_list()
+            pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="cache-warm-up"
+            )
+            for dataset_id in datasets:
+                self.cache[dataset_id] = {}
+                for product_id in self.product_list(dataset_id):
+                    catalog_entry = self._get_product_entry(
+                        dataset_id, product_id
                     )
-                    continue
-                try:
-                    self.cache[dataset_id][
-                        product_id
-                    ] = catalog_entry.read_chunked()
-                except ValueError:
-                    self._LOG.error(
-                        "failed to load cache for `%s.%s`",
+                    if not catalog_entry.metadata_caching:
+                        self._LOG.info(
+                            "`metadata_caching` for product %s.%s set to"
+                            " `False`",
+                            dataset_id,
+                            product_id,
+                        )
+                        continue
+                    future = pool.submit(
+                        self._load_product_into_cache,
                         dataset_id,
                         product_id,
-                        exc_info=True,
-                    ) 
+                        callback,
+                    )
+                    self._cache_futures[(dataset_id, product_id)] = future
+                    futures.append(future)
+            pool.shutdown(wait=False)
+        self._LOG.info(
+            "loading %d products into cache using %d workers",
+            len(futures),
+            max_workers,
+        )
+        return futures
+
+    def _load_product_into_cache(
+        self,
+        dataset_id: str,
+        product_id: str,
+        callback: Callable[[str, str, float], None] | None = None,
+    ) -> None:
+        start_time = time.monotonic()
+        try:
+            kube, version = self._read_product_with_persistent_cache(
+                dataset_id, product_id
+            )
+        except Exception:
+            self._LOG.error(
+                "failed to load cache for `%s.%s`",
+                dataset_id,
+                product_id,
+                exc_info=True,
+            )
+            return
+        self._build_time_indices(dataset_id, product_id, version, kube)
+        load_time = time.monotonic() - start_time
+        self._product_versions[(dataset_id, product_id)] = version
+        self.cache[dataset_id][product_id] = kube
+        self.product_load_time[f"{dataset_id}.{product_id}"] = load_time
+        self._LOG.info(
+            "product `%s.%s` loaded into cache in %.4f sec",
+            dataset_id,
+            product_id,
+            load_time,
+        )
+        if callback is not None:
+            callback(dataset_id, product_id, load_time)
+
+    @log_execution_time(_LOG)
+    def _load_cache(self, datasets: list[str] | None = None):
+        wait(self.warm_up_cache(datasets=datasets))
+
+    def _get_role_index(self) -> dict:
+        """Get the index mapping each product role to the dataset info
+        payloads and the eligible products for that role.
+
+        The index is built once and rebuilt only when catalog entries are
+        reloaded.
+
+        Returns
+        -------
+        index : dict
+            Dict with the `datasets` key keeping info of all datasets
+            and the `roles` key mapping product role to the dict of
+            dataset ID and the set of eligible products
+        """
+        with self._entries_lock:
+            self._get_entries()
+            if self._role_index is None:
+                self._role_index = self._build_role_index()
+            return self._role_index
+
+    @log_execution_time(_LOG)
+    def _build_role_index(self) -> dict:
+        datasets = {}
+        roles = {}
+        for dataset_id in self.dataset_list():
+            info = self.dataset_info(dataset_id=dataset_id)
+            datasets[dataset_id] = info
+            for product_id, product_info in info["products"].items():
+                product_role = product_info.get("role") or BaseRole.PUBLIC
+                roles.setdefault(product_role, {}).setdefault(
+                    dataset_id, set()
+                ).add(product_id)
+        return {"datasets": datasets, "roles": roles}
+
+    @log_execution_time(_LOG)
+    def eligible_datasets_info(
+        self, role: str | list[str] | None = None
+    ) -> list[dict]:
+        """Get information about datasets with products restricted to the
+        ones eligible for the `role`. Datasets without eligible products
+        are skipped. If `role` is `None`, the `public` role is considered.
+
+        Parameters
+        ----------
+        role : optional str or list of str, default=`None`
+            Role code for which eligible products should be selected
+
+        Returns
+        -------
+        datasets : list of dict
+            List of datasets information in the form returned by
+            `dataset_info`
+        """
+        index = self._get_role_index()
+        if role is None:
+            role = []
+        elif isinstance(role, str):
+            role = [role]
+        if BaseRole.ADMIN in role:
+            roles = list(index["roles"])
+        else:
+            roles = [BaseRole.PUBLIC] + [
+                role_name for role_name in role if role_name in index["roles"]
+            ]
+        eligible = {}
+        for role_name in roles:
+            for dataset_id, product_ids in (
+                index["roles"].get(role_name, {}).items()
+            ):
+                eligible.setdefault(dataset_id, set()).update(product_ids)
+        datasets = []
+        for dataset_id, info in index["datasets"].items():
+            if dataset_id not in eligible:
+                continue
+            info = copy.deepcopy(info)
+            info["products"] = {
+                product_id: product_info
+                for product_id, product_info in info["products"].items()
+                if product_id in eligible[dataset_id]
+            }
+            datasets.append(info)
+        return datasets
+
+    def _read_product_with_persistent_cache(
+        self, dataset_id: str, product_id: str
+    ) -> tuple[DataCube | Dataset, str | None]:
+        """Load product from the persistent cache stored under `CACHE_PATH`
+        or read it and store in the persistent cache if the cached entry
+        is missing or stale. The fingerprint of the product is returned
+        with it, identifying its coordinates in caches of indices"""
+        fingerprint = ProductCache.fingerprint(
+            self._get_product_entry(dataset_id, product_id)
+        )
+        if fingerprint is None:
+            return self._read_product(dataset_id, product_id), None
+        kube = self._product_cache.load(dataset_id, product_id, fingerprint)
+        if kube is not None:
+            self._LOG.info(
+                "product `%s.%s` loaded from the persistent cache",
+                dataset_id,
+                product_id,
+            )
+            return kube, fingerprint
+        kube = self._read_product(dataset_id, product_id)
+        self._product_cache.dump(dataset_id, product_id, fingerprint, kube)
+        return kube, fingerprint
 
     @log_execution_time(_LOG)
     def dataset_list(self) -> list:
@@ -133,7 +421,7 @@ class Datastore(metaclass=Singleton):
         datasets : list
             List of datasets present in the catalog
         """
-        datasets = set(self.catalog(CACHE_DIR=self.cache_dir))
+        datasets = set(self._get_entries())
         datasets -= {
             "medsea-rea-e3r1",
         }
@@ -156,7 +444,7 @@ class Datastore(metaclass=Singleton):
         products : list
             List of products for the dataset
         """
-        return list(self.catalog(CACHE_DIR=self.cache_dir)[dataset_id])
+        return list(self._get_entries()[dataset_id][1])
 
     @log_execution_time(_LOG)
     def dataset_info(self, dataset_id: str):
@@ -174,14 +462,13 @@ class Datastore(metaclass=Singleton):
             Dict of short information about the dataset
         """
         info = {}
-        entry = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id]
+        entry, product_entries = self._get_entries()[dataset_id]
         if entry.metadata:
-            info["metadata"] = entry.metadata
+            info["metadata"] = copy.deepcopy(entry.metadata)
             info["metadata"]["id"] = dataset_id
         info["products"] = {}
-        for product_id in entry:
-            prod_entry = entry[product_id]
-            info["products"][product_id] = prod_entry.metadata
+        for product_id, prod_entry in product_entries.items():
+            info["products"][product_id] = copy.deepcopy(prod_entry.metadata)
             info["products"][product_id][
                 "description"
             ] = prod_entry.description
@@ -203,9 +490,9 @@ class Datastore(metaclass=Singleton):
         metadata : dict
             DatasetMetadata of the product
         """
-        return self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][
-            product_id
-        ].metadata
+        return copy.deepcopy(
+            self._get_product_entry(dataset_id, product_id).metadata
+        )
 
     def _convert_numpy(self,obj):
         if isinstance(obj, dict):
@@ -254,9 +541,9 @@ class Datastore(metaclass=Singleton):
                 dataset_id, prod_id, role=role
             ):
                 continue
-            entry = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][prod_id]
+            entry = self._get_product_entry(dataset_id, prod_id)
             if entry.metadata:
-                info["metadata"] = entry.metadata
+                info["metadata"] = copy.deepcopy(entry.metadata)
             info["description"] = entry.description
             info["id"] = prod_id
             info["dataset"] = self.dataset_info(dataset_id=dataset_id)
@@ -265,7 +552,9 @@ class Datastore(metaclass=Singleton):
                     dataset_id, prod_id
                 ).to_dict()
             else:
-                info["data"] = entry.read_chunked().to_dict()
+                info["data"] = self._read_product(
+                    dataset_id, prod_id
+                ).to_dict()
             info = self._convert_numpy(info)
             return info
         raise UnauthorizedError()
@@ -307,9 +596,9 @@ class Datastore(metaclass=Singleton):
             dataset_id, product_id, role=role
         ):
             raise UnauthorizedError()
-        entry = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][product_id]
+        entry = self._get_product_entry(dataset_id, product_id)
         if entry.metadata:
-            info["metadata"] = entry.metadata
+            info["metadata"] = copy.deepcopy(entry.metadata)
         info["description"] = entry.description
         info["id"] = product_id
         info["dataset"] = self.dataset_info(dataset_id=dataset_id)
@@ -318,7 +607,9 @@ class Datastore(metaclass=Singleton):
                 dataset_id, product_id
             ).to_dict()
         else:
-            info["data"] = entry.read_chunked().to_dict()
+            info["data"] = self._read_product(
+                dataset_id, product_id
+            ).to_dict()
         info = self._convert_numpy(info)
         return info
 
@@ -326,15 +617,17 @@ class Datastore(metaclass=Singleton):
         self, dataset_id: str, product_id: str, use_cache: bool = False
     ):
         info = {}
-        entry = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][product_id]
+        entry = self._get_product_entry(dataset_id, product_id)
         if entry.metadata:
-            info["metadata"] = entry.metadata
+            info["metadata"] = copy.deepcopy(entry.metadata)
         if use_cache:
             info["data"] = self.get_cached_product_or_read(
                 dataset_id, product_id
             ).to_dict()
         else:
-            info["data"] = entry.read_chunked().to_dict()
+            info["data"] = self._read_product(
+                dataset_id, product_id
+            ).to_dict()
         info = self._convert_numpy(info)
         return info
 
@@ -368,13 +661,58 @@ class Datastore(metaclass=Singleton):
         self._LOG.debug("query: %s", query)
         geoquery: GeoQuery = GeoQuery.parse(query)
         self._LOG.debug("processing GeoQuery: %s", geoquery)
-        # NOTE: we always use catalog directly and single product cache
+        # NOTE: the product is read from the persistent cache shared with
+        # the API pods, not from the in-memory cache of the process
         self._LOG.debug("loading product...")
-        kube = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][
-            product_id
-        ].read_chunked()
+        kube, version = self._read_product_with_persistent_cache(
+            dataset_id, product_id
+        )
         self._LOG.debug("original kube len: %s", len(kube))
-        return Datastore._process_query(kube, geoquery, compute)
+        return Datastore._process_query(
+            kube,
+            geoquery,
+            compute,
+            self._get_spatial_index_getter(dataset_id, product_id, version),
+            self._get_time_index_getter(dataset_id, product_id, version),
+        )
+
+    @log_execution_time(_LOG)
+    def query_cached_product(
+        self,
+        dataset_id: str,
+        product_id: str,
+        query: GeoQuery | dict | str,
+    ) -> DataCube:
+        """Query the product kept in the cache of the process, without
+        reopening its source files. Used for small interactive requests
+        processed in-process, like map tiles and time series of points.
+
+        Parameters
+        ----------
+        dataset_id : str
+            ID of the dataset
+        product_id : str
+            ID of the product
+        query : GeoQuery or dict or str or bytes or bytearray
+            Query to be executed for the given product
+
+        Returns
+        -------
+        kube : DataCube
+            DataCube with `dask.Delayed` object processed according
+            to `query`
+        """
+        geoquery: GeoQuery = GeoQuery.parse(query)
+        self._LOG.debug("processing GeoQuery: %s", geoquery)
+        kube = self.get_cached_product_or_read(dataset_id, product_id)
+        version = self._product_versions.get((dataset_id, product_id))
+        return Datastore._process_query(
+            kube,
+            geoquery,
+            False,
+            self._get_spatial_index_getter(dataset_id, product_id, version),
+            self._get_time_index_getter(dataset_id, product_id, version),
+        )
 
     @log_execution_time(_LOG)
     def estimate(
@@ -402,12 +740,41 @@ class Datastore(metaclass=Singleton):
         self._LOG.debug("query: %s", query)
         geoquery: GeoQuery = GeoQuery.parse(query)
         self._LOG.debug("processing GeoQuery: %s", geoquery)
+        key = (
+            dataset_id,
+            product_id,
+            self.catalog_version,
+            geoquery.canonical_hash(),
+        )
+        with self._estimate_cache_lock:
+            if (size := self._estimate_cache.get(key)) is not None:
+                self._estimate_cache.move_to_end(key)
+                return size
         # NOTE: we always use catalog directly and single product cache
         self._LOG.debug("loading product...")
         # NOTE: for estimation we use cached products
         kube = self.get_cached_product_or_read(dataset_id, product_id)
         self._LOG.debug("original kube len: %s", len(kube))
-        return Datastore._process_query(kube, geoquery, False).nbytes
+        version = self._product_versions.get((dataset_id, product_id))
+        get_spatial_index = self._get_spatial_index_getter(
+            dataset_id, product_id, version
+        )
+        get_time_index = self._get_time_index_getter(
+            dataset_id, product_id, version
+        )
+        size = estimate_nbytes(
+            kube, geoquery, get_spatial_index, get_time_index
+        )
+        if size is None:
+            self._LOG.debug("estimating size by processing the query...")
+            size = Datastore._process_query(
+                kube, geoquery, False, get_spatial_index, get_time_index
+            ).nbytes
+        with self._estimate_cache_lock:
+            self._estimate_cache[key] = size
+            if len(self._estimate_cache) > ESTIMATE_CACHE_SIZE:
+                self._estimate_cache.popitem(last=False)
+        return size
 
     @log_execution_time(_LOG)
     def is_product_valid_for_role(
@@ -416,7 +783,7 @@ class Datastore(metaclass=Singleton):
         product_id: str,
         role: str | list[str] | None = None,
     ):
-        entry = self.catalog(CACHE_DIR=self.cache_dir)[dataset_id][product_id]
+        entry = self._get_product_entry(dataset_id, product_id)
         product_role = BaseRole.PUBLIC
         if entry.metadata:
             product_role = entry.metadata.get("role", BaseRole.PUBLIC)
@@ -431,8 +798,85 @@ class Datastore(metaclass=Singleton):
             return True
         return False
 
+    def _get_spatial_index_getter(
+        self, dataset_id: str, product_id: str, version: str | None
+    ) -> Callable | None:
+        """Get the function returning the cached spatial index of 2D
+        latitude and longitude coordinates of the product or `None` if
+        the product has no fingerprint identifying its grids"""
+        if version is None:
+            return None
+
+        def get_spatial_index(latitude, longitude) -> SpatialIndex:
+            # NOTE: the grid is identified by the fingerprint of source
+            # files, so coordinates are read only to build the index
+            grid_id = ":".join(
+                [version, latitude.name, longitude.name, str(latitude.shape)]
+            )
+            return self._spatial_index_cache.get(
+                dataset_id,
+                product_id,
+                grid_id,
+                lambda: (
+                    np.asarray(latitude.values),
+                    np.asarray(longitude.values),
+                ),
+            )
+
+        return get_spatial_index
+
+    def _get_time_index_getter(
+        self, dataset_id: str, product_id: str, version: str | None
+    ) -> Callable | None:
+        """Get the function returning the cached index of the time
+        coordinate of the product or `None` if the product has
+        no fingerprint identifying its time axes"""
+        if version is None:
+            return None
+
+        def get_time_index(coord) -> TimeIndex:
+            # NOTE: coordinates of a product have unique names, so the axis
+            # is identified without reading its dates
+            axis_id = ":".join([version, coord.name, str(coord.shape)])
+            return self._time_index_cache.get(
+                dataset_id,
+                product_id,
+                axis_id,
+                lambda: np.asarray(coord.values),
+            )
+
+        return get_time_index
+
+    def _build_time_indices(
+        self, dataset_id: str, product_id: str, version: str | None, kube
+    ):
+        """Build the index of the time axis of the loaded product, so that
+        time queries do not wait for it"""
+        get_time_index = self._get_time_index_getter(
+            dataset_id, product_id, version
+        )
+        if get_time_index is None:
+            return
+        if (coord := Datastore._get_time_coord(kube)) is None:
+            return
+        try:
+            get_time_index(coord)
+        except (TypeError, ValueError) as err:
+            self._LOG.debug(
+                "time index of `%s.%s` was not built: %s",
+                dataset_id,
+                product_id,
+                err,
+            )
+
     @staticmethod
-    def _process_query(kube, query: GeoQuery, compute: None | bool = False):
+    def _process_query(
+        kube,
+        query: GeoQuery,
+        compute: None | bool = False,
+        get_spatial_index: Callable | None = None,
+        get_time_index: Callable | None = None,
+    ):
         if isinstance(kube, Dataset):
             Datastore._LOG.debug("filtering with: %s", query.filters)
             try:
@@ -447,18 +891,16 @@ class Datastore(metaclass=Singleton):
             kube = kube[query.variable]
         if query.area:
             Datastore._LOG.debug("subsetting by geobbox...")
-            kube = kube.geobbox(**query.area)
+            kube = Datastore._geobbox(kube, query.area, get_spatial_index)
         if query.location:
             Datastore._LOG.debug("subsetting by locations...")
             kube = kube.locations(**query.location)
         if query.time:
             Datastore._LOG.debug("subsetting by time...")
-            kube = kube.sel(
-                **{
-                    "time": Datastore._maybe_convert_dict_slice_to_slice(
-                        query.time
-                    )
-                }
+            kube = Datastore._sel_time(
+                kube,
+                Datastore._maybe_convert_dict_slice_to_slice(query.time),
+                get_time_index,
             )
         if query.vertical:
             Datastore._LOG.debug("subsetting by vertical...")
@@ -480,6 +922,135 @@ class Datastore(metaclass=Singleton):
                 kube = kube.to_regular()
         return kube.compute() if compute else kube
 
+    @staticmethod
+    def _geobbox(kube, area: dict, get_spatial_index: Callable | None):
+        """Subset the kube by the bounding box. Fields on curvilinear
+        grids are subset with the cached spatial index instead of masks
+        of their 2D coordinates computed by geokube"""
+        if (
+            get_spatial_index is None
+            or area.get("top") is not None
+            or area.get("bottom") is not None
+        ):
+            return kube.geobbox(**area)
+        if isinstance(kube, Field):
+            return Datastore._geobbox_field(kube, area, get_spatial_index)
+        if isinstance(kube, DataCube):
+            return DataCube(
+                fields=[
+                    Datastore._geobbox_field(field, area, get_spatial_index)
+                    for field in kube.fields.values()
+                ],
+                properties=kube.properties,
+                encoding=kube.encoding,
+            )
+        return kube.geobbox(**area)
+
+    @staticmethod
+    def _geobbox_field(
+        field: Field, area: dict, get_spatial_index: Callable
+    ) -> Field:
+        try:
+            coords = get_grid_coords(field)
+        except NotModelledError:
+            coords = None
+        if coords is None:
+            return field.geobbox(**area)
+        lat, lon = coords
+        try:
+            slices = get_spatial_index(lat, lon).bbox_slices(
+                south=area.get("south"),
+                north=area.get("north"),
+                west=area.get("west"),
+                east=area.get("east"),
+            )
+        except ValueError as err:
+            Datastore._LOG.debug("spatial index not used: %s", err)
+            return field.geobbox(**area)
+        if slices is None:
+            # NOTE: geokube retries with reversed bounds or fails
+            return field.geobbox(**area)
+        # NOTE: geokube selects by labels only, so positions are turned
+        # into labels of monotonic dimension coordinates
+        positions = {}
+        for dim, slice_ in zip(lat.dim_names, slices):
+            coord = field.domain.get(dim)
+            if coord is None or coord.dim_names != (dim,):
+                return field.geobbox(**area)
+            values = np.asarray(coord.values)
+            steps = np.diff(values)
+            if not ((steps > 0).all() or (steps < 0).all()):
+                return field.geobbox(**area)
+            positions[dim] = values[slice_]
+        result = field.sel(
+            indexers={
+                dim: slice(values[0], values[-1])
+                for dim, values in positions.items()
+            },
+            roll_if_needed=False,
+        )
+        # NOTE: geokube only logs selections it fails to apply
+        for dim, values in positions.items():
+            coord = result.domain.get(dim)
+            if coord is None or not np.array_equal(
+                np.asarray(coord.values), values
+            ):
+                Datastore._LOG.debug(
+                    "spatial index not used: `%s` was not selected", dim
+                )
+                return field.geobbox(**area)
+        return result
+
+    @staticmethod
+    def _sel_time(kube, time_indexer, get_time_index: Callable | None):
+        """Select time steps of the kube with geokube. Dictionaries of
+        calendar components are first resolved to dates with the cached
+        index of the time axis shared by all fields of the kube"""
+        if get_time_index is not None and isinstance(time_indexer, dict):
+            if (coord := Datastore._get_time_coord(kube)) is not None:
+                try:
+                    index = get_time_index(coord)
+                    dates = np.asarray(
+                        index.index[index.positions(time_indexer)]
+                    )
+                except (KeyError, TypeError, ValueError) as err:
+                    Datastore._LOG.debug("time index not used: %s", err)
+                else:
+                    # NOTE: geokube reports empty selections of components
+                    if dates.size:
+                        return kube.sel(time=dates)
+        return kube.sel(time=time_indexer)
+
+    @staticmethod
+    def _get_time_coord(kube):
+        """Get the time coordinate of the dimension shared by all fields
+        of the kube or `None` if there is no such dimension"""
+        if isinstance(kube, Field):
+            fields = [kube]
+        elif isinstance(kube, DataCube):
+            fields = list(kube.fields.values())
+        else:
+            # NOTE: cubes of datasets can have different time axes
+            return None
+        time_coord = None
+        for field in fields:
+            coord = field.domain.get(AxisType.TIME)
+            if (
+                coord is None
+                or coord.dim_names != (coord.name,)
+                or coord.name not in field.dim_names
+            ):
+                return None
+            # NOTE: fields of a cube share coordinates with the same name
+            if time_coord is None:
+                time_coord = coord
+            elif (coord.name, coord.shape) != (
+                time_coord.name,
+                time_coord.shape,
+            ):
+                return None
+        return time_coord
+
     @staticmethod
     def _maybe_convert_dict_slice_to_slice(dict_vals):
         if "start" in dict_vals or "stop" in dict_vals:
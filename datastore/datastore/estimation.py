@@ -0,0 +1,244 @@
+"""Module with analytic estimation of the size of query results"""
+from __future__ import annotations
+
+import math
+import logging
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from geokube.core.axis import AxisType
+from geokube.core.coordinate import CoordinateType
+from geokube.core.datacube import DataCube
+from geokube.core.field import Field
+
+from geoquery.geoquery import GeoQuery
+
+from .time_index import TimeIndex
+
+_LOG = logging.getLogger("geokube.estimation")
+
+
+class NotModelledError(ValueError):
+    """Query cannot be estimated based on coordinates only"""
+
+
+def estimate_nbytes(
+    kube: DataCube,
+    query: GeoQuery,
+    get_spatial_index: Callable | None = None,
+    get_time_index: Callable | None = None,
+) -> int | None:
+    """Estimate the number of bytes of the result of `query` using only
+    coordinates of `kube`, without building a lazy DataCube.
+
+    Parameters
+    ----------
+    kube : DataCube
+        Product to be queried
+    query : GeoQuery
+        Query to estimate
+    get_spatial_index : callable, optional
+        Function returning the cached `SpatialIndex` of 2D latitude
+        and longitude coordinates. Bounding boxes on such grids are not
+        modelled without it
+    get_time_index : callable, optional
+        Function returning the cached `TimeIndex` of the time coordinate
+
+    Returns
+    -------
+    nbytes : int or None
+        Estimated number of bytes or `None` if the query contains
+        operations that cannot be modelled
+    """
+    if not isinstance(kube, DataCube):
+        return None
+    if query.location or query.resample or query.regrid:
+        return None
+    if query.area and (
+        query.area.get("top") is not None
+        or query.area.get("bottom") is not None
+    ):
+        return None
+    if query.variable:
+        kube = kube[query.variable]
+    fields = [kube] if isinstance(kube, Field) else kube.fields.values()
+    try:
+        return sum(
+            _estimate_field_nbytes(
+                field, query, get_spatial_index, get_time_index
+            )
+            for field in fields
+        )
+    except NotModelledError as err:
+        _LOG.debug("analytic estimation not possible: %s", err)
+        return None
+
+
+def _estimate_field_nbytes(
+    field: Field,
+    query: GeoQuery,
+    get_spatial_index: Callable | None = None,
+    get_time_index: Callable | None = None,
+) -> int:
+    counts = {}
+    if query.area and (coords := get_grid_coords(field)) is not None:
+        if get_spatial_index is None:
+            raise NotModelledError("spatial index is not available")
+        lat, lon = coords
+        slices = get_spatial_index(lat, lon).bbox_slices(
+            south=query.area.get("south"),
+            north=query.area.get("north"),
+            west=query.area.get("west"),
+            east=query.area.get("east"),
+        )
+        if slices is None:
+            # NOTE: geokube retries with reversed bounds or fails
+            raise NotModelledError("no grid cells in the bounding box")
+        for dim, slice_ in zip(lat.dim_names, slices):
+            counts[dim] = slice_.stop - slice_.start
+    elif query.area:
+        _update_counts(
+            counts,
+            field,
+            AxisType.LATITUDE,
+            lambda coord: _count_between(
+                np.asarray(coord.values),
+                query.area.get("south"),
+                query.area.get("north"),
+            ),
+        )
+        _update_counts(
+            counts,
+            field,
+            AxisType.LONGITUDE,
+            lambda coord: _count_longitude(
+                np.asarray(coord.values),
+                query.area.get("west"),
+                query.area.get("east"),
+            ),
+        )
+    if query.time:
+        _update_counts(
+            counts,
+            field,
+            AxisType.TIME,
+            lambda coord: _count_time(coord, query.time, get_time_index),
+        )
+    if query.vertical:
+        _update_counts(
+            counts,
+            field,
+            AxisType.VERTICAL,
+            lambda coord: _count_vertical(
+                np.asarray(coord.values), query.vertical
+            ),
+        )
+    if field.size == 0:
+        return 0
+    itemsize = field.nbytes // field.size
+    return itemsize * math.prod(
+        counts.get(dim, size)
+        for dim, size in zip(field.dim_names, field.shape)
+    )
+
+
+def get_grid_coords(field: Field):
+    """Get 2D latitude and longitude coordinates of the field if they
+    depend on the same two dimensions of the field"""
+    lat = field.domain.get(AxisType.LATITUDE)
+    lon = field.domain.get(AxisType.LONGITUDE)
+    if lat is None or lon is None:
+        return None
+    if (
+        lat.type is not CoordinateType.DEPENDENT
+        or lon.type is not CoordinateType.DEPENDENT
+    ):
+        return None
+    if (
+        len(lat.dim_names) != 2
+        or lat.dim_names != lon.dim_names
+        or not set(lat.dim_names) <= set(field.dim_names)
+    ):
+        raise NotModelledError("latitude and longitude are not on a 2D grid")
+    return lat, lon
+
+
+def _update_counts(counts: dict, field: Field, axis_type, count_func):
+    coord = field.domain.get(axis_type)
+    if coord is None or coord.type is CoordinateType.SCALAR:
+        # NOTE: selection is skipped by geokube for missing coordinates
+        return
+    if coord.name not in field.dim_names:
+        raise NotModelledError(
+            f"coordinate `{coord.name}` is not a dimension of the field"
+        )
+    counts[coord.name] = count_func(coord)
+
+
+def _count_between(values, lower=None, upper=None) -> int:
+    mask = np.ones(values.shape, dtype=bool)
+    if lower is not None:
+        mask &= values >= lower
+    if upper is not None:
+        mask &= values <= upper
+    return int(np.count_nonzero(mask))
+
+
+def _count_longitude(values, west=None, east=None) -> int:
+    bounds = [val for val in (west, east) if val is not None]
+    if values.size and np.min(values) >= 0 and any(val < 0 for val in bounds):
+        values = ((values + 180) % 360) - 180
+    elif values.size and np.min(values) < 0 and any(val > 180 for val in bounds):
+        values = values % 360
+    if west is not None and east is not None and west > east:
+        raise NotModelledError("bounding box crossing the antimeridian")
+    return _count_between(values, west, east)
+
+
+def _count_slice(values, slice_) -> int:
+    index = pd.Index(values)
+    if not (index.is_monotonic_increasing or index.is_monotonic_decreasing):
+        raise NotModelledError("coordinate is not monotonic")
+    indexer = index.slice_indexer(slice_.start, slice_.stop, slice_.step)
+    return len(range(*indexer.indices(len(index))))
+
+
+def _count_time(
+    coord, time_query: dict, get_time_index: Callable | None = None
+) -> int:
+    try:
+        if get_time_index is None:
+            index = TimeIndex(np.asarray(coord.values))
+        else:
+            index = get_time_index(coord)
+    except (TypeError, ValueError) as err:
+        raise NotModelledError(f"time coordinate cannot be indexed: {err}")
+    if "start" in time_query or "stop" in time_query:
+        indexer = slice(
+            time_query.get("start"),
+            time_query.get("stop"),
+            time_query.get("step"),
+        )
+    else:
+        indexer = time_query
+    try:
+        positions = index.positions(indexer)
+    except KeyError as err:
+        raise NotModelledError(f"unsupported time query: {err}")
+    if isinstance(positions, slice):
+        return len(range(*positions.indices(index.size)))
+    return positions.size
+
+
+def _count_vertical(values, vertical) -> int:
+    if isinstance(vertical, dict):
+        return _count_slice(
+            values,
+            slice(
+                vertical.get("start"),
+                vertical.get("stop"),
+                vertical.get("step"),
+            ),
+        )
+    return np.array(vertical, ndmin=1).size
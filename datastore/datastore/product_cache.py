@@ -0,0 +1,199 @@
+"""Module with the persistent cache of opened products shared by pods"""
+from __future__ import annotations
+
+import os
+import glob
+import stat
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+from typing import Any
+
+_PATH_ATTRS = ("path", "ancillary_path", "zippath")
+
+
+class ProductCache:
+    """Versioned on-disk cache of opened products.
+
+    Each product is stored under `<cache_dir>/products/<dataset_id>` as
+    a JSON header with the fingerprint of the source files and a pickle
+    with the opened kube. An entry is valid only if the format version,
+    the context and the fingerprint stored in the header match.
+
+    Entries are pickles, so loading them runs arbitrary code stored in
+    the cache. The cache directory must be writable only by the user
+    running the API and executor pods: directories are created with mode
+    `0o700`, files with mode `0o600`, and entries are ignored unless they
+    and their directories are owned by the current user and not writable
+    by others.
+    """
+
+    FORMAT_VERSION = 1
+    _LOG = logging.getLogger("geokube.ProductCache")
+
+    def __init__(self, cache_dir: str, context: str | None = None) -> None:
+        self.path = os.path.join(cache_dir, "products")
+        self.context = context
+
+    @staticmethod
+    def fingerprint(entry: Any) -> str | None:
+        """Compute the fingerprint of the catalog entry based on its
+        arguments and modification times and sizes of the source files.
+
+        Parameters
+        ----------
+        entry : intake.source.DataSource
+            Catalog entry of the product
+
+        Returns
+        -------
+        fingerprint : str or None
+            Hex digest of the fingerprint or `None` if no local source files
+            were found for the entry
+        """
+        files = []
+        for attr in _PATH_ATTRS:
+            paths = getattr(entry, attr, None)
+            if not paths:
+                continue
+            if isinstance(paths, str):
+                paths = [paths]
+            for path in paths:
+                files.extend(glob.glob(path))
+        if not files:
+            return None
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                getattr(entry, "_captured_init_kwargs", {}),
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+        for file in sorted(set(files)):
+            stat = os.stat(file)
+            digest.update(f"{file}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+
+    def _get_paths(self, dataset_id: str, product_id: str) -> tuple[str, str]:
+        base = os.path.join(self.path, dataset_id, product_id)
+        return f"{base}.json", f"{base}.pkl"
+
+    def _is_trusted(self, path: str) -> bool:
+        """Check if the file and its parent directories up to the cache
+        directory are owned by the current user and not writable by
+        group or others"""
+        paths = [path, os.path.dirname(path), self.path]
+        for item in paths:
+            try:
+                status = os.stat(item)
+            except OSError:
+                return False
+            if status.st_uid != os.getuid() or status.st_mode & (
+                stat.S_IWGRP | stat.S_IWOTH
+            ):
+                self._LOG.warning(
+                    "ignoring persistent cache: `%s` is not owned by the"
+                    " current user or is writable by others",
+                    item,
+                )
+                return False
+        return True
+
+    def _get_header(self, fingerprint: str) -> dict:
+        return {
+            "version": self.FORMAT_VERSION,
+            "context": self.context,
+            "fingerprint": fingerprint,
+        }
+
+    def load(self, dataset_id: str, product_id: str, fingerprint: str):
+        """Load the product if the cached entry is valid for `fingerprint`
+
+        Parameters
+        ----------
+        dataset_id : str
+            ID of the dataset
+        product_id : str
+            ID of the product
+        fingerprint : str
+            Current fingerprint of the catalog entry
+
+        Returns
+        -------
+        kube : DataCube or Dataset or None
+            Cached product or `None` if the entry is missing or stale
+        """
+        header_path, data_path = self._get_paths(dataset_id, product_id)
+        try:
+            with open(header_path, "rt") as file:
+                header = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if header != self._get_header(fingerprint):
+            self._LOG.info(
+                "persistent cache for `%s.%s` is stale", dataset_id, product_id
+            )
+            return None
+        if not self._is_trusted(data_path):
+            return None
+        try:
+            with open(data_path, "rb") as file:
+                return pickle.load(file)
+        except Exception:
+            self._LOG.warning(
+                "failed to load persistent cache for `%s.%s`",
+                dataset_id,
+                product_id,
+                exc_info=True,
+            )
+            return None
+
+    def dump(
+        self, dataset_id: str, product_id: str, fingerprint: str, kube
+    ) -> None:
+        """Store the product in the cache. Files are replaced atomically,
+        so the cache can be shared by many processes.
+
+        Parameters
+        ----------
+        dataset_id : str
+            ID of the dataset
+        product_id : str
+            ID of the product
+        fingerprint : str
+            Current fingerprint of the catalog entry
+        kube : DataCube or Dataset
+            Product to store
+        """
+        header_path, data_path = self._get_paths(dataset_id, product_id)
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            os.makedirs(
+                os.path.dirname(header_path), mode=0o700, exist_ok=True
+            )
+            self._write_atomic(data_path, pickle.dumps(kube))
+            self._write_atomic(
+                header_path, json.dumps(self._get_header(fingerprint)).encode()
+            )
+        except Exception:
+            self._LOG.warning(
+                "failed to store persistent cache for `%s.%s`",
+                dataset_id,
+                product_id,
+                exc_info=True,
+            )
+
+    @staticmethod
+    def _write_atomic(path: str, content: bytes) -> None:
+        # NOTE: `mkstemp` creates files with mode `0o600`
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
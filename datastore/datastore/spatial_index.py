@@ -0,0 +1,278 @@
+"""Module with the spatial index of curvilinear and projected grids"""
+from __future__ import annotations
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+CELLS_PER_BUCKET = 16
+DEFAULT_MEMORY_ENTRIES = 64
+
+
+class SpatialIndex:
+    """Bucket grid over 2D latitude and longitude of grid cells.
+
+    Cells are assigned to buckets of the regular lat/lon grid covering
+    the extent of the coordinates and stored bucket by bucket, so that
+    cells in a bucket are found without scanning the whole grid. Bounding
+    boxes are turned into slices covering all cells inside, the same as
+    the ones computed by `geokube` from masks of dependent coordinates.
+    """
+
+    def __init__(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        order: np.ndarray | None = None,
+        offsets: np.ndarray | None = None,
+        n_buckets: tuple[int, int] | None = None,
+    ) -> None:
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        if latitude.shape != longitude.shape:
+            raise ValueError("latitude and longitude must have the same shape")
+        self.shape = latitude.shape
+        self.latitude = latitude.ravel()
+        self.longitude = longitude.ravel()
+        valid = np.isfinite(self.latitude) & np.isfinite(self.longitude)
+        if not valid.any():
+            raise ValueError("no valid coordinates")
+        self.extent = (
+            self.latitude[valid].min(),
+            self.latitude[valid].max(),
+            self.longitude[valid].min(),
+            self.longitude[valid].max(),
+        )
+        if n_buckets is None:
+            side = int(np.ceil(np.sqrt(max(valid.sum() // CELLS_PER_BUCKET, 1))))
+            n_buckets = (side, side)
+        self.n_buckets = tuple(int(n) for n in n_buckets)
+        lat_min, lat_max, lon_min, lon_max = self.extent
+        self.bucket_size = (
+            max(lat_max - lat_min, np.finfo(float).eps) / self.n_buckets[0],
+            max(lon_max - lon_min, np.finfo(float).eps) / self.n_buckets[1],
+        )
+        if order is None or offsets is None:
+            buckets = np.full(self.latitude.size, self._n_total, dtype=np.int64)
+            buckets[valid] = self._bucket_ids(
+                self.latitude[valid], self.longitude[valid]
+            )
+            order = np.argsort(buckets, kind="stable")
+            offsets = np.searchsorted(
+                buckets[order], np.arange(self._n_total + 1)
+            )
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def _n_total(self) -> int:
+        return self.n_buckets[0] * self.n_buckets[1]
+
+    def _bucket_rows(self, lat: np.ndarray) -> np.ndarray:
+        rows = np.floor((lat - self.extent[0]) / self.bucket_size[0])
+        return np.clip(rows, 0, self.n_buckets[0] - 1).astype(np.int64)
+
+    def _bucket_cols(self, lon: np.ndarray) -> np.ndarray:
+        cols = np.floor((lon - self.extent[2]) / self.bucket_size[1])
+        return np.clip(cols, 0, self.n_buckets[1] - 1).astype(np.int64)
+
+    def _bucket_ids(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return self._bucket_rows(lat) * self.n_buckets[1] + self._bucket_cols(
+            lon
+        )
+
+    def _cells(self, rows: range, cols: range) -> np.ndarray:
+        # NOTE: buckets of a row of the bucket grid are stored contiguously
+        parts = [
+            self.order[
+                self.offsets[row * self.n_buckets[1] + cols.start] : self.offsets[
+                    row * self.n_buckets[1] + cols.stop
+                ]
+            ]
+            for row in rows
+            if cols.stop > cols.start
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def bbox_slices(
+        self,
+        south: float | None = None,
+        north: float | None = None,
+        west: float | None = None,
+        east: float | None = None,
+    ) -> tuple[slice, ...] | None:
+        """Get slices of grid dimensions covering all cells inside
+        the bounding box. Missing bounds are not applied.
+
+        Returns
+        -------
+        slices : tuple of slice or None
+            Slices of the dimensions or `None` if no cell is inside
+        """
+        lat_min, lat_max, lon_min, lon_max = self.extent
+        south = lat_min if south is None else south
+        north = lat_max if north is None else north
+        west = lon_min if west is None else west
+        east = lon_max if east is None else east
+        if south > north or west > east:
+            return None
+        if north < lat_min or south > lat_max or east < lon_min or west > lon_max:
+            return None
+        rows = range(
+            int(self._bucket_rows(np.array(south))),
+            int(self._bucket_rows(np.array(north))) + 1,
+        )
+        cols = range(
+            int(self._bucket_cols(np.array(west))),
+            int(self._bucket_cols(np.array(east))) + 1,
+        )
+        cells = self._cells(rows, cols)
+        lat, lon = self.latitude[cells], self.longitude[cells]
+        cells = cells[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        if cells.size == 0:
+            return None
+        indices = np.unravel_index(cells, self.shape)
+        return tuple(slice(int(idx.min()), int(idx.max()) + 1) for idx in indices)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Get arrays required to restore the index"""
+        return {
+            "latitude": self.latitude.reshape(self.shape),
+            "longitude": self.longitude.reshape(self.shape),
+            "order": self.order,
+            "offsets": self.offsets,
+            "n_buckets": np.array(self.n_buckets),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> SpatialIndex:
+        """Restore the index from arrays returned by `to_arrays`"""
+        return cls(
+            arrays["latitude"],
+            arrays["longitude"],
+            order=arrays["order"],
+            offsets=arrays["offsets"],
+            n_buckets=tuple(arrays["n_buckets"]),
+        )
+
+
+class SpatialIndexCache:
+    """Cache of spatial indices kept in memory and stored under
+    `<cache_dir>/products/<dataset_id>/<product_id>.<key>.sindex.npz`
+    next to the persistent cache of the product, so that indices are
+    built once and shared by pods.
+
+    Grids are identified by IDs given by callers, e.g. derived from
+    the fingerprint of the product, so that coordinates are read only
+    when the index is built."""
+
+    _LOG = logging.getLogger("geokube.SpatialIndexCache")
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_entries: int = DEFAULT_MEMORY_ENTRIES,
+    ) -> None:
+        self.path = None
+        if cache_dir is not None:
+            self.path = os.path.join(cache_dir, "products")
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, SpatialIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_path(self, dataset_id: str, product_id: str, key: str) -> str:
+        return os.path.join(
+            self.path, dataset_id, f"{product_id}.{key}.sindex.npz"
+        )
+
+    def get(
+        self,
+        dataset_id: str,
+        product_id: str,
+        grid_id: str,
+        get_coords: Callable[[], tuple[np.ndarray, np.ndarray]],
+    ) -> SpatialIndex:
+        """Get the index of the grid, loading it from the disk or building
+        it if it is not cached
+
+        Parameters
+        ----------
+        dataset_id : str
+            ID of the dataset
+        product_id : str
+            ID of the product
+        grid_id : str
+            ID of the grid, changing whenever its coordinates change
+        get_coords : callable
+            Function returning 2D latitude and longitude of grid cells,
+            called only if the index is built
+
+        Returns
+        -------
+        index : SpatialIndex
+            Index of the grid
+        """
+        cache_key = (dataset_id, product_id, grid_id)
+        with self._lock:
+            if (index := self._entries.get(cache_key)) is not None:
+                self._entries.move_to_end(cache_key)
+                return index
+        key = hashlib.sha256(grid_id.encode()).hexdigest()[:32]
+        index = self._load(dataset_id, product_id, key)
+        if index is None:
+            index = SpatialIndex(*get_coords())
+            self._dump(dataset_id, product_id, key, index)
+        with self._lock:
+            self._entries[cache_key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def _load(
+        self, dataset_id: str, product_id: str, key: str
+    ) -> SpatialIndex | None:
+        if self.path is None:
+            return None
+        try:
+            with np.load(self._get_path(dataset_id, product_id, key)) as arrays:
+                return SpatialIndex.from_arrays(arrays)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._LOG.warning(
+                "failed to load spatial index of `%s.%s`",
+                dataset_id,
+                product_id,
+                exc_info=True,
+            )
+            return None
+
+    def _dump(
+        self, dataset_id: str, product_id: str, key: str, index: SpatialIndex
+    ) -> None:
+        if self.path is None:
+            return
+        path = self._get_path(dataset_id, product_id, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    np.savez(file, **index.to_arrays())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except Exception:
+            self._LOG.warning(
+                "failed to store spatial index of `%s.%s`",
+                dataset_id,
+                product_id,
+                exc_info=True,
+            )
@@ -0,0 +1,227 @@
+"""Module with the two-tier cache of rendered map tiles"""
+from __future__ import annotations
+
+import os
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Iterator
+
+DEFAULT_MEMORY_SIZE_BYTES = 64 * 1024**2
+DEFAULT_DISK_SIZE_BYTES = 1024**3
+PRUNE_INTERVAL_WRITES = 100
+# NOTE: temporary files older than that are left by crashed writers
+TMP_FILE_MAX_AGE_SEC = 3600
+_TMP_PREFIX = ".tmp-"
+
+
+def iter_tile_bboxes(
+    zoom: int, bbox: tuple[float, float, float, float] | None = None
+) -> Iterator[tuple[float, float, float, float]]:
+    """Iterate over extents of tiles of the global lat/lon tiling scheme
+    (`2**(zoom + 1)` columns and `2**zoom` rows of square tiles) which
+    intersect the bounding box.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level, 0 for two tiles covering the globe
+    bbox : tuple of float, optional
+        Bounding box (west, south, east, north), the globe if `None`
+
+    Yields
+    ------
+    bbox : tuple of float
+        Extent of the tile (west, south, east, north)
+    """
+    if zoom < 0:
+        raise ValueError("zoom level must be non-negative")
+    west, south, east, north = bbox or (-180.0, -90.0, 180.0, 90.0)
+    size = 180.0 / 2**zoom
+    first_col = max(int((west + 180.0) // size), 0)
+    last_col = min(int(-((-180.0 - east) // size)), 2 ** (zoom + 1))
+    first_row = max(int((90.0 - north) // size), 0)
+    last_row = min(int(-((south - 90.0) // size)), 2**zoom)
+    for row in range(first_row, last_row):
+        for col in range(first_col, last_col):
+            yield (
+                -180.0 + col * size,
+                90.0 - (row + 1) * size,
+                -180.0 + (col + 1) * size,
+                90.0 - row * size,
+            )
+
+
+class TileCache:
+    """Cache of rendered tiles with the in-memory LRU tier and the disk
+    tier under `<cache_dir>/tiles`, shared by pods.
+
+    Keys are expected to be deterministic digests of the query and
+    the catalog version, so tiles are not reused once the catalog
+    changes. Tiles become stale when source files of the product are
+    updated without any change of the catalog, and are served until
+    evicted when the tiers are full.
+    """
+
+    _LOG = logging.getLogger("geokube.TileCache")
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        memory_size_bytes: int = DEFAULT_MEMORY_SIZE_BYTES,
+        disk_size_bytes: int = DEFAULT_DISK_SIZE_BYTES,
+    ) -> None:
+        self.path = None
+        if cache_dir is not None:
+            self.path = os.path.join(cache_dir, "tiles")
+        self.memory_size_bytes = memory_size_bytes
+        self.disk_size_bytes = disk_size_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk_writes = 0
+        self._prune_thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def _put_memory(self, key: str, tile: bytes) -> None:
+        if len(tile) > self.memory_size_bytes:
+            return
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self._memory_size -= len(previous)
+            self._entries[key] = tile
+            self._memory_size += len(tile)
+            while self._memory_size > self.memory_size_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def get(self, key: str) -> bytes | None:
+        """Get the tile from memory or from the disk
+
+        Parameters
+        ----------
+        key : str
+            Key of the tile
+
+        Returns
+        -------
+        tile : bytes or None
+            Encoded tile or `None` if it is not cached
+        """
+        with self._lock:
+            if (tile := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return tile
+        if self.path is None:
+            return None
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as file:
+                tile = file.read()
+            # NOTE: modification time is used to evict least recently used
+            # tiles from the disk
+            os.utime(path)
+        except OSError:
+            return None
+        self._put_memory(key, tile)
+        return tile
+
+    def put(self, key: str, tile: bytes) -> None:
+        """Store the tile in memory and on the disk. Files are replaced
+        atomically and the disk tier is pruned in the background every
+        `PRUNE_INTERVAL_WRITES` writes.
+
+        Parameters
+        ----------
+        key : str
+            Key of the tile
+        tile : bytes
+            Encoded tile
+        """
+        self._put_memory(key, tile)
+        if self.path is None:
+            return
+        path = self._get_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=_TMP_PREFIX, dir=os.path.dirname(path)
+            )
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(tile)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            self._LOG.warning("failed to store tile `%s`", key, exc_info=True)
+            return
+        with self._lock:
+            self._disk_writes += 1
+            if self._disk_writes % PRUNE_INTERVAL_WRITES:
+                return
+            # NOTE: walking the disk tier takes long, so the request
+            # storing the tile does not wait for it
+            if self._prune_thread and self._prune_thread.is_alive():
+                return
+            self._prune_thread = threading.Thread(
+                target=self._prune_in_background,
+                name="tile-cache-prune",
+                daemon=True,
+            )
+            self._prune_thread.start()
+
+    def _prune_in_background(self) -> None:
+        try:
+            self.prune()
+        except Exception:
+            self._LOG.warning("failed to prune the disk cache", exc_info=True)
+
+    def prune(self) -> int:
+        """Remove least recently used tiles from the disk until the disk
+        tier fits in `disk_size_bytes`. Temporary files of tiles being
+        written, possibly by other pods, are skipped unless they are
+        older than `TMP_FILE_MAX_AGE_SEC`.
+
+        Returns
+        -------
+        removed : int
+            Number of removed tiles
+        """
+        if self.path is None:
+            return 0
+        files = []
+        oldest_tmp_file = time.time() - TMP_FILE_MAX_AGE_SEC
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if not name.startswith(_TMP_PREFIX):
+                    files.append((stat.st_mtime, stat.st_size, path))
+                elif stat.st_mtime < oldest_tmp_file:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        total_size = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total_size <= self.disk_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        if removed:
+            self._LOG.info("removed %d tiles from the disk cache", removed)
+        return removed
@@ -0,0 +1,225 @@
+"""Module with the index of time axes resolving time queries to positions"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+COMPONENTS = ("year", "month", "day", "hour")
+DEFAULT_MEMORY_ENTRIES = 256
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class TimeIndex:
+    """Index of the sorted time axis with tables of calendar components.
+
+    Slices are resolved with the binary search of `pandas` or `xarray`
+    indices (including partial date strings) and dictionaries of
+    components, e.g. `{"year": [2000, 2001], "hour": 12}`, with
+    the binary search of years followed by lookups of positions grouped
+    by values of the remaining components. Axes with `cftime` dates are
+    supported.
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        values = np.asarray(values).reshape(-1)
+        if np.issubdtype(values.dtype, np.datetime64):
+            self.index = pd.DatetimeIndex(values)
+        else:
+            self.index = xr.CFTimeIndex(values)
+        if not self.index.is_monotonic_increasing:
+            raise ValueError("time axis is not sorted")
+        self.components = {
+            name: np.asarray(getattr(self.index, name), dtype=np.int32)
+            for name in COMPONENTS
+        }
+        self.groups = {
+            name: _group_positions(self.components[name])
+            for name in COMPONENTS[1:]
+        }
+
+    @property
+    def size(self) -> int:
+        return len(self.index)
+
+    def slice_positions(self, start=None, stop=None, step=None) -> slice:
+        """Get the slice of positions of dates between `start`
+        and `stop`, both inclusive"""
+        result = self.index.slice_indexer(start, stop, step)
+        return slice(
+            None if result.start is None else int(result.start),
+            None if result.stop is None else int(result.stop),
+            None if result.step is None else int(result.step),
+        )
+
+    def component_positions(self, components: dict) -> np.ndarray:
+        """Get sorted positions of dates matching all of the components
+
+        Parameters
+        ----------
+        components : dict
+            Values of `year`, `month`, `day` and `hour` as integers
+            or lists of integers
+
+        Returns
+        -------
+        positions : numpy.ndarray
+            Positions of matching dates
+
+        Raises
+        -------
+        KeyError
+            If components other than `year`, `month`, `day` and `hour`
+            are requested
+        """
+        if unknown := set(components) - set(COMPONENTS):
+            raise KeyError(f"unsupported time components: {sorted(unknown)}")
+        values = {
+            name: np.unique(np.array(value, dtype=int, ndmin=1))
+            for name, value in components.items()
+        }
+        if "year" in values:
+            # NOTE: years of the sorted axis are sorted, so each year
+            # is a contiguous range of positions
+            years = self.components["year"]
+            ranges = zip(
+                np.searchsorted(years, values["year"], side="left"),
+                np.searchsorted(years, values["year"], side="right"),
+            )
+        else:
+            ranges = [(0, self.size)]
+        ranges = [(start, stop) for start, stop in ranges if stop > start]
+        names = [name for name in COMPONENTS[1:] if name in values]
+        if not names:
+            return np.concatenate(
+                [np.arange(start, stop) for start, stop in ranges]
+                or [_EMPTY]
+            )
+        # NOTE: positions are taken from the group of the most selective
+        # component and filtered by the remaining ones
+        name = min(
+            names,
+            key=lambda name: sum(
+                self.groups[name].get(value, _EMPTY).size
+                for value in values[name]
+            ),
+        )
+        positions = np.sort(
+            np.concatenate(
+                [
+                    group[slice(*np.searchsorted(group, [start, stop]))]
+                    for value in values[name]
+                    if (group := self.groups[name].get(value)) is not None
+                    for start, stop in ranges
+                ]
+                or [_EMPTY]
+            )
+        )
+        for other in names:
+            if other != name:
+                positions = positions[
+                    np.isin(self.components[other][positions], values[other])
+                ]
+        return positions
+
+    def positions(self, indexer) -> slice | np.ndarray:
+        """Resolve the time query to positions on the axis
+
+        Parameters
+        ----------
+        indexer : slice or dict
+            Slice of dates or dictionary of calendar components
+
+        Returns
+        -------
+        positions : slice or numpy.ndarray
+            Slice if positions are evenly spaced, array otherwise
+
+        Raises
+        -------
+        TypeError
+            If the indexer is neither a slice nor a dictionary
+        """
+        if isinstance(indexer, slice):
+            return self.slice_positions(indexer.start, indexer.stop, indexer.step)
+        if isinstance(indexer, dict):
+            return _to_slice_if_possible(self.component_positions(indexer))
+        raise TypeError(f"unsupported time indexer: {indexer!r}")
+
+
+def _group_positions(values: np.ndarray) -> dict[int, np.ndarray]:
+    order = np.argsort(values, kind="stable")
+    unique, starts = np.unique(values[order], return_index=True)
+    return dict(zip(unique.tolist(), np.split(order, starts[1:])))
+
+
+def _to_slice_if_possible(positions: np.ndarray) -> slice | np.ndarray:
+    if positions.size == 0:
+        return positions
+    if positions.size == 1:
+        return slice(int(positions[0]), int(positions[0]) + 1)
+    steps = np.diff(positions)
+    if (steps == steps[0]).all():
+        return slice(
+            int(positions[0]), int(positions[-1]) + 1, int(steps[0])
+        )
+    return positions
+
+
+class TimeIndexCache:
+    """In-memory LRU cache of time indices of products. Axes are
+    identified by IDs given by callers, e.g. derived from the fingerprint
+    of the product, so that dates are read only when the index is built"""
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, TimeIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        dataset_id: str,
+        product_id: str,
+        axis_id: str,
+        get_values: Callable[[], np.ndarray],
+    ) -> TimeIndex:
+        """Get the index of the time axis, building it if it is not cached
+
+        Parameters
+        ----------
+        dataset_id : str
+            ID of the dataset
+        product_id : str
+            ID of the product
+        axis_id : str
+            ID of the time axis, changing whenever its dates change
+        get_values : callable
+            Function returning dates of the time axis, called only
+            if the index is built
+
+        Returns
+        -------
+        index : TimeIndex
+            Index of the time axis
+
+        Raises
+        -------
+        ValueError
+            If the time axis is not sorted
+        """
+        cache_key = (dataset_id, product_id, axis_id)
+        with self._lock:
+            if (index := self._entries.get(cache_key)) is not None:
+                self._entries.move_to_end(cache_key)
+                return index
+        index = TimeIndex(get_values())
+        with self._lock:
+            self._entries[cache_key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
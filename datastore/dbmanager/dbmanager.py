@@ -1,26 +1,31 @@
 from __future__ import annotations
 
 import os
+import json
 import yaml
 import logging
 import uuid
 import secrets
-from datetime import datetime
-from enum import auto, Enum as Enum_, unique
+from datetime import datetime, timedelta
+from enum import auto, Enum as Enum_, IntEnum, unique
 
 from sqlalchemy import (
     Column,
     create_engine,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
     Integer,
     JSON,
     Sequence,
     String,
     Table,
+    select,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
 from .singleton import Singleton
@@ -54,6 +59,22 @@ class RequestStatus(Enum_):
         return cls.PENDING
 
 
+@unique
+class RequestPriority(IntEnum):
+    """Priority of the Request determining the lane (queue) it is
+    scheduled in"""
+
+    BULK = 0
+    NORMAL = 1
+    HIGH = 2
+
+    def queue_name(self, executor_type: str) -> str:
+        """Get name of the queue of the lane for the executor type"""
+        if self is RequestPriority.NORMAL:
+            return f"{executor_type}_queue"
+        return f"{executor_type}_queue_{self.name.lower()}"
+
+
 class _Repr:
     def __repr__(self):
         cols = self.__table__.columns.keys()  # pylint: disable=no-member
@@ -132,6 +153,39 @@ class Download(Base):
     created_on = Column(DateTime, default=datetime.now)
 
 
+class RequestProgress(Base):
+    """Fraction of the result of the request written so far"""
+
+    __tablename__ = "request_progress"
+    request_id = Column(
+        Integer, ForeignKey("requests.request_id"), primary_key=True
+    )
+    progress = Column(Float, nullable=False, default=0.0)
+    last_update = Column(DateTime, default=datetime.utcnow)
+
+
+class CachedResult(Base):
+    """Artifact of the request reused by identical requests.
+
+    `ref_count` is the number of downloads of requests sharing
+    the artifact. Evicted entries are no longer reused, but are kept
+    until their artifacts are not referenced by any download.
+    """
+
+    __tablename__ = "cached_results"
+    result_id = Column(Integer, primary_key=True)
+    cache_key = Column(String(64), nullable=False, index=True)
+    dataset = Column(String(255))
+    product = Column(String(255))
+    catalog_version = Column(String(255))
+    location_path = Column(String(255), nullable=False)
+    size_bytes = Column(Integer)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_on = Column(DateTime, default=datetime.utcnow)
+    last_access = Column(DateTime, default=datetime.utcnow)
+    evicted_on = Column(DateTime)
+
+
 class Storage(Base):
     __tablename__ = "storages"
     storage_id = Column(Integer, primary_key=True)
@@ -141,44 +195,126 @@ class Storage(Base):
     port = Column(Integer)
 
 
+REQUEST_STATUS_CHANNEL = "request_status"
+USER_CHANNEL = "user_changes"
+_NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+# NOTE: changes of users and their roles are done also outside of
+# the services (e.g. by the web application), so the database notifies
+# the listeners on the `user_changes` channel itself
+_USER_TRIGGER_STATEMENTS = [
+    text(
+        f"""
+        CREATE OR REPLACE FUNCTION notify_user_changes() RETURNS trigger AS $$
+        DECLARE
+            changed_user_id uuid;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed_user_id := OLD.user_id;
+            ELSE
+                changed_user_id := NEW.user_id;
+            END IF;
+            PERFORM pg_notify(
+                '{USER_CHANNEL}',
+                json_build_object('user_id', changed_user_id)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ),
+    text(
+        """
+        CREATE OR REPLACE TRIGGER users_roles_changed
+        AFTER INSERT OR UPDATE OR DELETE ON users_roles
+        FOR EACH ROW EXECUTE FUNCTION notify_user_changes()
+        """
+    ),
+    text(
+        """
+        CREATE OR REPLACE TRIGGER users_changed
+        AFTER UPDATE OR DELETE ON users
+        FOR EACH ROW EXECUTE FUNCTION notify_user_changes()
+        """
+    ),
+]
+
+
+def _get_notify_params(request_id: int, status: RequestStatus) -> dict:
+    return {
+        "channel": REQUEST_STATUS_CHANNEL,
+        "payload": json.dumps(
+            {"request_id": request_id, "status": status.name}
+        ),
+    }
+
+
+def get_connection_url(driver: str, logger: logging.Logger) -> str:
+    """Get database connection URL based on environment variables
+
+    Parameters
+    ----------
+    driver : str
+        Name of the dialect and driver, e.g. `postgresql+asyncpg`
+    logger : logging.Logger
+        Logger of the database manager
+
+    Returns
+    -------
+    url : str
+        Database connection URL
+
+    Raises
+    ------
+    KeyError
+        If required environment variable is missing
+    """
+    for venv_key in [
+        "POSTGRES_DB",
+        "POSTGRES_USER",
+        "POSTGRES_PASSWORD",
+        "DB_SERVICE_PORT",
+    ]:
+        logger.info(
+            "attempt to load data from environment variable: `%s`",
+            venv_key,
+        )
+        if venv_key not in os.environ:
+            logger.error(
+                "missing required environment variable: `%s`", venv_key
+            )
+            raise KeyError(
+                f"missing required environment variable: {venv_key}"
+            )
+
+    user = os.environ["POSTGRES_USER"]
+    password = os.environ["POSTGRES_PASSWORD"]
+    host = os.environ["DB_SERVICE_HOST"]
+    port = os.environ["DB_SERVICE_PORT"]
+    database = os.environ["POSTGRES_DB"]
+
+    url = f"{driver}://{user}:{password}@{host}:{port}/{database}"
+    logger.info("db connection: `%s`", url)
+    return url
+
+
 class DBManager(metaclass=Singleton):
     _LOG = logging.getLogger("geokube.DBManager")
 
     def __init__(self) -> None:
-        for venv_key in [
-            "POSTGRES_DB",
-            "POSTGRES_USER",
-            "POSTGRES_PASSWORD",
-            "DB_SERVICE_PORT",
-        ]:
-            self._LOG.info(
-                "attempt to load data from environment variable: `%s`",
-                venv_key,
-            )
-            if venv_key not in os.environ:
-                self._LOG.error(
-                    "missing required environment variable: `%s`", venv_key
-                )
-                raise KeyError(
-                    f"missing required environment variable: {venv_key}"
-                )
-
-        user = os.environ["POSTGRES_USER"]
-        password = os.environ["POSTGRES_PASSWORD"]
-        host = os.environ["DB_SERVICE_HOST"]
-        port = os.environ["DB_SERVICE_PORT"]
-        database = os.environ["POSTGRES_DB"]
-
-        url = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-        self._LOG.info("db connection: `%s`", url)
+        url = get_connection_url(driver="postgresql", logger=self._LOG)
         self.__engine = create_engine(
             url, echo=is_true(os.environ.get("DB_LOGGING", False))
         )
         self.__session_maker = sessionmaker(bind=self.__engine)
 
-    def _create_database(self):
+    def create_database(self):
+        """Create tables missing in the database and triggers notifying
+        changes of users"""
         try:
             Base.metadata.create_all(self.__engine)
+            with self.__engine.begin() as connection:
+                for statement in _USER_TRIGGER_STATEMENTS:
+                    connection.execute(statement)
         except Exception as exception:
             self._LOG.error(
                 "could not create a database due to an error", exc_info=True
@@ -197,18 +333,20 @@ class DBManager(metaclass=Singleton):
                 user_id=user_id, api_key=api_key, contact_name=contact_name
             )
             if roles_names:
-                user.roles.extend(
-                    [
-                        session.query(Role)
-                        .where(Role.role_name == role_name)
-                        .all()[0]  # NOTE: role_name is unique in the database
-                        for role_name in roles_names
-                    ]
-                )
+                user.roles.extend(self._get_roles(session, roles_names))
             session.add(user)
             session.commit()
             return user
 
+    @staticmethod
+    def _get_roles(session, roles_names: list[str]) -> list[Role]:
+        return [
+            session.query(Role)
+            .where(Role.role_name == role_name)
+            .all()[0]  # NOTE: role_name is unique in the database
+            for role_name in roles_names
+        ]
+
     def get_user_details(self, user_id: int):
         with self.__session_maker() as session:
             return session.query(User).get(user_id)
@@ -244,7 +382,7 @@ class DBManager(metaclass=Singleton):
         product: str | None = None,
         query: str | None = None,
         worker_id: int | None = None,
-        priority: str | None = None,
+        priority: int | None = None,
         estimate_size_bytes: int | None = None,
         status: RequestStatus = RequestStatus.PENDING,
     ) -> int:
@@ -282,7 +420,6 @@ class DBManager(metaclass=Singleton):
                 request.worker_id = worker_id
             request.last_update = datetime.utcnow()
             request.fail_reason = fail_reason
-            session.commit()
             if status is RequestStatus.DONE:
                 download = Download(
                     location_path=location_path,
@@ -293,9 +430,27 @@ class DBManager(metaclass=Singleton):
                     size_bytes=size_bytes,
                 )
                 session.add(download)
-                session.commit()
+            if status:
+                # NOTE: notification is delivered on commit, once the
+                # download details are visible to the listeners
+                session.execute(
+                    _NOTIFY_STATEMENT,
+                    _get_notify_params(request.request_id, status),
+                )
+            session.commit()
             return request.request_id
 
+    def update_request_progress(self, request_id: int, progress: float):
+        with self.__session_maker() as session:
+            session.merge(
+                RequestProgress(
+                    request_id=request_id,
+                    progress=progress,
+                    last_update=datetime.utcnow(),
+                )
+            )
+            session.commit()
+
     def get_request_status_and_reason(
         self, request_id
     ) -> None | RequestStatus:
@@ -347,3 +502,397 @@ class DBManager(metaclass=Singleton):
             session.add(worker)
             session.commit()
             return worker.worker_id
+
+    def add_cached_result(
+        self,
+        cache_key: str,
+        location_path: str,
+        dataset: str | None = None,
+        product: str | None = None,
+        catalog_version: str | None = None,
+        size_bytes: int | None = None,
+    ) -> None:
+        """Register the artifact of the finished request in the result
+        cache, evicting the existing entry for `cache_key`. The download
+        of the request is the only reference to the artifact."""
+        with self.__session_maker() as session:
+            session.query(CachedResult).where(
+                CachedResult.cache_key == cache_key,
+                CachedResult.evicted_on.is_(None),
+            ).update({CachedResult.evicted_on: datetime.utcnow()})
+            session.add(
+                CachedResult(
+                    cache_key=cache_key,
+                    dataset=dataset,
+                    product=product,
+                    catalog_version=catalog_version,
+                    location_path=location_path,
+                    size_bytes=size_bytes,
+                    ref_count=1,
+                    created_on=datetime.utcnow(),
+                    last_access=datetime.utcnow(),
+                )
+            )
+            session.commit()
+
+    def add_cached_result_reference(self, location_path: str) -> None:
+        """Count the download of the request sharing the cached artifact
+        under `location_path`, e.g. of the coalesced request"""
+        with self.__session_maker() as session:
+            session.query(CachedResult).where(
+                CachedResult.location_path == location_path
+            ).update({CachedResult.ref_count: CachedResult.ref_count + 1})
+            session.commit()
+
+    def evict_cached_results(
+        self,
+        max_age: timedelta | None = None,
+        max_size_bytes: int | None = None,
+    ) -> list[CachedResult]:
+        """Evict entries of the result cache not accessed for `max_age`
+        and the least recently used ones until the total size of artifacts
+        does not exceed `max_size_bytes`.
+
+        Evicted entries are no longer reused. Artifacts remain available
+        to the downloads referencing them, and are released when none
+        of them does.
+
+        Parameters
+        ----------
+        max_age : timedelta, optional
+            Maximum time since the last access
+        max_size_bytes : int, optional
+            Maximum total size of cached artifacts
+
+        Returns
+        -------
+        released : list of str
+            Paths of artifacts no longer referenced, to be removed
+        """
+        with self.__session_maker() as session:
+            entries = (
+                session.query(CachedResult)
+                .where(CachedResult.evicted_on.is_(None))
+                .order_by(CachedResult.last_access.desc())
+                .all()
+            )
+            now = datetime.utcnow()
+            total_size = 0
+            oldest_access = (
+                datetime.utcnow() - max_age if max_age is not None else None
+            )
+            for entry in entries:
+                total_size += entry.size_bytes or 0
+                if (
+                    oldest_access is not None
+                    and entry.last_access < oldest_access
+                ) or (
+                    max_size_bytes is not None and total_size > max_size_bytes
+                ):
+                    entry.evicted_on = now
+            session.flush()
+            released = self._release_cached_results(session)
+            session.commit()
+            return released
+
+    def remove_expired_downloads(self, max_age: timedelta) -> list[str]:
+        """Remove downloads of cached artifacts created more than
+        `max_age` ago, releasing artifacts of evicted entries no longer
+        referenced by any download
+
+        Parameters
+        ----------
+        max_age : timedelta
+            Maximum time since the download was created
+
+        Returns
+        -------
+        released : list of str
+            Paths of artifacts no longer referenced, to be removed
+        """
+        with self.__session_maker() as session:
+            downloads = (
+                session.query(Download)
+                .where(
+                    Download.created_on < datetime.utcnow() - max_age,
+                    Download.location_path.in_(
+                        select(CachedResult.location_path)
+                    ),
+                )
+                .all()
+            )
+            for download in downloads:
+                session.query(CachedResult).where(
+                    CachedResult.location_path == download.location_path
+                ).update(
+                    {CachedResult.ref_count: CachedResult.ref_count - 1}
+                )
+                session.delete(download)
+            session.flush()
+            released = self._release_cached_results(session)
+            session.commit()
+            return released
+
+    @staticmethod
+    def _release_cached_results(session) -> list[str]:
+        entries = (
+            session.query(CachedResult)
+            .where(
+                CachedResult.evicted_on.is_not(None),
+                CachedResult.ref_count <= 0,
+            )
+            .all()
+        )
+        for entry in entries:
+            session.delete(entry)
+        return [entry.location_path for entry in entries]
+
+
+class AsyncDBManager(metaclass=Singleton):
+    """Database manager for asynchronous code, using the asyncio engine
+    with the pool of connections configured with environment variables:
+    `DB_POOL_SIZE`, `DB_MAX_OVERFLOW`, `DB_POOL_TIMEOUT`, `DB_POOL_RECYCLE`
+    """
+
+    _LOG = logging.getLogger("geokube.AsyncDBManager")
+
+    def __init__(self) -> None:
+        url = get_connection_url(driver="postgresql+asyncpg", logger=self._LOG)
+        self.__engine = create_async_engine(
+            url,
+            echo=is_true(os.environ.get("DB_LOGGING", False)),
+            pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+            pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+            pool_pre_ping=True,
+        )
+        self.__session_maker = sessionmaker(
+            bind=self.__engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    async def create_database(self):
+        """Create tables missing in the database and triggers notifying
+        changes of users"""
+        try:
+            async with self.__engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                for statement in _USER_TRIGGER_STATEMENTS:
+                    await connection.execute(statement)
+        except Exception as exception:
+            self._LOG.error(
+                "could not create a database due to an error", exc_info=True
+            )
+            raise exception
+
+    async def get_user_details(self, user_id: int):
+        async with self.__session_maker() as session:
+            return await session.get(User, user_id)
+
+    async def get_user_roles_names(
+        self, user_id: int | None = None
+    ) -> list[str]:
+        if user_id is None:
+            return ["public"]
+        async with self.__session_maker() as session:
+            user = await session.get(User, user_id)
+            return [role.role_name for role in user.roles]
+
+    async def get_request_details(self, request_id: int):
+        async with self.__session_maker() as session:
+            return await session.get(Request, request_id)
+
+    async def get_download_details_for_request_id(
+        self, request_id
+    ) -> Download:
+        async with self.__session_maker() as session:
+            request_details = await session.get(Request, request_id)
+            if request_details is None:
+                raise IndexError(
+                    f"Request with id: `{request_id}` does not exist!"
+                )
+            return request_details.download
+
+    async def get_request_status_and_download(
+        self, request_id: int
+    ) -> tuple[RequestStatus, Download | None]:
+        async with self.__session_maker() as session:
+            result = await session.execute(
+                select(Request.status, Download)
+                .outerjoin(Download, Download.request_id == Request.request_id)
+                .where(Request.request_id == request_id)
+            )
+            if (row := result.first()) is None:
+                raise IndexError(
+                    f"Request with id: `{request_id}` does not exist!"
+                )
+            return RequestStatus(row[0]), row[1]
+
+    async def get_request_status_and_reason(
+        self, request_id
+    ) -> None | RequestStatus:
+        async with self.__session_maker() as session:
+            if request := await session.get(Request, request_id):
+                return RequestStatus(request.status), request.fail_reason
+            raise IndexError(
+                f"Request with id: `{request_id}` does not exist!"
+            )
+
+    async def get_request_progress(self, request_id: int) -> float | None:
+        async with self.__session_maker() as session:
+            if progress := await session.get(RequestProgress, request_id):
+                return progress.progress
+            return None
+
+    async def get_requests_for_user_id(self, user_id) -> list[Request]:
+        async with self.__session_maker() as session:
+            result = await session.execute(
+                select(Request).where(Request.user_id == user_id)
+            )
+            return result.scalars().all()
+
+    @staticmethod
+    def _select_cached_result(cache_key: str):
+        return (
+            select(CachedResult)
+            .where(
+                CachedResult.cache_key == cache_key,
+                CachedResult.evicted_on.is_(None),
+            )
+            .order_by(CachedResult.created_on.desc())
+            .limit(1)
+        )
+
+    async def get_cached_result(self, cache_key: str) -> CachedResult | None:
+        async with self.__session_maker() as session:
+            result = await session.execute(
+                self._select_cached_result(cache_key)
+            )
+            return result.scalars().first()
+
+    async def remove_cached_result(self, cache_key: str) -> None:
+        """Remove the entry whose artifact does not exist any more"""
+        async with self.__session_maker() as session:
+            result = await session.execute(
+                self._select_cached_result(cache_key)
+            )
+            if entry := result.scalars().first():
+                await session.delete(entry)
+                await session.commit()
+
+    async def create_request_from_cached_result(
+        self,
+        cache_key: str,
+        user_id: int,
+        dataset: str | None = None,
+        product: str | None = None,
+        query: str | None = None,
+        priority: int | None = None,
+        estimate_size_bytes: int | None = None,
+    ) -> int | None:
+        """Create the finished request sharing the cached artifact,
+        update the last access time of the cache entry and count
+        the download of the request
+
+        Returns
+        -------
+        request_id : int or None
+            ID of the request or `None` if the entry does not exist
+        """
+        async with self.__session_maker() as session:
+            result = await session.execute(
+                self._select_cached_result(cache_key).with_for_update()
+            )
+            entry = result.scalars().first()
+            if entry is None:
+                return None
+            entry.last_access = datetime.utcnow()
+            entry.ref_count += 1
+            request = Request(
+                status=RequestStatus.DONE,
+                priority=priority,
+                user_id=user_id,
+                dataset=dataset,
+                product=product,
+                query=query,
+                estimate_size_bytes=estimate_size_bytes,
+                created_on=datetime.utcnow(),
+                last_update=datetime.utcnow(),
+            )
+            session.add(request)
+            await session.flush()
+            session.add(
+                Download(
+                    location_path=entry.location_path,
+                    storage_id=0,
+                    request_id=request.request_id,
+                    created_on=datetime.utcnow(),
+                    download_uri=f"/download/{request.request_id}",
+                    size_bytes=entry.size_bytes,
+                )
+            )
+            await session.commit()
+            return request.request_id
+
+    async def create_request(
+        self,
+        user_id: int = 1,
+        dataset: str | None = None,
+        product: str | None = None,
+        query: str | None = None,
+        worker_id: int | None = None,
+        priority: int | None = None,
+        estimate_size_bytes: int | None = None,
+        status: RequestStatus = RequestStatus.PENDING,
+    ) -> int:
+        async with self.__session_maker() as session:
+            request = Request(
+                status=status,
+                priority=priority,
+                user_id=user_id,
+                worker_id=worker_id,
+                dataset=dataset,
+                product=product,
+                query=query,
+                estimate_size_bytes=estimate_size_bytes,
+                created_on=datetime.utcnow(),
+            )
+            session.add(request)
+            await session.commit()
+            return request.request_id
+
+    async def update_request(
+        self,
+        request_id: int,
+        worker_id: int | None = None,
+        status: RequestStatus | None = None,
+        location_path: str = None,
+        size_bytes: int = None,
+        fail_reason: str = None,
+    ) -> int:
+        async with self.__session_maker() as session:
+            request = await session.get(Request, request_id)
+            if status:
+                request.status = status
+            if worker_id:
+                request.worker_id = worker_id
+            request.last_update = datetime.utcnow()
+            request.fail_reason = fail_reason
+            if status is RequestStatus.DONE:
+                session.add(
+                    Download(
+                        location_path=location_path,
+                        storage_id=0,
+                        request_id=request.request_id,
+                        created_on=datetime.utcnow(),
+                        download_uri=f"/download/{request_id}",
+                        size_bytes=size_bytes,
+                    )
+                )
+            if status:
+                await session.execute(
+                    _NOTIFY_STATEMENT,
+                    _get_notify_params(request.request_id, status),
+                )
+            await session.commit()
+            return request.request_id
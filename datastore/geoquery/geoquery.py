@@ -1,10 +1,28 @@
 import json
+import hashlib
 from typing import Optional, List, Dict, Union, Mapping, Any, TypeVar
 
 from pydantic import BaseModel, root_validator, validator
 
 TGeoQuery = TypeVar("TGeoQuery")
 
+CANONICAL_PRECISION = 6
+_TIME_COMBO_KEYS = ("year", "month", "day", "hour")
+
+
+def _as_sorted_list(value) -> list:
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    try:
+        return sorted(set(values))
+    except TypeError:
+        return list(values)
+
+
+def _round(value, precision: int):
+    if isinstance(value, (list, tuple)):
+        return [_round(item, precision) for item in value]
+    return round(float(value), precision)
+
 
 class GeoQuery(BaseModel, extra="allow"):
     variable: Optional[Union[str, List[str]]] = None
@@ -57,6 +75,75 @@ class GeoQuery(BaseModel, extra="allow"):
         res = dict(filter(lambda item: item[1] is not None, res.items()))
         return json.dumps(res)
 
+    def canonical(self, precision: int = CANONICAL_PRECISION) -> dict:
+        """Return the canonical form of the query, the same for all
+        equivalent spellings of the query:
+
+        * lists of variables and values of filters are sorted,
+        * `year`, `month`, `day` and `hour` of `time` are sorted lists
+          of integers,
+        * `area` and `location` coordinates are rounded to `precision`
+          decimal places,
+        * empty items are skipped.
+
+        A single variable is kept as a string, as it results in a field
+        instead of a datacube written differently.
+
+        Parameters
+        ----------
+        precision : int, default=6
+            Number of decimal places of area and location coordinates
+
+        Returns
+        -------
+        canonical : dict
+            Canonical representation of the query
+        """
+        res = super().dict()
+        if isinstance(variable := res.get("variable"), list):
+            res["variable"] = _as_sorted_list(variable)
+        if (time := res.get("time")) and set(time) <= set(_TIME_COMBO_KEYS):
+            try:
+                res["time"] = {
+                    key: sorted({int(val) for val in _as_sorted_list(value)})
+                    for key, value in time.items()
+                }
+            except ValueError:
+                pass
+        for key in ("area", "location"):
+            if res.get(key):
+                res[key] = {
+                    coord: _round(value, precision)
+                    for coord, value in res[key].items()
+                    if value is not None
+                }
+        if res.get("filters"):
+            res["filters"] = {
+                key: _as_sorted_list(value) if isinstance(value, list) else value
+                for key, value in res["filters"].items()
+            }
+        return {
+            key: value
+            for key, value in res.items()
+            if value is not None and value != {}
+        }
+
+    def canonical_json(self, precision: int = CANONICAL_PRECISION) -> str:
+        """Return the JSON representation of the canonical form
+        of the query"""
+        return json.dumps(
+            self.canonical(precision=precision),
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+
+    def canonical_hash(self, precision: int = CANONICAL_PRECISION) -> str:
+        """Return the stable SHA-256 hex digest of the canonical form
+        of the query"""
+        return hashlib.sha256(
+            self.canonical_json(precision=precision).encode()
+        ).hexdigest()
+
     @classmethod
     def parse(
         cls, load: TGeoQuery | dict | str | bytes | bytearray
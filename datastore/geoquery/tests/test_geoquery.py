@@ -63,3 +63,53 @@ def test_emtpy_filters():
     query = GeoQuery(**query_dict)
     assert isinstance(query.filters, dict)
     assert len(query.filters) == 0
+
+
+def test_canonical_hash_equal_for_equivalent_queries():
+    query_1 = GeoQuery(
+        variable=["wind_speed"],
+        time={"year": "2012", "month": "1"},
+        area={"north": 46.8000001, "south": 43, "east": 42, "west": 38},
+        resolution="0.1",
+        version=["2", "1"],
+    )
+    query_2 = GeoQuery(
+        variable=["wind_speed"],
+        time={"month": ["01"], "year": ["2012"]},
+        area={"west": 38.0, "east": 42.0, "south": 43.0, "north": 46.8},
+        filters={"version": ["1", "2"], "resolution": "0.1"},
+    )
+    assert query_1.canonical() == query_2.canonical()
+    assert query_1.canonical_hash() == query_2.canonical_hash()
+
+
+def test_canonical_hash_differs_for_different_queries():
+    query_1 = GeoQuery(
+        variable=["wind_speed"],
+        time={"start": "2012-01-01", "stop": "2012-01-15"},
+    )
+    query_2 = GeoQuery(
+        variable=["wind_speed"],
+        time={"start": "2012-01-01", "stop": "2012-01-16"},
+    )
+    assert query_1.canonical_hash() != query_2.canonical_hash()
+
+
+def test_canonical_hash_differs_for_single_variable_and_list():
+    query_1 = GeoQuery(variable="wind_speed")
+    query_2 = GeoQuery(variable=["wind_speed"])
+    assert query_1.canonical() == {"variable": "wind_speed"}
+    assert query_1.canonical_hash() != query_2.canonical_hash()
+
+
+def test_canonical_sorts_variables_and_skips_empty_items():
+    query = GeoQuery(variable=["v", "u", "v"])
+    assert query.canonical() == {"variable": ["u", "v"]}
+
+
+def test_canonical_keeps_location_order():
+    query = GeoQuery(location={"latitude": [10, 5], "longitude": [25, 20]})
+    assert query.canonical()["location"] == {
+        "latitude": [10.0, 5.0],
+        "longitude": [25.0, 20.0],
+    }
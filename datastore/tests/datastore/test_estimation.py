@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+pytest.importorskip("geokube")
+
+from geokube.core.datacube import DataCube
+
+from datastore.estimation import estimate_nbytes
+from geoquery.geoquery import GeoQuery
+
+
+@pytest.fixture
+def kube():
+    time = pd.date_range("2000-01-01", "2001-12-31 18:00", freq="6h")
+    latitude = np.linspace(90.0, -90.0, 37)
+    longitude = np.arange(0.0, 360.0, 5.0)
+    dset = xr.Dataset(
+        {
+            "tas": (
+                ("time", "latitude", "longitude"),
+                np.zeros(
+                    (time.size, latitude.size, longitude.size),
+                    dtype=np.float32,
+                ),
+                {"units": "K", "standard_name": "air_temperature"},
+            )
+        },
+        coords={
+            "time": ("time", time, {"standard_name": "time"}),
+            "latitude": (
+                "latitude",
+                latitude,
+                {"units": "degrees_north", "standard_name": "latitude"},
+            ),
+            "longitude": (
+                "longitude",
+                longitude,
+                {"units": "degrees_east", "standard_name": "longitude"},
+            ),
+        },
+    )
+    yield DataCube.from_xarray(dset)
+
+
+def _selected_nbytes(kube, query: GeoQuery) -> int:
+    if query.area:
+        kube = kube.geobbox(**query.area)
+    if query.time:
+        time = query.time
+        if "start" in time or "stop" in time:
+            time = slice(time.get("start"), time.get("stop"), time.get("step"))
+        kube = kube.sel(time=time)
+    return kube.nbytes
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"area": {"north": 45, "south": 30, "west": 5, "east": 20}},
+        {"area": {"north": 45, "south": 30, "west": -20, "east": 20}},
+        {"time": {"start": "2000-03-01", "stop": "2000-03-31"}},
+        {"time": {"start": "2001-06", "stop": "2001-07"}},
+        {"time": {"year": [2001], "month": [1, 7], "hour": [0, 12]}},
+        {"time": {"month": 2, "day": [28, 29]}},
+        {
+            "area": {"north": 10, "south": -10, "west": 100, "east": 120},
+            "time": {"year": 2000, "day": 1},
+        },
+    ],
+)
+def test_estimate_matches_selected_size(kube, query):
+    query = GeoQuery(**query)
+    assert estimate_nbytes(kube, query) == _selected_nbytes(kube, query)
+
+
+def test_estimate_not_modelled(kube):
+    query = GeoQuery(location={"latitude": 10, "longitude": 10})
+    assert estimate_nbytes(kube, query) is None
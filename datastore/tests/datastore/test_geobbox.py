@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+from geokube.core.datacube import DataCube
+from geokube.core.field import Field
+
+from datastore.datastore import Datastore
+from datastore.spatial_index import SpatialIndex
+
+AREA = {"south": 40.0, "north": 47.0, "west": 5.0, "east": 12.0}
+
+
+@pytest.fixture
+def field():
+    rlat = np.linspace(-10.0, 10.0, 40)
+    rlon = np.linspace(-15.0, 15.0, 50)
+    y, x = np.meshgrid(rlat, rlon, indexing="ij")
+    dset = xr.Dataset(
+        {
+            "tas": (
+                ("rlat", "rlon"),
+                np.random.default_rng(0).random((rlat.size, rlon.size)),
+                {"units": "K", "grid_mapping": "rotated_pole"},
+            )
+        },
+        coords={
+            "rotated_pole": (
+                (),
+                0,
+                {
+                    "grid_mapping_name": "rotated_latitude_longitude",
+                    "grid_north_pole_latitude": 39.25,
+                    "grid_north_pole_longitude": -162.0,
+                },
+            ),
+            "rlat": (
+                "rlat",
+                rlat,
+                {"standard_name": "grid_latitude", "units": "degrees"},
+            ),
+            "rlon": (
+                "rlon",
+                rlon,
+                {"standard_name": "grid_longitude", "units": "degrees"},
+            ),
+            "lat": (
+                ("rlat", "rlon"),
+                45.0 + y + 0.1 * x,
+                {"standard_name": "latitude", "units": "degrees_north"},
+            ),
+            "lon": (
+                ("rlat", "rlon"),
+                10.0 + x + 0.05 * y,
+                {"standard_name": "longitude", "units": "degrees_east"},
+            ),
+        },
+    )
+    yield Field.from_xarray(dset, ncvar="tas")
+
+
+@pytest.fixture
+def get_spatial_index():
+    def get_spatial_index(latitude, longitude):
+        get_spatial_index.calls += 1
+        return SpatialIndex(
+            np.asarray(latitude.values), np.asarray(longitude.values)
+        )
+
+    get_spatial_index.calls = 0
+    yield get_spatial_index
+
+
+def test_geobbox_with_spatial_index_matches_geokube(field, get_spatial_index):
+    result = Datastore._geobbox(field, AREA, get_spatial_index)
+    assert get_spatial_index.calls == 1
+    xr.testing.assert_identical(
+        result.to_xarray(encoding=False),
+        field.geobbox(**AREA).to_xarray(encoding=False),
+    )
+
+
+def test_geobbox_of_datacube_with_spatial_index(field, get_spatial_index):
+    kube = DataCube(fields=[field], properties={}, encoding={})
+    result = Datastore._geobbox(kube, AREA, get_spatial_index)
+    assert isinstance(result, DataCube)
+    assert result["tas"].shape == field.geobbox(**AREA).shape
+
+
+def test_geobbox_outside_of_grid_falls_back_to_geokube(
+    field, get_spatial_index
+):
+    area = {"south": 0.0, "north": 1.0}
+    with pytest.raises(Exception) as expected:
+        field.geobbox(**area)
+    with pytest.raises(expected.type):
+        Datastore._geobbox(field, area, get_spatial_index)
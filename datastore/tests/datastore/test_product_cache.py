@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from datastore.product_cache import ProductCache
+
+
+class _Entry:
+    def __init__(self, path):
+        self.path = path
+        self._captured_init_kwargs = {"path": path}
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / "data_1.nc"
+    path.write_bytes(b"abc")
+    yield path
+
+
+@pytest.fixture
+def product_cache(tmp_path):
+    yield ProductCache(str(tmp_path / "cache"), context="1.0")
+
+
+def test_fingerprint_none_if_no_files(tmp_path):
+    assert ProductCache.fingerprint(_Entry(str(tmp_path / "*.nc"))) is None
+
+
+def test_fingerprint_changes_with_size(tmp_path, source_file):
+    entry = _Entry(str(tmp_path / "*.nc"))
+    fingerprint = ProductCache.fingerprint(entry)
+    assert fingerprint == ProductCache.fingerprint(entry)
+    source_file.write_bytes(b"abcd")
+    assert fingerprint != ProductCache.fingerprint(entry)
+
+
+def test_fingerprint_changes_with_new_file(tmp_path, source_file):
+    entry = _Entry(str(tmp_path / "*.nc"))
+    fingerprint = ProductCache.fingerprint(entry)
+    (tmp_path / "data_2.nc").write_bytes(b"abc")
+    assert fingerprint != ProductCache.fingerprint(entry)
+
+
+def test_load_missing_entry(product_cache):
+    assert product_cache.load("era5", "reanalysis", "fp") is None
+
+
+def test_dump_and_load(product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    assert product_cache.load("era5", "reanalysis", "fp") == {"kube": [1, 2]}
+
+
+def test_load_stale_fingerprint(product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    assert product_cache.load("era5", "reanalysis", "other") is None
+
+
+def test_load_stale_context(tmp_path, product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    other_cache = ProductCache(str(tmp_path / "cache"), context="2.0")
+    assert other_cache.load("era5", "reanalysis", "fp") is None
+
+
+def test_dump_leaves_no_temporary_files(tmp_path, product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    assert sorted(os.listdir(tmp_path / "cache" / "products" / "era5")) == [
+        "reanalysis.json",
+        "reanalysis.pkl",
+    ]
+
+
+def test_dump_restricts_permissions(tmp_path, product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    dataset_dir = tmp_path / "cache" / "products" / "era5"
+    assert os.stat(dataset_dir).st_mode & 0o077 == 0
+    assert os.stat(dataset_dir / "reanalysis.pkl").st_mode & 0o077 == 0
+
+
+def test_load_ignores_entry_writable_by_others(tmp_path, product_cache):
+    product_cache.dump("era5", "reanalysis", "fp", {"kube": [1, 2]})
+    os.chmod(tmp_path / "cache" / "products" / "era5" / "reanalysis.pkl", 0o666)
+    assert product_cache.load("era5", "reanalysis", "fp") is None
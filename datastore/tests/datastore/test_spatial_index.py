@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+from datastore.spatial_index import SpatialIndex, SpatialIndexCache
+
+
+@pytest.fixture
+def grid():
+    y, x = np.meshgrid(np.arange(60), np.arange(80), indexing="ij")
+    lat = 10.0 + 0.3 * y + 0.05 * x
+    lon = -20.0 + 0.4 * x + 0.1 * np.sin(y / 5.0)
+    yield lat, lon
+
+
+def test_bbox_slices_match_masks(grid):
+    lat, lon = grid
+    index = SpatialIndex(lat, lon)
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        south, north = sorted(rng.uniform(5.0, 40.0, 2))
+        west, east = sorted(rng.uniform(-25.0, 20.0, 2))
+        mask = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        slices = index.bbox_slices(south, north, west, east)
+        if mask.any():
+            assert slices == tuple(
+                slice(idx.min(), idx.max() + 1) for idx in np.nonzero(mask)
+            )
+        else:
+            assert slices is None
+
+
+def test_bbox_slices_with_missing_bounds(grid):
+    lat, lon = grid
+    index = SpatialIndex(lat, lon)
+    assert index.bbox_slices() == (slice(0, 60), slice(0, 80))
+    assert index.bbox_slices(south=100.0) is None
+
+
+def test_cache_stores_index_on_disk(tmp_path, grid):
+    calls = []
+
+    def get_coords():
+        calls.append(1)
+        return grid
+
+    cache = SpatialIndexCache(str(tmp_path))
+    index = cache.get("era5", "curvilinear", "v1", get_coords)
+    assert cache.get("era5", "curvilinear", "v1", get_coords) is index
+    (path,) = os.listdir(tmp_path / "products" / "era5")
+    assert path.startswith("curvilinear.") and path.endswith(".sindex.npz")
+    loaded = SpatialIndexCache(str(tmp_path)).get(
+        "era5", "curvilinear", "v1", get_coords
+    )
+    assert loaded is not index
+    assert loaded.bbox_slices(15.0, 20.0, -10.0, 0.0) == index.bbox_slices(
+        15.0, 20.0, -10.0, 0.0
+    )
+    # NOTE: coordinates are read only to build the index
+    assert len(calls) == 1
+
+
+def test_cache_builds_index_of_new_grid(tmp_path, grid):
+    lat, lon = grid
+    cache = SpatialIndexCache(str(tmp_path))
+    index = cache.get("era5", "curvilinear", "v1", lambda: grid)
+    other = cache.get(
+        "era5", "curvilinear", "v2", lambda: (lat[:30], lon[:30])
+    )
+    assert other is not index
+    assert other.shape == (30, 80)
+    assert len(os.listdir(tmp_path / "products" / "era5")) == 2
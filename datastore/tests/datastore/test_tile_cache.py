@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from datastore.tile_cache import TileCache, iter_tile_bboxes
+
+
+@pytest.fixture
+def tile_cache(tmp_path):
+    yield TileCache(str(tmp_path), memory_size_bytes=10, disk_size_bytes=25)
+
+
+def test_iter_tile_bboxes_global():
+    assert list(iter_tile_bboxes(0)) == [
+        (-180.0, -90.0, 0.0, 90.0),
+        (0.0, -90.0, 180.0, 90.0),
+    ]
+    assert len(list(iter_tile_bboxes(2))) == 32
+
+
+def test_iter_tile_bboxes_intersecting_bbox():
+    tiles = list(iter_tile_bboxes(2, bbox=(5.0, 35.0, 20.0, 47.0)))
+    assert tiles == [(0.0, 45.0, 45.0, 90.0), (0.0, 0.0, 45.0, 45.0)]
+
+
+def test_get_missing_tile(tile_cache):
+    assert tile_cache.get("ab12") is None
+
+
+def test_put_and_get_from_disk(tmp_path, tile_cache):
+    tile_cache.put("ab12", b"12345")
+    assert tile_cache.get("ab12") == b"12345"
+    other = TileCache(str(tmp_path))
+    assert other.get("ab12") == b"12345"
+
+
+def test_memory_tier_evicts_least_recently_used(tile_cache):
+    tile_cache.path = None
+    tile_cache.put("aa", b"12345")
+    tile_cache.put("bb", b"12345")
+    tile_cache.get("aa")
+    tile_cache.put("cc", b"12345")
+    assert tile_cache.get("aa") == b"12345"
+    assert tile_cache.get("bb") is None
+
+
+def test_prune_removes_oldest_tiles(tile_cache):
+    for idx, key in enumerate(["aa", "bb", "cc"]):
+        tile_cache.put(key, b"0123456789")
+        os.utime(tile_cache._get_path(key), (idx, idx))
+    assert tile_cache.prune() == 1
+    assert not os.path.exists(tile_cache._get_path("aa"))
+    assert os.path.exists(tile_cache._get_path("cc"))
+
+
+def test_prune_skips_temporary_files_of_writers(tile_cache):
+    tile_cache.put("aa", b"0123456789")
+    os.utime(tile_cache._get_path("aa"), (0, 0))
+    tiles_dir = os.path.dirname(tile_cache._get_path("aa"))
+    fresh = os.path.join(tiles_dir, ".tmp-1")
+    with open(fresh, "wb") as file:
+        file.write(b"0" * 100)
+    orphan = os.path.join(tiles_dir, ".tmp-2")
+    with open(orphan, "wb") as file:
+        file.write(b"0" * 100)
+    os.utime(orphan, (0, 0))
+    assert tile_cache.prune() == 0
+    assert os.path.exists(fresh)
+    assert not os.path.exists(orphan)
+    assert tile_cache.get("aa") == b"0123456789"
+
+
+def test_put_prunes_in_background(monkeypatch, tile_cache):
+    monkeypatch.setattr("datastore.tile_cache.PRUNE_INTERVAL_WRITES", 3)
+    for idx, key in enumerate(["aa", "bb", "cc"]):
+        tile_cache.put(key, b"0123456789")
+        os.utime(tile_cache._get_path(key), (idx, idx))
+    tile_cache._prune_thread.join(5)
+    assert not os.path.exists(tile_cache._get_path("aa"))
+    assert os.path.exists(tile_cache._get_path("cc"))
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from datastore.time_index import TimeIndex, TimeIndexCache
+
+
+@pytest.fixture
+def hourly():
+    yield pd.date_range("2000-01-01", "2003-12-31 23:00", freq="1h").values
+
+
+def test_slice_positions_with_partial_dates(hourly):
+    index = TimeIndex(hourly)
+    positions = index.positions(slice("2001-02", "2001-02"))
+    assert positions.step is None
+    selected = pd.DatetimeIndex(hourly[positions])
+    assert selected[0] == pd.Timestamp("2001-02-01 00:00")
+    assert selected[-1] == pd.Timestamp("2001-02-28 23:00")
+
+
+def test_component_positions_match_masks(hourly):
+    index = TimeIndex(hourly)
+    query = {"year": [2001, 2003], "month": [1, 7], "day": 15, "hour": [0, 12]}
+    dates = pd.DatetimeIndex(hourly)
+    mask = (
+        dates.year.isin(query["year"])
+        & dates.month.isin(query["month"])
+        & (dates.day == query["day"])
+        & dates.hour.isin(query["hour"])
+    )
+    positions = index.positions(query)
+    assert np.array_equal(np.arange(hourly.size)[positions], np.nonzero(mask)[0])
+
+
+def test_evenly_spaced_positions_are_slices(hourly):
+    index = TimeIndex(hourly)
+    positions = index.positions({"year": 2002, "hour": 6})
+    assert isinstance(positions, slice) and positions.step == 24
+    assert len(range(hourly.size)[positions]) == 365
+    assert index.positions({"year": 1990}).size == 0
+
+
+def test_cftime_calendar():
+    dates = xr.date_range(
+        "2000-01-01", periods=365 * 4 * 2, freq="6h", calendar="noleap",
+        use_cftime=True,
+    ).values
+    index = TimeIndex(dates)
+    positions = np.arange(dates.size)[index.positions({"month": 2, "day": 28})]
+    assert [(dates[i].year, dates[i].hour) for i in positions] == [
+        (year, hour) for year in (2000, 2001) for hour in (0, 6, 12, 18)
+    ]
+    assert index.positions(slice("2001-01-01", "2001-01-01")) == slice(
+        1460, 1464
+    )
+
+
+def test_unsupported_components_and_unsorted_axes(hourly):
+    with pytest.raises(KeyError):
+        TimeIndex(hourly).positions({"minute": 0})
+    with pytest.raises(ValueError):
+        TimeIndex(hourly[::-1])
+
+
+def test_component_positions_without_year(hourly):
+    index = TimeIndex(hourly)
+    dates = pd.DatetimeIndex(hourly)
+    positions = index.component_positions({"month": [2, 12], "hour": 23})
+    mask = dates.month.isin([2, 12]) & (dates.hour == 23)
+    assert np.array_equal(positions, np.nonzero(mask)[0])
+    assert index.component_positions({"day": 31, "month": 2}).size == 0
+    assert index.component_positions({"year": 2001}).size == 365 * 24
+
+
+def test_cache_reuses_index(hourly):
+    calls = []
+
+    def get_values():
+        calls.append(1)
+        return hourly
+
+    cache = TimeIndexCache(max_entries=1)
+    index = cache.get("era5", "reanalysis", "v1:time", get_values)
+    assert cache.get("era5", "reanalysis", "v1:time", get_values) is index
+    # NOTE: dates are read only to build the index
+    assert len(calls) == 1
+    cache.get("era5", "reanalysis", "v2:time", lambda: hourly[:10])
+    assert (
+        cache.get("era5", "reanalysis", "v1:time", get_values) is not index
+    )
+    assert len(calls) == 2
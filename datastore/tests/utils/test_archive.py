@@ -0,0 +1,55 @@
+import io
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import pytest
+
+from utils.archive import add_to_archive, get_compress_type, iter_zip_stream
+
+
+@pytest.fixture
+def member_files(tmp_path):
+    netcdf = tmp_path / "data.nc"
+    netcdf.write_bytes(b"0123456789" * 1000)
+    image = tmp_path / "map.png"
+    image.write_bytes(b"\x89PNG" + bytes(range(256)) * 10)
+    yield [str(netcdf), str(image)]
+
+
+def test_compress_type_stored_for_compressed_formats():
+    assert get_compress_type("map.PNG") == ZIP_STORED
+    assert get_compress_type("map.jpg") == ZIP_STORED
+    assert get_compress_type("data.nc") == ZIP_DEFLATED
+    assert get_compress_type("data.csv") == ZIP_DEFLATED
+
+
+def test_iter_zip_stream_produces_valid_archive(member_files):
+    parts = list(iter_zip_stream(member_files, chunk_size=1024))
+    assert len(parts) > 2
+    with ZipFile(io.BytesIO(b"".join(parts))) as archive:
+        assert archive.namelist() == ["data.nc", "map.png"]
+        assert archive.getinfo("data.nc").compress_type == ZIP_DEFLATED
+        assert archive.getinfo("map.png").compress_type == ZIP_STORED
+        for path in member_files:
+            with open(path, "rb") as file:
+                assert archive.read(path.split("/")[-1]) == file.read()
+
+
+def test_add_to_archive(tmp_path, member_files):
+    path = tmp_path / "result.zip"
+    with ZipFile(path, "w") as archive:
+        for member in member_files:
+            for _ in add_to_archive(archive, member):
+                pass
+    with ZipFile(path) as archive:
+        assert archive.testzip() is None
+        assert len(archive.namelist()) == 2
+
+
+def test_iter_zip_stream_names_members_relative_to_root(tmp_path):
+    chunk = tmp_path / "store.zarr" / "tas" / "0.0"
+    chunk.parent.mkdir(parents=True)
+    chunk.write_bytes(b"chunk")
+    root = str(tmp_path / "store.zarr")
+    stream = b"".join(iter_zip_stream([str(chunk)], root=root))
+    with ZipFile(io.BytesIO(stream)) as archive:
+        assert archive.read("tas/0.0") == b"chunk"
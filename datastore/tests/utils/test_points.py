@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from utils.points import (
+    extract_points,
+    find_grid_indices,
+    iter_csv,
+    iter_geojson,
+    nearest_index,
+)
+
+
+@pytest.fixture
+def dset():
+    values = np.arange(2 * 3 * 4, dtype=float).reshape(2, 3, 4)
+    yield xr.Dataset(
+        {"tas": (("time", "lat", "lon"), values)},
+        coords={
+            "time": np.array(["2020-01-01", "2020-01-02"], dtype="datetime64[ns]"),
+            "lat": [50.0, 40.0, 30.0],
+            "lon": [0.0, 90.0, 180.0, 270.0],
+        },
+    )
+
+
+def test_nearest_index_ascending_and_descending():
+    assert nearest_index(np.array([0.0, 1.0, 2.0]), 1.4) == 1
+    assert nearest_index(np.array([2.0, 1.0, 0.0]), 1.6) == 0
+    with pytest.raises(ValueError):
+        nearest_index(np.array([0.0, 1.0, 2.0]), 2.6)
+
+
+def test_find_grid_indices_wraps_longitude(dset):
+    assert find_grid_indices(dset, [(-90.0, 41.0), (85.0, 50.0)]) == [
+        {"lon": 3, "lat": 1},
+        {"lon": 1, "lat": 0},
+    ]
+
+
+def test_iter_geojson(dset):
+    requested = [(-90.0, 41.0)]
+    points = extract_points(dset, find_grid_indices(dset, requested))
+    collection = json.loads("".join(iter_geojson(points, requested)))
+    (feature,) = collection["features"]
+    assert feature["geometry"]["coordinates"] == [270.0, 40.0]
+    assert feature["properties"]["tas"] == [7.0, 19.0]
+    assert feature["properties"]["time"][0] == "2020-01-01T00:00:00"
+
+
+def test_iter_csv_rows_for_each_point_and_time(dset):
+    points = extract_points(dset, [{"lon": 0, "lat": 0}, {"lon": 1, "lat": 2}])
+    rows = list(csv.reader(io.StringIO("".join(iter_csv(points)))))
+    assert rows[0] == ["point", "longitude", "latitude", "time", "tas"]
+    assert len(rows) == 5
+    assert rows[-1][0] == "1" and float(rows[-1][-1]) == 21.0
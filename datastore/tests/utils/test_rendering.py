@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pytest
+import xarray as xr
+
+pytest.importorskip("matplotlib")
+from PIL import Image
+
+from utils.rendering import colorize, regrid_to_tile, render_tile
+
+
+@pytest.fixture
+def field():
+    lat = np.arange(40.0, 30.0, -1.0)
+    lon = np.arange(10.0, 20.0, 1.0)
+    values = np.arange(100.0).reshape(1, 10, 10)
+    values[0, 0, 0] = np.nan
+    yield xr.DataArray(
+        values,
+        dims=("time", "lat", "lon"),
+        coords={"time": [np.datetime64("2020-01-01")], "lat": lat, "lon": lon},
+        name="tas",
+    )
+
+
+def test_regrid_to_tile_keeps_north_up(field):
+    tile = regrid_to_tile(field, width=10, height=10)
+    assert tile.shape == (10, 10)
+    assert np.isnan(tile[0, 0])
+    assert tile[-1, -1] == 99.0
+
+
+def test_regrid_to_tile_outside_of_field_is_missing(field):
+    tile = regrid_to_tile(field, width=4, height=4, bbox=(0, 30, 20, 40))
+    assert np.isnan(tile[:, 0]).all()
+    assert np.isfinite(tile[1:, -1]).all()
+
+
+def test_regrid_to_tile_rejects_extra_dimensions(field):
+    with pytest.raises(ValueError):
+        regrid_to_tile(xr.concat([field, field], dim="time"), 4, 4)
+
+
+def test_colorize_missing_values():
+    values = np.array([[np.nan, 0.0], [1.0, 2.0]])
+    assert colorize(values)[0, 0, 3] == 0
+    assert tuple(colorize(values, transparent=False, bgcolor="FF0000")[0, 0]) == (
+        255,
+        0,
+        0,
+        255,
+    )
+
+
+def test_render_tile_returns_image(field):
+    image = Image.open(io.BytesIO(render_tile(field, width=32, height=16)))
+    assert image.format == "PNG"
+    assert image.size == (32, 16)
@@ -0,0 +1,98 @@
+"""Module with utilities of ZIP archives of multi-file results"""
+import os
+from typing import Iterable, Iterator
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+
+# NOTE: members in already compressed formats are stored as they are
+STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".zip", ".gz")
+CHUNK_SIZE = 1024**2
+
+
+def get_compress_type(path: str, stored_suffixes=STORED_SUFFIXES) -> int:
+    """Get the compression method of the archive member"""
+    if path.lower().endswith(tuple(stored_suffixes)):
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+def add_to_archive(
+    archive: ZipFile,
+    path: str,
+    stored_suffixes=STORED_SUFFIXES,
+    chunk_size: int = CHUNK_SIZE,
+    root: str | None = None,
+) -> Iterator[None]:
+    """Copy the file into the archive chunk by chunk, yielding after
+    each chunk is written. The member is named after the path relative
+    to `root` or after the file name if `root` is `None`"""
+    if root is None:
+        arcname = os.path.basename(path)
+    else:
+        arcname = os.path.relpath(path, root).replace(os.sep, "/")
+    info = ZipInfo.from_file(path, arcname=arcname)
+    info.compress_type = get_compress_type(path, stored_suffixes)
+    with open(path, "rb") as src, archive.open(
+        info, "w", force_zip64=True
+    ) as dst:
+        while chunk := src.read(chunk_size):
+            dst.write(chunk)
+            yield
+
+
+class _StreamBuffer:
+    """Write-only, unseekable buffer collecting bytes of the archive"""
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+
+    def write(self, data) -> int:
+        self._data.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = bytes(self._data)
+        self._data.clear()
+        return data
+
+
+def iter_zip_stream(
+    paths: Iterable[str],
+    stored_suffixes=STORED_SUFFIXES,
+    chunk_size: int = CHUNK_SIZE,
+    root: str | None = None,
+) -> Iterator[bytes]:
+    """Generate the ZIP archive of the files on the fly, without
+    materializing it. At most about `chunk_size` bytes are kept in memory.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Paths of the archive members
+    stored_suffixes : tuple of str
+        Suffixes of files stored without compression
+    chunk_size : int
+        Size of chunks of the member files read at once
+    root : str, optional
+        Directory the names of members are relative to. File names
+        are used if `None`
+
+    Yields
+    ------
+    data : bytes
+        Subsequent parts of the archive
+    """
+    buffer = _StreamBuffer()
+    with ZipFile(buffer, "w") as archive:
+        for path in paths:
+            for _ in add_to_archive(
+                archive, path, stored_suffixes, chunk_size, root
+            ):
+                if data := buffer.pop():
+                    yield data
+            if data := buffer.pop():
+                yield data
+    if data := buffer.pop():
+        yield data
@@ -1,4 +1,5 @@
 import time
+import inspect
 import logging as default_logging
 from functools import wraps
 from typing import Literal
@@ -12,21 +13,36 @@ def log_execution_time(
     level = default_logging.getLevelName(level.upper())
 
     def inner(func):
+        def log_time(exec_start_time):
+            # NOTE: maybe logging should be on DEBUG level
+            logger.log(
+                level,
+                "execution of '%s' function from '%s' package took"
+                " %.4f sec",
+                func.__name__,
+                func.__module__,
+                time.monotonic() - exec_start_time,
+            )
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwds):
+                exec_start_time = time.monotonic()
+                try:
+                    return await func(*args, **kwds)
+                finally:
+                    log_time(exec_start_time)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwds):
             exec_start_time = time.monotonic()
             try:
                 return func(*args, **kwds)
             finally:
-                # NOTE: maybe logging should be on DEBUG level
-                logger.log(
-                    level,
-                    "execution of '%s' function from '%s' package took"
-                    " %.4f sec",
-                    func.__name__,
-                    func.__module__,
-                    time.monotonic() - exec_start_time,
-                )
+                log_time(exec_start_time)
 
         return wrapper
 
@@ -0,0 +1,178 @@
+"""Module with the extraction of values at points of regular grids"""
+import io
+import csv
+import json
+from typing import Iterable, Iterator
+
+import numpy as np
+import xarray as xr
+
+from .rendering import LATITUDE_NAMES, LONGITUDE_NAMES, find_coord
+
+
+def nearest_index(coord: np.ndarray, value: float) -> int:
+    """Find the index of the nearest value of the monotonic 1D coordinate
+    with bisection
+
+    Raises
+    -------
+    ValueError
+        If the value is outside of the coordinate range extended by half
+        of the cell
+    """
+    if coord.size == 1:
+        return 0
+    descending = coord[0] > coord[-1]
+    values = coord[::-1] if descending else coord
+    right = int(np.clip(np.searchsorted(values, value), 1, values.size - 1))
+    left = right - 1
+    if (
+        value < values[0] - (values[1] - values[0]) / 2
+        or value > values[-1] + (values[-1] - values[-2]) / 2
+    ):
+        raise ValueError(f"value {value} is outside of the grid")
+    index = left if value - values[left] <= values[right] - value else right
+    return values.size - 1 - index if descending else index
+
+
+def _normalize_longitude(lon_values: np.ndarray, lon: float) -> float:
+    # NOTE: grids might use the 0-360 longitude convention
+    if lon < 0 and lon_values.max() > 180:
+        return lon + 360.0
+    if lon > 180 and lon_values.min() < 0:
+        return lon - 360.0
+    return lon
+
+
+def find_grid_indices(
+    dset: xr.Dataset | xr.DataArray, points: Iterable[tuple[float, float]]
+) -> list[dict[str, int]]:
+    """Find indices of the grid cells nearest to the points.
+
+    Parameters
+    ----------
+    dset : xarray.Dataset or xarray.DataArray
+        Data with 1D latitude and longitude coordinates
+    points : iterable of tuple of float
+        Longitudes and latitudes of points
+
+    Returns
+    -------
+    indices : list of dict
+        Indices of the latitude and longitude dimensions for each point
+
+    Raises
+    -------
+    ValueError
+        If the grid is not rectilinear or a point is outside of the grid
+    """
+    lat_name = find_coord(dset, LATITUDE_NAMES, "latitude")
+    lon_name = find_coord(dset, LONGITUDE_NAMES, "longitude")
+    lat, lon = dset[lat_name], dset[lon_name]
+    if lat.ndim != 1 or lon.ndim != 1 or lat.dims == lon.dims:
+        raise ValueError("only rectilinear grids are supported")
+    lat_values, lon_values = lat.values.astype(float), lon.values.astype(float)
+    return [
+        {
+            lon.dims[0]: nearest_index(
+                lon_values, _normalize_longitude(lon_values, point_lon)
+            ),
+            lat.dims[0]: nearest_index(lat_values, point_lat),
+        }
+        for point_lon, point_lat in points
+    ]
+
+
+def extract_points(
+    dset: xr.Dataset, indices: Iterable[dict[str, int]]
+) -> Iterator[xr.Dataset]:
+    """Read values at the grid cells one by one, so only chunks
+    containing the cells are loaded"""
+    for index in indices:
+        yield dset.isel(index).load()
+
+
+def _to_json_value(values: np.ndarray):
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values, unit="s").tolist()
+    if np.issubdtype(values.dtype, np.floating):
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
+
+
+def _get_point_coords(point: xr.Dataset) -> tuple[float, float]:
+    lat_name = find_coord(point, LATITUDE_NAMES, "latitude")
+    lon_name = find_coord(point, LONGITUDE_NAMES, "longitude")
+    return float(point[lon_name]), float(point[lat_name])
+
+
+def iter_geojson(
+    points: Iterable[xr.Dataset], requested: list[tuple[float, float]]
+) -> Iterator[str]:
+    """Generate the GeoJSON feature collection with one feature
+    per point, as soon as values at the point are read
+
+    Parameters
+    ----------
+    points : iterable of xarray.Dataset
+        Values at the grid cells
+    requested : list of tuple of float
+        Requested longitudes and latitudes of points
+
+    Yields
+    ------
+    text : str
+        Subsequent parts of the document
+    """
+    yield '{"type": "FeatureCollection", "features": ['
+    for idx, (point, coords) in enumerate(zip(points, requested)):
+        properties = {"requested_coordinates": list(coords)}
+        properties.update(
+            {dim: _to_json_value(point[dim].values) for dim in point.dims}
+        )
+        properties.update(
+            {
+                name: _to_json_value(np.asarray(var.values))
+                for name, var in point.data_vars.items()
+            }
+        )
+        feature = {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": list(_get_point_coords(point)),
+            },
+            "properties": properties,
+        }
+        yield ("," if idx else "") + json.dumps(feature)
+    yield "]}"
+
+
+def iter_csv(points: Iterable[xr.Dataset]) -> Iterator[str]:
+    """Generate the CSV table with rows for each point and the remaining
+    dimensions (e.g. time), as soon as values at the point are read
+
+    Parameters
+    ----------
+    points : iterable of xarray.Dataset
+        Values at the grid cells
+
+    Yields
+    ------
+    text : str
+        Subsequent parts of the table
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for idx, point in enumerate(points):
+        frame = point.reset_coords(drop=True).to_dataframe().reset_index()
+        lon, lat = _get_point_coords(point)
+        if idx == 0:
+            writer.writerow(
+                ["point", "longitude", "latitude", *frame.columns]
+            )
+        for row in frame.itertuples(index=False):
+            writer.writerow([idx, lon, lat, *row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -0,0 +1,237 @@
+"""Module with the in-process renderer of map tiles"""
+import io
+from functools import lru_cache
+
+import numpy as np
+import xarray as xr
+
+LATITUDE_NAMES = ("lat", "latitude", "rlat", "y")
+LONGITUDE_NAMES = ("lon", "longitude", "rlon", "x")
+COLORMAP_SIZE = 256
+
+
+@lru_cache(maxsize=64)
+def get_colormap_table(name: str) -> np.ndarray:
+    """Get RGBA values of the colormap as the `(COLORMAP_SIZE, 4)` array
+    of bytes
+
+    Raises
+    -------
+    ValueError
+        If the colormap is not defined
+    """
+    import matplotlib
+
+    try:
+        cmap = matplotlib.colormaps[name]
+    except KeyError as err:
+        raise ValueError(f"colormap `{name}` is not defined") from err
+    table = cmap(np.linspace(0.0, 1.0, COLORMAP_SIZE), bytes=True)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=256)
+def get_norm(vmin: float, vmax: float):
+    """Get the linear normalization of values to [0, 1]"""
+    from matplotlib.colors import Normalize
+
+    return Normalize(vmin=vmin, vmax=vmax, clip=True)
+
+
+@lru_cache(maxsize=256)
+def parse_color(color: str) -> tuple[int, int, int]:
+    """Get RGB bytes of the color given as a hex string, e.g. `FFFFFF`"""
+    color = color.lstrip("#")
+    if len(color) != 6:
+        raise ValueError(f"improper color `{color}`")
+    return tuple(int(color[i : i + 2], 16) for i in (0, 2, 4))
+
+
+def find_coord(data: xr.DataArray, names, standard_name: str) -> str:
+    """Find the name of the coordinate by its standard name or
+    by one of the common names"""
+    for name, coord in data.coords.items():
+        if coord.attrs.get("standard_name") == standard_name:
+            return name
+    for name in names:
+        if name in data.coords:
+            return name
+    raise ValueError(f"coordinate `{standard_name}` was not found")
+
+
+def _nearest_indices(coord: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Get indices of the nearest coordinate values or -1 for values
+    outside of the grid"""
+    if coord.size == 1:
+        return np.zeros(values.shape, dtype=int)
+    descending = coord[0] > coord[-1]
+    if descending:
+        coord = coord[::-1]
+    right = np.clip(np.searchsorted(coord, values), 1, coord.size - 1)
+    left = right - 1
+    indices = np.where(
+        values - coord[left] <= coord[right] - values, left, right
+    )
+    # NOTE: values are outside of the grid if they are further than half
+    # of the cell from the first or the last coordinate
+    first_half_step = (coord[1] - coord[0]) / 2
+    last_half_step = (coord[-1] - coord[-2]) / 2
+    outside = (values < coord[0] - first_half_step) | (
+        values > coord[-1] + last_half_step
+    )
+    if descending:
+        indices = coord.size - 1 - indices
+    return np.where(outside, -1, indices)
+
+
+def regrid_to_tile(
+    data: xr.DataArray,
+    width: int,
+    height: int,
+    bbox: tuple[float, float, float, float] | None = None,
+) -> np.ndarray:
+    """Sample the 2D field with latitude and longitude coordinates
+    on the regular `height` x `width` grid of the tile with the nearest
+    neighbour method.
+
+    Parameters
+    ----------
+    data : xarray.DataArray
+        Field with 1D latitude and longitude coordinates. Other dimensions
+        must have length 1
+    width, height : int
+        Size of the tile in pixels
+    bbox : tuple of float, optional
+        Extent of the tile (west, south, east, north). The extent
+        of the field is used if `None`
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Array of shape `(height, width)` with the north in the first row
+        and `NaN` outside of the field
+
+    Raises
+    -------
+    ValueError
+        If the field cannot be rendered with this method
+    """
+    lat_name = find_coord(data, LATITUDE_NAMES, "latitude")
+    lon_name = find_coord(data, LONGITUDE_NAMES, "longitude")
+    lat, lon = data[lat_name], data[lon_name]
+    if lat.ndim != 1 or lon.ndim != 1 or lat.dims == lon.dims:
+        raise ValueError("only fields on rectilinear grids are supported")
+    extra_dims = [dim for dim in data.dims if dim not in lat.dims + lon.dims]
+    if any(data.sizes[dim] != 1 for dim in extra_dims):
+        raise ValueError(f"dimensions {extra_dims} must have length 1")
+    values = np.asarray(
+        data.squeeze(extra_dims).transpose(lat.dims[0], lon.dims[0]).values,
+        dtype=float,
+    )
+    lat_values, lon_values = lat.values.astype(float), lon.values.astype(float)
+    if bbox is None:
+        bbox = (
+            lon_values.min(),
+            lat_values.min(),
+            lon_values.max(),
+            lat_values.max(),
+        )
+    west, south, east, north = bbox
+    lon_px = west + (np.arange(width) + 0.5) * (east - west) / width
+    lat_px = north - (np.arange(height) + 0.5) * (north - south) / height
+    rows = _nearest_indices(lat_values, lat_px)
+    cols = _nearest_indices(lon_values, lon_px)
+    tile = values[np.ix_(np.maximum(rows, 0), np.maximum(cols, 0))]
+    tile[rows < 0, :] = np.nan
+    tile[:, cols < 0] = np.nan
+    return tile
+
+
+def colorize(
+    values: np.ndarray,
+    cmap: str = "RdBu_r",
+    vmin: float | None = None,
+    vmax: float | None = None,
+    transparent: bool = True,
+    bgcolor: str = "FFFFFF",
+) -> np.ndarray:
+    """Map values to RGBA bytes with the cached colormap and normalization.
+    Missing values are transparent or filled with `bgcolor`"""
+    valid = np.isfinite(values)
+    if vmin is None:
+        vmin = float(np.min(values[valid])) if valid.any() else 0.0
+    if vmax is None:
+        vmax = float(np.max(values[valid])) if valid.any() else 1.0
+    norm = get_norm(float(vmin), float(vmax))
+    scaled = np.ma.filled(norm(np.where(valid, values, vmin)), 0.0)
+    indices = np.rint(scaled * (COLORMAP_SIZE - 1)).astype(np.intp)
+    rgba = get_colormap_table(cmap)[indices]
+    if transparent:
+        rgba[~valid] = 0
+    else:
+        rgba[~valid] = (*parse_color(bgcolor), 255)
+    return rgba
+
+
+def render_tile(
+    data: xr.DataArray,
+    width: int,
+    height: int,
+    bbox: tuple[float, float, float, float] | None = None,
+    format: str = "png",
+    cmap: str = "RdBu_r",
+    vmin: float | None = None,
+    vmax: float | None = None,
+    transparent: bool = True,
+    bgcolor: str = "FFFFFF",
+) -> bytes:
+    """Render the 2D field as the image in memory.
+
+    Parameters
+    ----------
+    data : xarray.DataArray
+        Field with 1D latitude and longitude coordinates
+    width, height : int
+        Size of the image in pixels
+    bbox : tuple of float, optional
+        Extent of the image (west, south, east, north)
+    format : {"png", "jpeg"}
+        Format of the image
+    cmap : str
+        Name of the matplotlib colormap
+    vmin, vmax : float, optional
+        Range of values mapped to the colormap. The range of the field
+        is used if not given
+    transparent : bool
+        If missing values are transparent
+    bgcolor : str
+        Hex color of missing values if they are not transparent
+
+    Returns
+    -------
+    image : bytes
+        Encoded image
+
+    Raises
+    -------
+    ValueError
+        If the field cannot be rendered in-process
+    """
+    from PIL import Image
+
+    format = format.lower()
+    tile = regrid_to_tile(data, width, height, bbox)
+    rgba = colorize(
+        tile, cmap, vmin, vmax, transparent and format == "png", bgcolor
+    )
+    image = Image.fromarray(rgba)
+    buffer = io.BytesIO()
+    match format:
+        case "png":
+            image.save(buffer, format="PNG", compress_level=1)
+        case "jpeg" | "jpg":
+            image.convert("RGB").save(buffer, format="JPEG")
+        case _:
+            raise ValueError(f"format `{format}` is not supported")
+    return buffer.getvalue()
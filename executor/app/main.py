@@ -1,4 +1,5 @@
 import os
+import shutil
 import tempfile
 import time
 import datetime
@@ -6,10 +7,22 @@ import pika
 import logging
 import asyncio
 import threading, functools
+import itertools
+from concurrent.futures import Future
 from zipfile import ZipFile
 
 import numpy as np
-from dask.distributed import Client, LocalCluster, Nanny, Status
+from prometheus_client import Gauge, start_http_server
+from dask.distributed import (
+    Client,
+    LocalCluster,
+    Nanny,
+    Status,
+    as_completed,
+    get_worker,
+    wait,
+    worker_client,
+)
 from dask.delayed import Delayed
 from geokube.core.datacube import DataCube
 from geokube.core.dataset import Dataset
@@ -18,13 +31,100 @@ from geokube.core.field import Field
 from datastore.datastore import Datastore
 from workflow import Workflow
 from geoquery.geoquery import GeoQuery
-from dbmanager.dbmanager import DBManager, RequestStatus
+from dbmanager.dbmanager import DBManager, RequestPriority, RequestStatus
 
 from meta import LoggableMeta
 from messaging import Message, MessageType
+from scheduling import FairScheduler
+from writing import ZARR_V2_ARGS, write_netcdf, write_zarr
+from utils.archive import STORED_SUFFIXES, add_to_archive
 
 _BASE_DOWNLOAD_PATH = "/downloads"
 
+_RESULT_CHECK_INTERVAL_SEC = 10
+_PROGRESS_REPORT_INTERVAL_SEC = 5
+_CACHED_DOWNLOAD_MAX_AGE_HOURS = 720
+DEFAULT_LANE_WEIGHTS = {
+    RequestPriority.HIGH: 6,
+    RequestPriority.NORMAL: 3,
+    RequestPriority.BULK: 1,
+}
+DEFAULT_HIGH_LANE_WORKERS = 1
+
+requests_in_flight = Gauge(
+    "executor_requests_in_flight",
+    "Number of requests being processed by the executor",
+)
+
+
+def get_result_timeout() -> float:
+    """Get the maximum processing time of a request (in seconds).
+    `RESULT_TIMEOUT_SEC` takes precedence over the legacy
+    `RESULT_CHECK_RETRIES` expressed in 10-second checks."""
+    if "RESULT_TIMEOUT_SEC" in os.environ:
+        return float(os.environ["RESULT_TIMEOUT_SEC"])
+    return int(os.environ["RESULT_CHECK_RETRIES"]) * _RESULT_CHECK_INTERVAL_SEC
+
+
+def get_lane_weights() -> dict[RequestPriority, int]:
+    """Get weights of lanes from `EXECUTOR_LANE_WEIGHTS`, given in the form
+    `high:6,normal:3,bulk:1`. Missing lanes get the default weights."""
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    for item in filter(None, os.getenv("EXECUTOR_LANE_WEIGHTS", "").split(",")):
+        lane, weight = item.split(":")
+        weights[RequestPriority[lane.strip().upper()]] = int(weight)
+    return weights
+
+
+def get_write_options() -> dict:
+    """Get options of block-wise writing of netCDF and Zarr files"""
+    return {
+        "block_size_bytes": int(
+            float(os.getenv("WRITE_BLOCK_SIZE_MB", 256)) * 1024**2
+        ),
+        "max_in_flight": int(os.getenv("WRITE_MAX_IN_FLIGHT_BLOCKS", 2)),
+    }
+
+
+def get_compression_level(format_args: dict | None = None) -> int:
+    """Get zlib compression level of netCDF files from the query
+    `format_args` or `NETCDF_COMPRESSION_LEVEL`"""
+    if format_args and "compression_level" in format_args:
+        return int(format_args["compression_level"])
+    return int(os.getenv("NETCDF_COMPRESSION_LEVEL", 0))
+
+
+class ProgressReporter:
+    """Callback storing progress of writing the result of the request,
+    at most once per `min_interval` seconds"""
+
+    _LOG = logging.getLogger("geokube.ProgressReporter")
+
+    def __init__(
+        self, request_id, min_interval: float = _PROGRESS_REPORT_INTERVAL_SEC
+    ):
+        self.request_id = request_id
+        self.min_interval = min_interval
+        self._last_report = None
+
+    def __call__(self, progress: float) -> None:
+        now = time.monotonic()
+        if (
+            progress < 1.0
+            and self._last_report is not None
+            and now - self._last_report < self.min_interval
+        ):
+            return
+        self._last_report = now
+        try:
+            DBManager().update_request_progress(self.request_id, progress)
+        except Exception as err:
+            self._LOG.warning(
+                "failed to report progress: %s",
+                err,
+                extra={"track_id": self.request_id},
+            )
+
 
 def get_file_name_for_climate_downscaled(kube: DataCube, message: Message):
     query: GeoQuery = GeoQuery.parse(message.content)
@@ -90,6 +190,7 @@ def persist_datacube(
     kube: DataCube,
     message: Message,
     base_path: str | os.PathLike,
+    progress_callback=None,
 ) -> str | os.PathLike:
     if rcp85_filename_condition(kube, message):
         path = get_file_name_for_climate_downscaled(kube, message)
@@ -114,10 +215,17 @@ def persist_datacube(
         format_args = message.content.format_args
     else:
         format = "netcdf"
+        format_args = None
     match format:
         case "netcdf":
             full_path = os.path.join(base_path, f"{path}.nc")
-            kube.to_netcdf(full_path)
+            write_netcdf(
+                kube.to_xarray(encoding=True),
+                full_path,
+                compression_level=get_compression_level(format_args),
+                progress_callback=progress_callback,
+                **get_write_options(),
+            )
         case "geojson":
             full_path = os.path.join(base_path, f"{path}.json")
             kube.to_geojson(full_path)
@@ -132,93 +240,190 @@ def persist_datacube(
             kube.to_csv(full_path)
         case "zarr":
             full_path = os.path.join(base_path, f"{path}.zarr")
-            kube.to_zarr(full_path, mode='w', consolidated=True)
+            write_zarr(
+                kube.to_xarray(encoding=True),
+                full_path,
+                progress_callback=progress_callback,
+                mode="w",
+                consolidated=True,
+                **ZARR_V2_ARGS,
+                **get_write_options(),
+            )
         case _:
             raise ValueError(f"format `{format}` is not supported")
     return full_path
 
 
-def persist_dataset(
-    dset: Dataset,
+def _persist_dataset_item(
+    dataframe_item,
+    datacube_col: str,
+    attrs: list[str],
     message: Message,
     base_path: str | os.PathLike,
+    format: str,
+    format_args: dict | None = None,
 ):
-    def _get_attr_comb(dataframe_item, attrs):
-        return "_".join([dataframe_item[attr_name] for attr_name in attrs])
-
-    def _persist_single_datacube(dataframe_item, base_path, format, format_args=None):
-        if not format_args:
-            format_args = {}
-        dcube = dataframe_item[dset.DATACUBE_COL]
-        if isinstance(dcube, Delayed):
-            dcube = dcube.compute()
-        if len(dcube) == 0:
+    if not format_args:
+        format_args = {}
+    dcube = dataframe_item[datacube_col]
+    if isinstance(dcube, Delayed):
+        dcube = dcube.compute()
+    if len(dcube) == 0:
+        return None
+    for field in dcube.fields.values():
+        if 0 in field.shape:
             return None
-        for field in dcube.fields.values():
-            if 0 in field.shape:
-                return None
-        attr_str = _get_attr_comb(dataframe_item, dset._Dataset__attrs)
-        var_names = list(dcube.fields.keys())
-        if len(dcube) == 1:
-            path = "_".join(
-                [
-                    var_names[0],
-                    message.dataset_id,
-                    message.product_id,
-                    attr_str,
-                    message.request_id,
-                ]
-            )
-        else:
-            path = "_".join(
-                [
-                    message.dataset_id,
-                    message.product_id,
-                    attr_str,
-                    message.request_id,
-                ]
+    attr_str = "_".join([dataframe_item[attr_name] for attr_name in attrs])
+    var_names = list(dcube.fields.keys())
+    if len(dcube) == 1:
+        path = "_".join(
+            [
+                var_names[0],
+                message.dataset_id,
+                message.product_id,
+                attr_str,
+                message.request_id,
+            ]
+        )
+    else:
+        path = "_".join(
+            [
+                message.dataset_id,
+                message.product_id,
+                attr_str,
+                message.request_id,
+            ]
+        )
+    match format:
+        case "netcdf":
+            full_path = os.path.join(base_path, f"{path}.nc")
+            write_netcdf(
+                dcube.to_xarray(encoding=True),
+                full_path,
+                compression_level=get_compression_level(format_args),
+                **get_write_options(),
             )
-        match format:
-            case "netcdf":
-                full_path = os.path.join(base_path, f"{path}.nc")
-                dcube.to_netcdf(full_path)
-            case "geojson":
-                full_path = os.path.join(base_path, f"{path}.json")
-                dcube.to_geojson(full_path)
-            case "png":
-                full_path = os.path.join(base_path, f"{path}.png")
-                dcube.to_image(full_path, **format_args)
-            case "jpeg":
-                full_path = os.path.join(base_path, f"{path}.jpg")
-                dcube.to_image(full_path, **format_args)
-            case "csv":
-                full_path = os.path.join(base_path, f"{path}.csv")
-                dcube.to_csv(full_path)
-        return full_path
+        case "geojson":
+            full_path = os.path.join(base_path, f"{path}.json")
+            dcube.to_geojson(full_path)
+        case "png":
+            full_path = os.path.join(base_path, f"{path}.png")
+            dcube.to_image(full_path, **format_args)
+        case "jpeg":
+            full_path = os.path.join(base_path, f"{path}.jpg")
+            dcube.to_image(full_path, **format_args)
+        case "csv":
+            full_path = os.path.join(base_path, f"{path}.csv")
+            dcube.to_csv(full_path)
+    return full_path
+
+
+def imap_on_cluster(func, items: list, max_concurrency: int):
+    """Apply `func` to `items` as separate tasks on the Dask cluster,
+    keeping at most `max_concurrency` of them in flight, and yield
+    results as soon as they are completed. Items are processed
+    sequentially if not called from a Dask worker."""
+    try:
+        get_worker()
+    except ValueError:
+        yield from map(func, items)
+        return
+    pending_items = iter(items)
+    with worker_client() as client:
+        futures = as_completed()
+        for item in itertools.islice(pending_items, max_concurrency):
+            futures.add(client.submit(func, item, pure=False))
+        for future in futures:
+            result = future.result()
+            if (item := next(pending_items, None)) is not None:
+                futures.add(client.submit(func, item, pure=False))
+            yield result
 
+
+def persist_dataset(
+    dset: Dataset,
+    message: Message,
+    base_path: str | os.PathLike,
+):
     if isinstance(message.content, GeoQuery):
         format = message.content.format
         format_args = message.content.format_args
     else:
         format = "netcdf"
-    datacubes_paths = dset.data.apply(
-        _persist_single_datacube, base_path=base_path, format=format, format_args=format_args, axis=1
+        format_args = None
+    persist_item = functools.partial(
+        _persist_dataset_item,
+        datacube_col=dset.DATACUBE_COL,
+        attrs=dset._Dataset__attrs,
+        message=message,
+        base_path=base_path,
+        format=format,
+        format_args=format_args,
     )
-    paths = datacubes_paths[~datacubes_paths.isna()]
-    if len(paths) == 0:
-        return None
-    elif len(paths) == 1:
-        return paths.iloc[0]
-    zip_name = "_".join(
+    datacubes_paths = imap_on_cluster(
+        persist_item,
+        [item for _, item in dset.data.iterrows()],
+        max_concurrency=int(os.getenv("PERSIST_MAX_CONCURRENCY", 8)),
+    )
+    archive_name = "_".join(
         [message.dataset_id, message.product_id, message.request_id]
     )
-    path = os.path.join(base_path, f"{zip_name}.zip")
-    with ZipFile(path, "w") as archive:
-        for file in paths:
-            archive.write(file, arcname=os.path.basename(file))
-    for file in paths:
-        os.remove(file)
-    return path
+    if os.getenv("RESULT_ARCHIVE_MODE", "zip") == "directory":
+        # NOTE: files are kept in the directory and zipped on the fly
+        # when downloaded
+        directory = os.path.join(base_path, archive_name)
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for file in filter(None, datacubes_paths):
+            paths.append(os.path.join(directory, os.path.basename(file)))
+            os.replace(file, paths[-1])
+        if len(paths) == 0:
+            os.rmdir(directory)
+            return None
+        return paths[0] if len(paths) == 1 else directory
+    return archive_files(
+        datacubes_paths,
+        os.path.join(base_path, f"{archive_name}.zip"),
+        stored_suffixes=get_stored_suffixes(format_args),
+    )
+
+
+def get_stored_suffixes(format_args: dict | None = None) -> tuple[str]:
+    """Get suffixes of archive members stored without compression"""
+    if get_compression_level(format_args):
+        return STORED_SUFFIXES + (".nc",)
+    return STORED_SUFFIXES
+
+
+def archive_files(paths, archive_path: str, stored_suffixes=STORED_SUFFIXES):
+    """Move the files into the ZIP archive one by one, as they are produced.
+    A single file is returned as it is, without archiving.
+
+    Parameters
+    ----------
+    paths : iterable of str or None
+        Paths of files, `None` for missing results
+    archive_path : str
+        Path of the archive
+    stored_suffixes : tuple of str
+        Suffixes of files stored without compression
+
+    Returns
+    -------
+    path : str or None
+        Path of the archive, the single file or `None` if there are no files
+    """
+    paths = filter(None, paths)
+    if (first_path := next(paths, None)) is None:
+        return None
+    if (second_path := next(paths, None)) is None:
+        return first_path
+    with ZipFile(archive_path, "w") as archive:
+        for file in itertools.chain([first_path, second_path], paths):
+            for _ in add_to_archive(archive, file, stored_suffixes):
+                pass
+            os.remove(file)
+    return archive_path
 
 
 def process(message: Message, compute: bool):
@@ -244,7 +449,12 @@ def process(message: Message, compute: bool):
         )
     match kube:
         case DataCube():
-            return persist_datacube(kube, message, base_path=res_path)
+            return persist_datacube(
+                kube,
+                message,
+                base_path=res_path,
+                progress_callback=ProgressReporter(message.request_id),
+            )
         case Dataset():
             return persist_dataset(kube, message, base_path=res_path)
         case _:
@@ -257,14 +467,40 @@ def process(message: Message, compute: bool):
 class Executor(metaclass=LoggableMeta):
     _LOG = logging.getLogger("geokube.Executor")
 
-    def __init__(self, broker, store_path, dask_cluster_opts):
+    def __init__(
+        self,
+        broker,
+        store_path,
+        dask_cluster_opts,
+        concurrency=1,
+        lane_weights=None,
+        high_lane_workers=DEFAULT_HIGH_LANE_WORKERS,
+    ):
         self._store = store_path
+        self.concurrency = concurrency
+        # NOTE: workers taking only requests of the high lane, in addition
+        # to `concurrency` workers shared by all lanes, so that long bulk
+        # requests cannot occupy every worker
+        self.high_lane_workers = high_lane_workers
+        self._scheduler = FairScheduler(lane_weights or DEFAULT_LANE_WEIGHTS)
+        # NOTE: the cluster is shared by all requests in flight, so it is
+        # restarted only when none of them is being processed
+        self._cluster_condition = threading.Condition()
+        self._in_flight = 0
+        self._restart_pending = False
+        self._restart_status = None
+        # NOTE: computations of queries being processed, shared by
+        # identical requests received in the meantime
+        self._coalescing_lock = threading.Lock()
+        self._computations: dict[str, Future] = {}
         broker_conn = pika.BlockingConnection(
             pika.ConnectionParameters(host=broker, heartbeat=10),
         )
         self._conn = broker_conn
         self._channel = broker_conn.channel()
         self._db = DBManager()
+        # NOTE: create tables added since the database was initialized
+        self._db.create_database()
         self.dask_cluster_opts = dask_cluster_opts
 
     def create_dask_cluster(self, dask_cluster_opts: dict = None):
@@ -314,6 +550,38 @@ class Executor(metaclass=LoggableMeta):
             self._LOG.info("recreating the cluster")
             self.create_dask_cluster()
 
+    def _start_request(self):
+        with self._cluster_condition:
+            self._cluster_condition.wait_for(lambda: not self._restart_pending)
+            self._in_flight += 1
+        requests_in_flight.inc()
+
+    def _finish_request(self, status: RequestStatus):
+        requests_in_flight.dec()
+        with self._cluster_condition:
+            self._in_flight -= 1
+            if status is RequestStatus.TIMEOUT:
+                self._restart_status = status
+            if self._restart_status is not None or (
+                self._dask_client.cluster.status
+                in (Status.failed, Status.closed)
+            ):
+                self._restart_pending = True
+            if not self._restart_pending:
+                return
+            if self._in_flight > 0:
+                self._LOG.info(
+                    "cluster restart deferred until %d request(s) finish",
+                    self._in_flight,
+                )
+                return
+            try:
+                self.maybe_restart_cluster(self._restart_status or status)
+            finally:
+                self._restart_pending = False
+                self._restart_status = None
+                self._cluster_condition.notify_all()
+
     def ack_message(self, channel, delivery_tag):
         """Note that `channel` must be the same pika channel instance via which
         the message being ACKed was retrieved (AMQP protocol constraint).
@@ -326,48 +594,40 @@ class Executor(metaclass=LoggableMeta):
             )
             pass
 
-    def retry_until_timeout(
+    def wait_for_result(
         self,
         future,
         message: Message,
-        retries: int = 30,
-        sleep_time: int = 10,
+        timeout: float,
     ):
-        assert retries is not None, "`retries` cannot be `None`"
-        assert sleep_time is not None, "`sleep_time` cannot be `None`"
+        assert timeout is not None, "`timeout` cannot be `None`"
         status = fail_reason = location_path = None
         try:
             self._LOG.debug(
-                "attempt to get result for the request",
+                "waiting at most %s sec for result of the request",
+                timeout,
                 extra={"track_id": message.request_id},
             )
-            for _ in range(retries):
-                if future.done():
-                    self._LOG.debug(
-                        "result is done",
-                        extra={"track_id": message.request_id},
-                    )
-                    location_path = future.result()
-                    status = RequestStatus.DONE
-                    self._LOG.debug(
-                        "result save under: %s",
-                        location_path,
-                        extra={"track_id": message.request_id},
-                    )
-                    break
-                self._LOG.debug(
-                    f"result is not ready yet. sleeping {sleep_time} sec",
-                    extra={"track_id": message.request_id},
-                )
-                time.sleep(sleep_time)
-            else:
+            try:
+                wait(future, timeout=timeout)
+            except TimeoutError:
+                pass
+            # NOTE: the deadline is detected by the state of the future,
+            # so `TimeoutError` raised by the task itself is a failure
+            if not future.done():
                 self._LOG.info(
                     "processing timout",
                     extra={"track_id": message.request_id},
                 )
                 future.cancel()
-                status = RequestStatus.TIMEOUT
-                fail_reason = "Processing timeout"
+                return None, RequestStatus.TIMEOUT, "Processing timeout"
+            location_path = future.result()
+            status = RequestStatus.DONE
+            self._LOG.debug(
+                "result save under: %s",
+                location_path,
+                extra={"track_id": message.request_id},
+            )
         except Exception as e:
             self._LOG.error(
                 "failed to get result due to an error: %s",
@@ -380,7 +640,9 @@ class Executor(metaclass=LoggableMeta):
             fail_reason = f"{type(e).__name__}: {str(e)}"
         return location_path, status, fail_reason
 
-    def handle_message(self, connection, channel, delivery_tag, body):
+    def handle_message(
+        self, connection, channel, delivery_tag, body, headers=None
+    ):
         message: Message = Message(body)
         self._LOG.debug(
             "executing query: `%s`",
@@ -388,6 +650,124 @@ class Executor(metaclass=LoggableMeta):
             extra={"track_id": message.request_id},
         )
 
+        key = self._get_coalescing_key(message, headers)
+        if key is not None:
+            with self._coalescing_lock:
+                computation = self._computations.get(key)
+                is_leader = computation is None
+                if is_leader:
+                    computation = self._computations[key] = Future()
+            if not is_leader:
+                self._attach_to_computation(
+                    computation, message, connection, channel, delivery_tag
+                )
+                return
+
+        self._start_request()
+        try:
+            location_path, status, fail_reason = self._process_message(message)
+            if status is RequestStatus.DONE and headers:
+                self._cache_result(message, headers, location_path)
+        except Exception as err:
+            self._finish_request(RequestStatus.FAILED)
+            self._release_computation(key, exception=err)
+            raise
+        self._release_computation(
+            key, result=(location_path, status, fail_reason)
+        )
+        self._LOG.debug(
+            "acknowledging request", extra={"track_id": message.request_id}
+        )
+        cb = functools.partial(self.ack_message, channel, delivery_tag)
+        connection.add_callback_threadsafe(cb)
+
+        self._finish_request(status)
+        self._LOG.debug(
+            "request acknowledged", extra={"track_id": message.request_id}
+        )
+
+    @staticmethod
+    def _get_coalescing_key(message: Message, headers: dict | None):
+        if message.type is not MessageType.QUERY:
+            return None
+        if headers and headers.get("cache_key"):
+            return headers["cache_key"]
+        return "_".join(
+            [
+                message.dataset_id,
+                message.product_id,
+                message.content.canonical_hash(),
+            ]
+        )
+
+    def _release_computation(self, key, result=None, exception=None):
+        if key is None:
+            return
+        with self._coalescing_lock:
+            computation = self._computations.pop(key)
+        if exception is not None:
+            computation.set_exception(exception)
+        else:
+            computation.set_result(result)
+
+    def _attach_to_computation(
+        self, computation, message, connection, channel, delivery_tag
+    ):
+        self._LOG.info(
+            "attaching to the computation of the identical request",
+            extra={"track_id": message.request_id},
+        )
+        self._db.update_request(
+            request_id=message.request_id,
+            worker_id=self._worker_id,
+            status=RequestStatus.RUNNING,
+        )
+        computation.add_done_callback(
+            functools.partial(
+                self._finish_attached_request,
+                message=message,
+                connection=connection,
+                channel=channel,
+                delivery_tag=delivery_tag,
+            )
+        )
+
+    def _finish_attached_request(
+        self, computation, message, connection, channel, delivery_tag
+    ):
+        try:
+            location_path, status, fail_reason = computation.result()
+        except Exception as err:
+            location_path = None
+            status = RequestStatus.FAILED
+            fail_reason = f"{type(err).__name__}: {str(err)}"
+        try:
+            self._db.update_request(
+                request_id=message.request_id,
+                worker_id=self._worker_id,
+                status=status,
+                location_path=location_path,
+                size_bytes=self.get_size(location_path),
+                fail_reason=fail_reason,
+            )
+            if status is RequestStatus.DONE:
+                # NOTE: the download of the attached request references
+                # the artifact if it was cached by the leader
+                self._db.add_cached_result_reference(location_path)
+        except Exception as err:
+            self._LOG.error(
+                "failed to update the attached request: %s",
+                err,
+                extra={"track_id": message.request_id},
+            )
+        self._LOG.debug(
+            "acknowledging attached request",
+            extra={"track_id": message.request_id},
+        )
+        cb = functools.partial(self.ack_message, channel, delivery_tag)
+        connection.add_callback_threadsafe(cb)
+
+    def _process_message(self, message: Message):
         # TODO: estimation size should be updated, too
         self._db.update_request(
             request_id=message.request_id,
@@ -407,10 +787,10 @@ class Executor(metaclass=LoggableMeta):
 
         #future = asyncio.run(process(message,compute=False))
 
-        location_path, status, fail_reason = self.retry_until_timeout(
+        location_path, status, fail_reason = self.wait_for_result(
             future,
             message=message,
-            retries=int(os.environ.get("RESULT_CHECK_RETRIES")),
+            timeout=get_result_timeout(),
         )
         self._db.update_request(
             request_id=message.request_id,
@@ -420,48 +800,141 @@ class Executor(metaclass=LoggableMeta):
             size_bytes=self.get_size(location_path),
             fail_reason=fail_reason,
         )
-        self._LOG.debug(
-            "acknowledging request", extra={"track_id": message.request_id}
-        )
-        cb = functools.partial(self.ack_message, channel, delivery_tag)
-        connection.add_callback_threadsafe(cb)
+        return location_path, status, fail_reason
 
-        self.maybe_restart_cluster(status)
-        self._LOG.debug(
-            "request acknowledged", extra={"track_id": message.request_id}
-        )
+    def _cache_result(self, message: Message, headers: dict, location_path):
+        if not (cache_key := headers.get("cache_key")) or not location_path:
+            return
+        try:
+            self._db.add_cached_result(
+                cache_key=cache_key,
+                location_path=location_path,
+                dataset=message.dataset_id,
+                product=message.product_id,
+                catalog_version=headers.get("catalog_version"),
+                size_bytes=self.get_size(location_path),
+            )
+            released = self._db.evict_cached_results(
+                max_age=datetime.timedelta(
+                    hours=float(os.getenv("RESULT_CACHE_MAX_AGE_HOURS", 168))
+                ),
+                max_size_bytes=int(
+                    float(os.getenv("RESULT_CACHE_MAX_SIZE_GB", 100)) * 1024**3
+                ),
+            )
+            released += self._db.remove_expired_downloads(
+                max_age=datetime.timedelta(
+                    hours=float(
+                        os.getenv(
+                            "CACHED_DOWNLOAD_MAX_AGE_HOURS",
+                            _CACHED_DOWNLOAD_MAX_AGE_HOURS,
+                        )
+                    )
+                )
+            )
+        except Exception as err:
+            self._LOG.warning(
+                "failed to cache the result: %s",
+                err,
+                extra={"track_id": message.request_id},
+            )
+            return
+        if released:
+            self._LOG.info(
+                "removing %d artifacts released by the result cache",
+                len(released),
+                extra={"track_id": message.request_id},
+            )
+        for path in released:
+            self._remove_artifact(path)
+
+    def _remove_artifact(self, location_path):
+        try:
+            if os.path.isdir(location_path):
+                shutil.rmtree(location_path)
+            else:
+                os.remove(location_path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            self._LOG.warning(
+                "failed to remove the artifact `%s`: %s",
+                location_path,
+                err,
+                extra={"track_id": "N/A"},
+            )
 
     def on_message(self, channel, method_frame, header_frame, body, args):
-        (connection, threads) = args
+        (connection, lane) = args
         delivery_tag = method_frame.delivery_tag
-        t = threading.Thread(
-            target=self.handle_message,
-            args=(connection, channel, delivery_tag, body),
+        headers = header_frame.headers or {}
+        self._scheduler.put(
+            lane,
+            headers.get("user_id"),
+            (connection, channel, delivery_tag, body, headers),
         )
-        t.start()
-        threads.append(t)
 
-    def subscribe(self, etype):
-        self._LOG.debug(
-            "subscribe channel: %s_queue", etype, extra={"track_id": "N/A"}
-        )
-        self._channel.queue_declare(queue=f"{etype}_queue", durable=True)
-        self._channel.basic_qos(prefetch_count=1)
+    def _process_scheduled_messages(self, lanes=None):
+        while True:
+            item = self._scheduler.get(lanes=lanes)
+            try:
+                self.handle_message(*item)
+            except Exception as err:
+                self._LOG.error(
+                    "failed to handle the message: %s",
+                    err,
+                    exc_info=True,
+                    extra={"track_id": "N/A"},
+                )
 
-        threads = []
-        on_message_callback = functools.partial(
-            self.on_message, args=(self._conn, threads)
-        )
+    def start_workers(self):
+        """Start threads processing received messages in the order
+        determined by the fair scheduler"""
+        for i in range(self.concurrency):
+            threading.Thread(
+                target=self._process_scheduled_messages,
+                name=f"executor-worker-{i}",
+                daemon=True,
+            ).start()
+        for i in range(self.high_lane_workers):
+            threading.Thread(
+                target=self._process_scheduled_messages,
+                kwargs={"lanes": [RequestPriority.HIGH]},
+                name=f"executor-high-lane-worker-{i}",
+                daemon=True,
+            ).start()
 
-        self._channel.basic_consume(
-            queue=f"{etype}_queue", on_message_callback=on_message_callback
+    def subscribe(self, etype):
+        # NOTE: the broker delivers up to as many unacknowledged messages
+        # per lane as there are workers, so the scheduler can choose among
+        # the lanes
+        self._channel.basic_qos(
+            prefetch_count=self.concurrency + self.high_lane_workers
         )
+        for lane in RequestPriority:
+            queue = lane.queue_name(etype)
+            self._LOG.debug(
+                "subscribe channel: %s", queue, extra={"track_id": "N/A"}
+            )
+            self._channel.queue_declare(queue=queue, durable=True)
+            on_message_callback = functools.partial(
+                self.on_message, args=(self._conn, lane)
+            )
+            self._channel.basic_consume(
+                queue=queue, on_message_callback=on_message_callback
+            )
 
     def listen(self):
         while True:
             self._channel.start_consuming()
 
     def get_size(self, location_path):
+        if location_path and os.path.isdir(location_path):
+            return sum(
+                os.path.getsize(os.path.join(root, file))
+                for root, _, files in os.walk(location_path)
+                for file in files
+            )
         if location_path and os.path.exists(location_path):
             return os.path.getsize(location_path)
         return None
@@ -486,7 +959,13 @@ if __name__ == "__main__":
     dask_cluster_opts['local_directory'] = tempfile.mkdtemp(dir=dask_cluster_opts["local_directory"] if not None else '/', suffix=f'{os.uname()[1]}')
 
 
-    executor = Executor(broker=broker, store_path=store_path, dask_cluster_opts=dask_cluster_opts)
+    concurrency = int(os.getenv("EXECUTOR_CONCURRENCY", 1))
+    high_lane_workers = int(
+        os.getenv("EXECUTOR_HIGH_LANE_WORKERS", DEFAULT_HIGH_LANE_WORKERS)
+    )
+    start_http_server(int(os.getenv("EXECUTOR_METRICS_PORT", 8000)))
+
+    executor = Executor(broker=broker, store_path=store_path, dask_cluster_opts=dask_cluster_opts, concurrency=concurrency, lane_weights=get_lane_weights(), high_lane_workers=high_lane_workers)
     print("channel subscribe")
     for etype in executor_types:
         if etype == "query":
@@ -494,5 +973,6 @@ if __name__ == "__main__":
 
         executor.subscribe(etype)
 
+    executor.start_workers()
     print("waiting for requests ...")
     executor.listen()
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Hashable, Iterable
+
+
+class FairScheduler:
+    """Buffer of received messages deciding which one is processed next.
+
+    Lanes are selected with the smooth weighted round-robin, so a lane
+    with weight `w` gets `w` turns out of the sum of weights of non-empty
+    lanes. Within a lane, users are served in the round-robin order,
+    so a single user cannot starve the others.
+    """
+
+    def __init__(self, weights: dict[Hashable, int]) -> None:
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError("lane weights must be positive")
+        self.weights = dict(weights)
+        self._lanes: dict[Hashable, OrderedDict[Any, deque]] = {
+            lane: OrderedDict() for lane in weights
+        }
+        self._current = {lane: 0 for lane in weights}
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return self._size
+
+    def put(self, lane: Hashable, user_id: Any, item: Any) -> None:
+        """Add the item of the user to the lane"""
+        with self._condition:
+            self._lanes[lane].setdefault(user_id, deque()).append(item)
+            self._size += 1
+            # NOTE: waiting consumers may be restricted to other lanes
+            self._condition.notify_all()
+
+    def get(
+        self,
+        timeout: float | None = None,
+        lanes: Iterable[Hashable] | None = None,
+    ) -> Any:
+        """Remove and return the next item, waiting until one is available
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time of waiting (in seconds), no limit by default
+        lanes : iterable, optional
+            Lanes the item is taken from, all lanes by default
+
+        Raises
+        ------
+        TimeoutError
+            If no item was available within `timeout` seconds
+        """
+        lanes = self._lanes.keys() if lanes is None else set(lanes)
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: any(self._lanes[lane] for lane in lanes), timeout
+            ):
+                raise TimeoutError("no item available")
+            lane = self._next_lane(lanes)
+            users = self._lanes[lane]
+            user_id, items = next(iter(users.items()))
+            item = items.popleft()
+            if items:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            self._size -= 1
+            return item
+
+    def _next_lane(self, lanes) -> Hashable:
+        active = []
+        total = 0
+        for lane, users in self._lanes.items():
+            if not users:
+                # NOTE: idle lanes do not accumulate turns
+                self._current[lane] = 0
+                continue
+            if lane not in lanes:
+                continue
+            active.append(lane)
+            self._current[lane] += self.weights[lane]
+            total += self.weights[lane]
+        lane = max(active, key=self._current.__getitem__)
+        self._current[lane] -= total
+        return lane
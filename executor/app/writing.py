@@ -0,0 +1,239 @@
+import inspect
+import logging
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import netCDF4
+import numpy as np
+import xarray as xr
+
+_LOG = logging.getLogger("geokube.writing")
+
+DEFAULT_BLOCK_SIZE_BYTES = 256 * 1024**2
+DEFAULT_MAX_IN_FLIGHT_BLOCKS = 2
+# NOTE: the API serves the consolidated `.zmetadata` of Zarr v2 stores,
+# while zarr-python 3 writes v3 stores by default
+ZARR_V2_ARGS = (
+    {"zarr_format": 2}
+    if "zarr_format" in inspect.signature(xr.Dataset.to_zarr).parameters
+    else {}
+)
+
+
+def find_time_dim(dset: xr.Dataset) -> str | None:
+    """Find the dimension of the time coordinate of the dataset"""
+    for dim in dset.dims:
+        if dim not in dset.variables:
+            continue
+        var = dset[dim]
+        if (
+            np.issubdtype(var.dtype, np.datetime64)
+            or var.attrs.get("axis") == "T"
+            or var.attrs.get("standard_name") == "time"
+        ):
+            return dim
+    return None
+
+
+def _get_block_length(dset: xr.Dataset, time_dim: str, block_size_bytes):
+    step_nbytes = sum(
+        var.nbytes // max(var.sizes[time_dim], 1)
+        for var in dset.variables.values()
+        if time_dim in var.dims
+    )
+    return max(1, int(block_size_bytes // max(step_nbytes, 1)))
+
+
+def _iter_computed_blocks(dset, time_dim, length, start, max_in_flight):
+    # NOTE: at most `max_in_flight` blocks are computed or kept in memory
+    # at the same time, so the peak memory does not depend on the result size
+    starts = iter(range(start, dset.sizes[time_dim], length))
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        pending = deque()
+        for block_start in starts:
+            block = dset.isel({time_dim: slice(block_start, block_start + length)})
+            pending.append((block_start, pool.submit(block.compute)))
+            if len(pending) >= max_in_flight:
+                block_start, future = pending.popleft()
+                yield block_start, future.result()
+        while pending:
+            block_start, future = pending.popleft()
+            yield block_start, future.result()
+
+
+def _streamed_dataset(dset: xr.Dataset, time_dim: str) -> xr.Dataset:
+    names = [name for name, var in dset.variables.items() if time_dim in var.dims]
+    return dset[names].drop_vars(
+        [name for name in dset.coords if name not in names]
+    )
+
+
+def _set_time_encoding(dset: xr.Dataset) -> None:
+    """Set units, calendar and dtype of encoding of time variables based
+    on all time steps, so that blocks written after the first one are
+    encoded exactly with the encoding chosen for it"""
+    for var in dset.variables.values():
+        if not (
+            np.issubdtype(var.dtype, np.datetime64)
+            or xr.coding.times.contains_cftime_datetimes(var)
+        ):
+            continue
+        values = np.asarray(var.values).ravel()
+        encoding = var.encoding
+        if "units" not in encoding:
+            encoding["units"] = xr.coding.times.infer_datetime_units(values)
+        with warnings.catch_warnings():
+            # NOTE: xarray warns about times not representable as integers
+            warnings.simplefilter("ignore")
+            encoded, _, calendar = xr.coding.times.encode_cf_datetime(
+                values, encoding["units"], encoding.get("calendar")
+            )
+        encoding.setdefault("calendar", calendar)
+        dtype = np.dtype(encoding.get("dtype", encoded.dtype))
+        # NOTE: integers are kept only if they represent all time steps
+        if np.issubdtype(dtype, np.integer) and not np.issubdtype(
+            encoded.dtype, np.integer
+        ):
+            dtype = encoded.dtype
+        encoding["dtype"] = dtype
+
+
+def _set_compression(dset: xr.Dataset, compression_level: int | None) -> None:
+    if not compression_level:
+        return
+    for var in dset.data_vars.values():
+        var.encoding.update(zlib=True, complevel=int(compression_level))
+
+
+def write_netcdf(
+    dset: xr.Dataset,
+    path: str,
+    block_size_bytes: int = DEFAULT_BLOCK_SIZE_BYTES,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT_BLOCKS,
+    compression_level: int | None = None,
+    progress_callback: Callable[[float], None] | None = None,
+) -> None:
+    """Write the dataset to the netCDF file block by block along the time
+    dimension. The first block is written with xarray, which defines
+    the file structure, the remaining ones are encoded with the same
+    encoding and written into the unlimited time dimension.
+
+    Parameters
+    ----------
+    dset : xarray.Dataset
+        Dataset to write
+    path : str
+        Path of the netCDF file
+    block_size_bytes : int
+        Approximate size of the block
+    max_in_flight : int
+        Maximum number of blocks computed at the same time
+    compression_level : int, optional
+        zlib compression level (1-9) of data variables. No compression
+        if `None` or 0
+    progress_callback : callable, optional
+        Function called with the fraction of the written time steps
+    """
+    _set_compression(dset, compression_level)
+    _set_time_encoding(dset)
+    time_dim = find_time_dim(dset)
+    if time_dim is None or dset.sizes[time_dim] <= 1:
+        dset.to_netcdf(path)
+        if progress_callback:
+            progress_callback(1.0)
+        return
+    length = _get_block_length(dset, time_dim, block_size_bytes)
+    n_steps = dset.sizes[time_dim]
+    for name, var in dset.variables.items():
+        if time_dim in var.dims:
+            var.encoding.pop("contiguous", None)
+    dset.isel({time_dim: slice(0, length)}).to_netcdf(
+        path, unlimited_dims=[time_dim]
+    )
+    if progress_callback:
+        progress_callback(min(length, n_steps) / n_steps)
+    if length >= n_steps:
+        return
+    streamed = _streamed_dataset(dset, time_dim)
+    with netCDF4.Dataset(path, "a") as ncfile:
+        encodings = {}
+        for name in streamed.variables:
+            ncvar = ncfile[name]
+            ncvar.set_auto_maskandscale(False)
+            encoding = dict(streamed[name].encoding)
+            for attr in ("units", "calendar"):
+                if attr in ncvar.ncattrs():
+                    encoding[attr] = ncvar.getncattr(attr)
+            encodings[name] = encoding
+        for block_start, block in _iter_computed_blocks(
+            streamed, time_dim, length, length, max_in_flight
+        ):
+            for name, var in block.variables.items():
+                var = var.copy(deep=False)
+                var.encoding = encodings[name]
+                encoded = xr.conventions.encode_cf_variable(var, name=name)
+                index = tuple(
+                    slice(block_start, block_start + var.sizes[time_dim])
+                    if dim == time_dim
+                    else slice(None)
+                    for dim in var.dims
+                )
+                ncfile[name][index] = encoded.values
+            ncfile.sync()
+            written = block_start + block.sizes[time_dim]
+            _LOG.debug("written %d/%d time steps to %s", written, n_steps, path)
+            if progress_callback:
+                progress_callback(written / n_steps)
+
+
+def write_zarr(
+    dset: xr.Dataset,
+    path: str,
+    block_size_bytes: int = DEFAULT_BLOCK_SIZE_BYTES,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT_BLOCKS,
+    progress_callback: Callable[[float], None] | None = None,
+    **kwargs,
+) -> None:
+    """Write the dataset to the Zarr store block by block along the time
+    dimension, appending each block to the store.
+
+    Parameters
+    ----------
+    dset : xarray.Dataset
+        Dataset to write
+    path : str
+        Path of the Zarr store
+    block_size_bytes : int
+        Approximate size of the block
+    max_in_flight : int
+        Maximum number of blocks computed at the same time
+    progress_callback : callable, optional
+        Function called with the fraction of the written time steps
+    **kwargs
+        Arguments passed to `xarray.Dataset.to_zarr`
+    """
+    for var in dset.variables.values():
+        var.encoding.pop("chunks", None)
+    _set_time_encoding(dset)
+    time_dim = find_time_dim(dset)
+    if time_dim is None:
+        dset.to_zarr(path, **kwargs)
+        if progress_callback:
+            progress_callback(1.0)
+        return
+    length = _get_block_length(dset, time_dim, block_size_bytes)
+    n_steps = dset.sizes[time_dim]
+    dset.isel({time_dim: slice(0, length)}).compute().to_zarr(path, **kwargs)
+    if progress_callback:
+        progress_callback(min(length, n_steps) / n_steps)
+    append_kwargs = {
+        key: value for key, value in kwargs.items() if key != "mode"
+    }
+    for block_start, block in _iter_computed_blocks(
+        _streamed_dataset(dset, time_dim), time_dim, length, length, max_in_flight
+    ):
+        block.to_zarr(path, append_dim=time_dim, **append_kwargs)
+        if progress_callback:
+            progress_callback((block_start + block.sizes[time_dim]) / n_steps)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# NOTE: modules of the executor are imported as top-level modules,
+# as in the container running `app/main.py`, and packages of the
+# datastore are installed there
+_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, os.path.join(_ROOT, "executor", "app"))
+sys.path.insert(0, os.path.join(_ROOT, "datastore"))
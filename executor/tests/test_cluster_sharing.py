@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pika")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+os.environ.setdefault("MESSAGE_SEPARATOR", "\\")
+
+from distributed.core import Status
+from prometheus_client import REGISTRY
+
+import main
+from dbmanager.dbmanager import RequestStatus
+
+
+def in_flight_gauge() -> float:
+    return REGISTRY.get_sample_value("executor_requests_in_flight")
+
+
+@pytest.fixture
+def executor():
+    executor = main.Executor.__new__(main.Executor)
+    executor._cluster_condition = threading.Condition()
+    executor._in_flight = 0
+    executor._restart_pending = False
+    executor._restart_status = None
+    executor._dask_client = SimpleNamespace(
+        cluster=SimpleNamespace(status=Status.running)
+    )
+    executor.restarts = []
+
+    def maybe_restart_cluster(status):
+        executor.restarts.append((status, executor._in_flight))
+        executor._dask_client.cluster.status = Status.running
+
+    executor.maybe_restart_cluster = maybe_restart_cluster
+    yield executor
+
+
+def test_gauge_counts_requests_in_flight(executor):
+    initial = in_flight_gauge()
+    executor._start_request()
+    executor._start_request()
+    assert executor._in_flight == 2
+    assert in_flight_gauge() == initial + 2
+    executor._finish_request(RequestStatus.DONE)
+    assert in_flight_gauge() == initial + 1
+    executor._finish_request(RequestStatus.FAILED)
+    assert executor._in_flight == 0
+    assert in_flight_gauge() == initial
+    assert executor.restarts == []
+
+
+def test_concurrent_requests_do_not_restart_running_cluster(executor):
+    initial = in_flight_gauge()
+
+    def process():
+        for _ in range(100):
+            executor._start_request()
+            executor._finish_request(RequestStatus.DONE)
+
+    threads = [threading.Thread(target=process) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert executor._in_flight == 0
+    assert in_flight_gauge() == initial
+    assert executor.restarts == []
+
+
+def test_restart_after_timeout_deferred_until_no_request_in_flight(
+    executor,
+):
+    executor._start_request()
+    executor._start_request()
+    executor._finish_request(RequestStatus.TIMEOUT)
+    assert executor.restarts == []
+    assert executor._restart_pending
+    executor._finish_request(RequestStatus.DONE)
+    assert executor.restarts == [(RequestStatus.TIMEOUT, 0)]
+    assert not executor._restart_pending
+    assert executor._restart_status is None
+
+
+def test_restart_of_failed_cluster_deferred_until_no_request_in_flight(
+    executor,
+):
+    executor._start_request()
+    executor._start_request()
+    executor._dask_client.cluster.status = Status.failed
+    executor._finish_request(RequestStatus.FAILED)
+    assert executor.restarts == []
+    executor._finish_request(RequestStatus.DONE)
+    assert executor.restarts == [(RequestStatus.DONE, 0)]
+
+
+def test_new_requests_wait_for_pending_restart(executor):
+    executor._start_request()
+    executor._start_request()
+    executor._finish_request(RequestStatus.TIMEOUT)
+    started = threading.Event()
+
+    def start_request():
+        executor._start_request()
+        started.set()
+
+    thread = threading.Thread(target=start_request)
+    thread.start()
+    assert not started.wait(0.2)
+    assert executor._in_flight == 1
+    executor._finish_request(RequestStatus.DONE)
+    assert started.wait(5)
+    thread.join()
+    assert executor.restarts == [(RequestStatus.TIMEOUT, 0)]
+    assert executor._in_flight == 1
+    executor._finish_request(RequestStatus.DONE)
+    assert executor.restarts == [(RequestStatus.TIMEOUT, 0)]
+
+
+def test_high_lane_worker_not_occupied_by_bulk_requests(executor):
+    high, bulk = main.RequestPriority.HIGH, main.RequestPriority.BULK
+    executor.concurrency = 1
+    executor.high_lane_workers = 1
+    executor._scheduler = main.FairScheduler(main.DEFAULT_LANE_WEIGHTS)
+    release = threading.Event()
+    handled = []
+
+    def handle_message(lane, idx):
+        handled.append((lane, idx))
+        if lane is bulk:
+            release.wait(5)
+
+    executor.handle_message = handle_message
+    for idx in range(2):
+        executor._scheduler.put(bulk, "bulk-user", (bulk, idx))
+    executor.start_workers()
+    time.sleep(0.1)
+    executor._scheduler.put(high, "user", (high, 0))
+    deadline = time.monotonic() + 5
+    while (high, 0) not in handled:
+        assert time.monotonic() < deadline, "high lane request starved"
+        time.sleep(0.01)
+    release.set()
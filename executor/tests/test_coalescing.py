@@ -0,0 +1,207 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pika")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+os.environ.setdefault("MESSAGE_SEPARATOR", "\\")
+
+from distributed.core import Status
+
+import main
+from messaging import MESSAGE_SEPARATOR
+from dbmanager.dbmanager import RequestStatus
+
+QUERY = '{"variable": ["tp"], "time": {"year": "2020"}}'
+RESULT = "/downloads/result.zip"
+
+
+def body(request_id, query=QUERY):
+    return MESSAGE_SEPARATOR.join(
+        [str(request_id), "query", "era5", "sl", query]
+    ).encode()
+
+
+class StubDB:
+    def __init__(self):
+        self.updates = []
+        self.references = []
+
+    def update_request(self, request_id, worker_id, status, **kwargs):
+        self.updates.append((int(request_id), status, kwargs))
+
+    def add_cached_result_reference(self, location_path):
+        self.references.append(location_path)
+
+    def finished(self):
+        return {
+            request_id: (
+                status,
+                kwargs.get("location_path"),
+                kwargs.get("fail_reason"),
+            )
+            for request_id, status, kwargs in self.updates
+            if status is not RequestStatus.RUNNING
+        }
+
+
+class StubConnection:
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+
+class StubChannel:
+    is_open = True
+
+    def __init__(self):
+        self.acked = []
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+
+class Leader:
+    """Processing of the first request, finished by the test"""
+
+    def __init__(self, executor):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.processed = []
+        self.outcome = (RESULT, RequestStatus.DONE, None)
+        executor._process_message = self
+
+    def __call__(self, message):
+        self.processed.append(int(message.request_id))
+        self.started.set()
+        assert self.release.wait(5)
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+@pytest.fixture
+def executor():
+    executor = main.Executor.__new__(main.Executor)
+    executor._coalescing_lock = threading.Lock()
+    executor._computations = {}
+    executor._cluster_condition = threading.Condition()
+    executor._in_flight = 0
+    executor._restart_pending = False
+    executor._restart_status = None
+    executor._dask_client = SimpleNamespace(
+        cluster=SimpleNamespace(status=Status.running)
+    )
+    executor._worker_id = 1
+    executor._db = StubDB()
+    executor.connection = StubConnection()
+    executor.channel = StubChannel()
+    yield executor
+
+
+def submit(executor, request_id, query=QUERY):
+    executor.handle_message(
+        executor.connection,
+        executor.channel,
+        request_id,
+        body(request_id, query),
+    )
+
+
+def start_leader(executor, leader, request_id=1):
+    errors = []
+
+    def run():
+        try:
+            submit(executor, request_id)
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert leader.started.wait(5)
+    return thread, errors
+
+
+def test_attached_requests_share_result_of_leader(executor):
+    leader = Leader(executor)
+    thread, errors = start_leader(executor, leader)
+    submit(executor, 2)
+    submit(executor, 3)
+    assert executor.channel.acked == []
+    leader.release.set()
+    thread.join()
+    assert errors == []
+    assert leader.processed == [1]
+    # NOTE: each attached request gets its own download
+    # of the artifact of the leader
+    assert executor._db.finished() == {
+        2: (RequestStatus.DONE, RESULT, None),
+        3: (RequestStatus.DONE, RESULT, None),
+    }
+    assert executor._db.references == [RESULT, RESULT]
+    assert sorted(executor.channel.acked) == [1, 2, 3]
+    assert executor._computations == {}
+
+
+def test_different_queries_not_coalesced(executor):
+    leader = Leader(executor)
+    thread, _ = start_leader(executor, leader)
+    other = threading.Thread(
+        target=submit, args=(executor, 2, '{"variable": ["t2m"]}')
+    )
+    other.start()
+    leader.release.set()
+    thread.join()
+    other.join()
+    assert sorted(leader.processed) == [1, 2]
+    assert executor._db.finished() == {}
+
+
+def test_attached_requests_fail_with_leader(executor):
+    leader = Leader(executor)
+    leader.outcome = (None, RequestStatus.TIMEOUT, "Processing timeout")
+    executor.maybe_restart_cluster = lambda status: None
+    thread, _ = start_leader(executor, leader)
+    submit(executor, 2)
+    leader.release.set()
+    thread.join()
+    assert executor._db.finished() == {
+        2: (RequestStatus.TIMEOUT, None, "Processing timeout"),
+    }
+    assert executor._db.references == []
+    assert sorted(executor.channel.acked) == [1, 2]
+
+
+def test_attached_requests_released_when_leader_raises(executor):
+    leader = Leader(executor)
+    leader.outcome = RuntimeError("the database is not available")
+    thread, errors = start_leader(executor, leader)
+    submit(executor, 2)
+    leader.release.set()
+    thread.join()
+    assert len(errors) == 1
+    assert executor._db.finished() == {
+        2: (
+            RequestStatus.FAILED,
+            None,
+            "RuntimeError: the database is not available",
+        ),
+    }
+    assert executor.channel.acked == [2]
+    assert executor._computations == {}
+    assert executor._in_flight == 0
+
+
+def test_identical_request_after_leader_finished_computed_again(executor):
+    leader = Leader(executor)
+    leader.release.set()
+    submit(executor, 1)
+    submit(executor, 2)
+    assert leader.processed == [1, 2]
+    assert executor._computations == {}
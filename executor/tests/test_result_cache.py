@@ -0,0 +1,73 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pika")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+os.environ.setdefault("MESSAGE_SEPARATOR", "\\")
+
+import main
+
+
+class StubDB:
+    def __init__(self, evicted=(), expired=()):
+        self.evicted = list(evicted)
+        self.expired = list(expired)
+        self.cached = []
+
+    def add_cached_result(self, **kwargs):
+        self.cached.append(kwargs)
+
+    def evict_cached_results(self, max_age=None, max_size_bytes=None):
+        return self.evicted
+
+    def remove_expired_downloads(self, max_age):
+        return self.expired
+
+
+@pytest.fixture
+def message():
+    yield SimpleNamespace(request_id=1, dataset_id="era5", product_id="sl")
+
+
+def make_executor(db):
+    executor = main.Executor.__new__(main.Executor)
+    executor._db = db
+    return executor
+
+
+def test_released_artifacts_removed(tmp_path, message):
+    result = tmp_path / "result.zip"
+    result.write_bytes(b"result")
+    evicted = tmp_path / "evicted.zip"
+    evicted.write_bytes(b"evicted")
+    expired = tmp_path / "expired.zarr"
+    expired.mkdir()
+    (expired / ".zgroup").write_text("{}")
+    db = StubDB(evicted=[str(evicted)], expired=[str(expired)])
+    make_executor(db)._cache_result(
+        message, {"cache_key": "key"}, str(result)
+    )
+    assert db.cached[0]["location_path"] == str(result)
+    assert db.cached[0]["size_bytes"] == len(b"result")
+    assert result.exists()
+    assert not evicted.exists()
+    assert not expired.exists()
+
+
+def test_missing_released_artifact_ignored(tmp_path, message):
+    db = StubDB(evicted=[str(tmp_path / "missing.zip")])
+    make_executor(db)._cache_result(
+        message, {"cache_key": "key"}, str(tmp_path / "result.zip")
+    )
+
+
+def test_result_without_cache_key_not_cached(tmp_path, message):
+    db = StubDB(evicted=[str(tmp_path / "missing.zip")])
+    make_executor(db)._cache_result(message, {}, str(tmp_path / "result"))
+    assert db.cached == []
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from scheduling import FairScheduler
+
+WEIGHTS = {"high": 6, "normal": 3, "bulk": 1}
+
+
+def drain(scheduler, lanes=None):
+    items = []
+    while len(scheduler):
+        try:
+            items.append(scheduler.get(timeout=0, lanes=lanes))
+        except TimeoutError:
+            break
+    return items
+
+
+def test_weights_must_be_positive():
+    with pytest.raises(ValueError):
+        FairScheduler({})
+    with pytest.raises(ValueError):
+        FairScheduler({"high": 1, "bulk": 0})
+
+
+def test_get_times_out_when_empty():
+    with pytest.raises(TimeoutError):
+        FairScheduler(WEIGHTS).get(timeout=0.01)
+
+
+def test_lanes_served_in_proportion_to_weights():
+    scheduler = FairScheduler(WEIGHTS)
+    for lane in WEIGHTS:
+        for idx in range(20):
+            scheduler.put(lane, "user", (lane, idx))
+    lanes = [lane for lane, _ in drain(scheduler)[:20]]
+    assert lanes.count("high") == 12
+    assert lanes.count("normal") == 6
+    assert lanes.count("bulk") == 2
+
+
+def test_weighted_round_robin_interleaves_lanes():
+    scheduler = FairScheduler(WEIGHTS)
+    for lane in WEIGHTS:
+        for idx in range(10):
+            scheduler.put(lane, "user", (lane, idx))
+    lanes = [lane for lane, _ in drain(scheduler)[:10]]
+    # NOTE: the smooth weighted round-robin does not serve a lane
+    # in bursts of its weight
+    assert lanes == [
+        "high",
+        "normal",
+        "high",
+        "high",
+        "normal",
+        "high",
+        "bulk",
+        "high",
+        "normal",
+        "high",
+    ]
+
+
+def test_items_of_lane_kept_in_order():
+    scheduler = FairScheduler(WEIGHTS)
+    for idx in range(5):
+        scheduler.put("normal", "user", idx)
+    assert drain(scheduler) == [0, 1, 2, 3, 4]
+
+
+def test_idle_lane_does_not_accumulate_turns():
+    scheduler = FairScheduler(WEIGHTS)
+    for idx in range(10):
+        scheduler.put("bulk", "user", ("bulk", idx))
+    drain(scheduler)
+    for lane in ("high", "bulk"):
+        for idx in range(7):
+            scheduler.put(lane, "user", (lane, idx))
+    lanes = [lane for lane, _ in drain(scheduler)[:7]]
+    assert lanes.count("high") == 6
+
+
+def test_users_served_round_robin_within_lane():
+    scheduler = FairScheduler(WEIGHTS)
+    for idx in range(4):
+        scheduler.put("normal", "alice", ("alice", idx))
+    scheduler.put("normal", "bob", ("bob", 0))
+    scheduler.put("normal", "carol", ("carol", 0))
+    scheduler.put("normal", "bob", ("bob", 1))
+    assert drain(scheduler) == [
+        ("alice", 0),
+        ("bob", 0),
+        ("carol", 0),
+        ("alice", 1),
+        ("bob", 1),
+        ("alice", 2),
+        ("alice", 3),
+    ]
+
+
+def test_get_restricted_to_lanes():
+    scheduler = FairScheduler(WEIGHTS)
+    scheduler.put("bulk", "user", "bulk")
+    with pytest.raises(TimeoutError):
+        scheduler.get(timeout=0.01, lanes=["high"])
+    scheduler.put("high", "user", "high")
+    assert scheduler.get(timeout=0, lanes=["high"]) == "high"
+    assert len(scheduler) == 1
+    assert scheduler.get(timeout=0) == "bulk"
+
+
+def test_restricted_consumer_does_not_change_turns_of_other_lanes():
+    scheduler = FairScheduler(WEIGHTS)
+    for lane in WEIGHTS:
+        for idx in range(20):
+            scheduler.put(lane, "user", (lane, idx))
+    for _ in range(5):
+        scheduler.get(timeout=0, lanes=["high"])
+    lanes = [lane for lane, _ in drain(scheduler)[:10]]
+    assert lanes.count("high") == 6
+    assert lanes.count("normal") == 3
+    assert lanes.count("bulk") == 1
+
+
+def test_restricted_consumer_woken_by_item_of_its_lane():
+    scheduler = FairScheduler(WEIGHTS)
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            scheduler.get(timeout=5, lanes=["high"])
+        )
+    )
+    thread.start()
+    scheduler.put("bulk", "user", "bulk")
+    scheduler.put("high", "user", "high")
+    thread.join()
+    assert results == ["high"]
+    assert scheduler.get(timeout=0) == "bulk"
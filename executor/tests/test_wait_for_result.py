@@ -0,0 +1,68 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pika")
+pytest.importorskip("prometheus_client")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geokube")
+pytest.importorskip("intake")
+
+os.environ.setdefault("MESSAGE_SEPARATOR", "\\")
+
+from dask.distributed import Client
+
+import main
+from dbmanager.dbmanager import RequestStatus
+
+
+@pytest.fixture(scope="module")
+def client():
+    with Client(
+        processes=False,
+        n_workers=1,
+        threads_per_worker=2,
+        dashboard_address=None,
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def executor():
+    yield main.Executor.__new__(main.Executor)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return "/downloads/result.zip"
+
+
+def _raise_timeout():
+    raise TimeoutError("reading the source timed out")
+
+
+def test_result_of_finished_task(client, executor):
+    future = client.submit(_sleep, 0, pure=False)
+    assert executor.wait_for_result(
+        future, SimpleNamespace(request_id=1), timeout=10
+    ) == ("/downloads/result.zip", RequestStatus.DONE, None)
+
+
+def test_deadline_exceeded_is_timeout(client, executor):
+    future = client.submit(_sleep, 5, pure=False)
+    assert executor.wait_for_result(
+        future, SimpleNamespace(request_id=1), timeout=0.1
+    ) == (None, RequestStatus.TIMEOUT, "Processing timeout")
+
+
+def test_timeout_error_of_task_is_failure(client, executor):
+    future = client.submit(_raise_timeout, pure=False)
+    assert executor.wait_for_result(
+        future, SimpleNamespace(request_id=1), timeout=10
+    ) == (
+        None,
+        RequestStatus.FAILED,
+        "TimeoutError: reading the source timed out",
+    )
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from writing import ZARR_V2_ARGS, write_netcdf, write_zarr
+
+
+@pytest.fixture
+def dset():
+    time = pd.date_range("2000-01-01", periods=48, freq="1h")
+    values = np.arange(48 * 3 * 4, dtype=np.float32).reshape(48, 3, 4)
+    yield xr.Dataset(
+        {"tas": (("time", "latitude", "longitude"), values)},
+        coords={
+            "time": time,
+            "latitude": [10.0, 20.0, 30.0],
+            "longitude": [0.0, 1.0, 2.0, 3.0],
+        },
+    ).chunk({"time": 5})
+
+
+# NOTE: the block of one step is shorter than the resolution of `days`,
+# which xarray would infer from a single time step
+@pytest.mark.parametrize("block_size_bytes", [1, 4 * 3 * 4 * 5, 10**9])
+def test_write_netcdf_in_blocks(tmp_path, dset, block_size_bytes):
+    path = str(tmp_path / "result.nc")
+    progress = []
+    write_netcdf(
+        dset,
+        path,
+        block_size_bytes=block_size_bytes,
+        compression_level=4,
+        progress_callback=progress.append,
+    )
+    with xr.open_dataset(path) as result:
+        xr.testing.assert_identical(result.load(), dset.compute())
+    assert progress[-1] == 1.0
+
+
+@pytest.mark.parametrize("block_size_bytes", [1, 4 * 3 * 4 * 5, 10**9])
+def test_write_zarr_in_blocks(tmp_path, dset, block_size_bytes):
+    path = str(tmp_path / "result.zarr")
+    progress = []
+    write_zarr(
+        dset,
+        path,
+        block_size_bytes=block_size_bytes,
+        progress_callback=progress.append,
+        mode="w",
+    )
+    with xr.open_zarr(path) as result:
+        xr.testing.assert_identical(result.load(), dset.compute())
+    assert progress[-1] == 1.0
+
+
+def test_write_netcdf_cftime_calendar(tmp_path):
+    time = xr.date_range(
+        "2000-02-27", periods=12, freq="6h", calendar="noleap", use_cftime=True
+    )
+    dset = xr.Dataset(
+        {"tas": (("time",), np.arange(12, dtype=np.float32))},
+        coords={"time": time},
+    )
+    path = str(tmp_path / "result.nc")
+    write_netcdf(dset, path, block_size_bytes=1)
+    with xr.open_dataset(path, use_cftime=True) as result:
+        assert list(result["time"].values) == list(time)
+        assert result["time"].encoding["calendar"] == "noleap"
+
+
+def test_write_zarr_v2_with_consolidated_metadata(tmp_path, dset):
+    path = tmp_path / "result.zarr"
+    write_zarr(
+        dset, str(path), block_size_bytes=1, mode="w", consolidated=True,
+        **ZARR_V2_ARGS,
+    )
+    assert (path / ".zgroup").is_file()
+    assert (path / ".zmetadata").is_file()
+    with xr.open_zarr(str(path), consolidated=True) as result:
+        xr.testing.assert_identical(result.load(), dset.compute())